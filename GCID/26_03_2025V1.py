@@ -1,13 +1,18 @@
 import cv2
 import mediapipe as mp
 import numpy as np
+import sys
 import time
 from tkinter import Tk, messagebox
-from gesture_interpreter import GestureInterpreter, GestureType, GestureState, HandLandmark
+from gesture_interpreter import GestureType, GestureState, HandLandmark
+from hand_tracking import HandTracker
 from tools import PenTool, EraserTool, ShapeTool, PointerTool
 
+# Hands tracked at once; each keeps its own gesture latch, smoother, pinch owner and stroke
+MAX_HANDS = 2
 
-from smoother import SpeedAdaptiveSmoother
+
+from frame_source import open_source
 
 
 class State:
@@ -23,8 +28,6 @@ class State:
         self.palm_open_detection_duration = 1.0
         self.control_panel_exists = False
         self.control_panel_exists = False
-        # Cursor Smoother: High responsiveness (0.6 - 0.9) to feel "fast" but stable enough for UI clicks
-        self.smoother = SpeedAdaptiveSmoother(min_alpha=0.6, max_alpha=0.9, min_speed=50.0, max_speed=1000.0)
 
         self.pages = [np.ones((550, 850, 3), dtype=np.uint8) * 255]  # List of pages
         self.current_page_index = 0
@@ -50,7 +53,6 @@ class State:
         ]
         self.color_names = ["Violet", "Indigo", "Blue", "Green", "Yellow", "Orange", "Red"]
         self.current_color_index = 0
-        self.color_change_start_time = None
         self.color_change_duration = 0.5
         self.using_vibgyor = False
 
@@ -68,13 +70,11 @@ class State:
         self.drag_start_pos = None
         self.original_selection_pos = None
         
-        # Gesture Engine
-        # Gesture Engine
-        self.gesture_interpreter = GestureInterpreter()
+        # Gesture Engine: one interpreter, cursor smoother and pinch owner per tracked hand
+        self.hands = HandTracker(MAX_HANDS)
         
-        # Tools
+        # Tools (each hand draws with its own copy, see TrackedHand.tool_for)
         self.active_tool = PointerTool()
-        self.intent_owner = None # None, "UI", "TOOL"
         self.shape_palette_open = False
         
     def set_tool(self, tool):
@@ -710,30 +710,9 @@ def draw_visual_indicator(canvas):
         cv2.putText(canvas, color_str, (10, 70), 
                     cv2.FONT_HERSHEY_TRIPLEX, 0.6, current_color, 1)
 
-def is_palm_open(hand_landmarks):
-    fingertips_extended = all(
-        hand_landmarks.landmark[tip.value].y < hand_landmarks.landmark[(tip.value)-2].y 
-        for tip in [
-            HandLandmark.THUMB_TIP, 
-            HandLandmark.INDEX_FINGER_TIP,
-            HandLandmark.MIDDLE_FINGER_TIP,
-            HandLandmark.RING_FINGER_TIP,
-            HandLandmark.PINKY_TIP
-        ]
-    )
-    return fingertips_extended
-
-def check_thumb_pinky_touch(hand_landmarks):
-    thumb_tip = hand_landmarks.landmark[HandLandmark.THUMB_TIP.value]
-    pinky_tip = hand_landmarks.landmark[HandLandmark.PINKY_TIP.value]
-    
-    distance = np.sqrt(
-        (thumb_tip.x - pinky_tip.x)**2 + 
-        (thumb_tip.y - pinky_tip.y)**2 +
-        (thumb_tip.z - pinky_tip.z)**2
-    )
-    
-    return distance < 0.07
+def check_thumb_pinky_touch(event):
+    # THUMB_PINKY rule of gesture_rules.DESKTOP_RULES, evaluated by the interpreter
+    return "THUMB_PINKY" in event.gestures
 
 def draw_undo_redo_buttons(canvas):
     button_x = canvas.shape[1] - 50
@@ -910,16 +889,18 @@ def is_point_in_rect(point, rect):
     rx1, ry1, rx2, ry2 = rect
     return rx1 <= x <= rx2 and ry1 <= y <= ry2
 
-def main():
+def main(source="0"):
+    """
+    Run the drawing app on a frame source: a camera index (default 0),
+    "synthetic", a video file or a directory of images.
+    """
     try:
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            raise Exception("Could not open video capture device")
+        cap = open_source(source)
 
         cv2.namedWindow('Drawing Canvas')
 
         while True:
-            success, frame = cap.read()
+            success, frame, captured_at = cap.read()
             if not success:
                 print("Failed to grab frame")
                 break
@@ -929,6 +910,7 @@ def main():
             
             # Process with MediaPipe Tasks API
             results = None
+            handedness = []
             if hand_landmarker is not None:
                 try:
                     # Ensure proper image format
@@ -945,8 +927,10 @@ def main():
                             def __init__(self, task_landmarks):
                                 self.landmark = task_landmarks
                         
-                        legacy_landmarks = [LegacyLandmarks(detection_result.hand_landmarks[0])]
+                        legacy_landmarks = [LegacyLandmarks(hand) for hand in detection_result.hand_landmarks]
                         results = LegacyResults(legacy_landmarks)
+                        # The frame is mirrored, as the model expects, so labels name the user's real hands
+                        handedness = [(h[0].category_name, h[0].score) for h in detection_result.handedness]
                 except Exception as e:
                     # Silently handle detection errors to keep app running
                     pass
@@ -967,31 +951,24 @@ def main():
             # Draw the control panel on the canvas if it is visible
             panel_x, panel_y, panel_width, panel_height = draw_control_panel(canvas)
 
-            if results and hasattr(results, 'multi_hand_landmarks') and results.multi_hand_landmarks:
-                hand_landmarks = results.multi_hand_landmarks[0]
-                h, w, _ = canvas.shape
-                
-                # ==============================================================================
-                # 1. Process Gesture & Raw Data
-                # ==============================================================================
-                event = state.gesture_interpreter.process(hand_landmarks)
-                
-                # Extract Hand Confidence
-                hand_confidence = 1.0
-                try:
-                     if 'detection_result' in locals() and detection_result and detection_result.handedness:
-                         hand_confidence = detection_result.handedness[0][0].score
-                except:
-                     pass
-
-                # COMPUTE RAW CURSOR POSITION (REQUIRED FOR UI HIT TEST)
-                # We use event.x/y (Midpoint during pinch) rather than index tip to align with visual cursor location
-                cursor_raw_x, cursor_raw_y = int(event.x * w), int(event.y * h)
-                
-                # DEBUG LOGS (REQUIRED)
-                if event.type == GestureType.PINCH and event.state == GestureState.START:
-                     print(f"PINCH_START at {cursor_raw_x}, {cursor_raw_y}")
+            h, w, _ = canvas.shape
+
+            # ==============================================================================
+            # 1. Process Gestures & Raw Data
+            # Every hand gets a stable id and its own latch; landmarks of all hands are
+            # filtered, and features and rules evaluated, in one pass. Hands that left
+            # the frame are dropped after a last event.
+            # ==============================================================================
+            tracked = state.hands.update(results.multi_hand_landmarks if results else [], handedness, captured_at)
+
+            # A hand that left mid-pinch still ends it, so its tool commits the stroke or shape in progress
+            for hand, event in state.hands.lost:
+                if hand.intent_owner == "TOOL" and event.type == GestureType.PINCH:
+                    last_x = int(hand.smoother.prev_smoothed_x) if hand.smoother.prev_smoothed_x else int(event.x * w)
+                    last_y = int(hand.smoother.prev_smoothed_y) if hand.smoother.prev_smoothed_y else int(event.y * h)
+                    hand.tool_for(state.active_tool).on_event(event, last_x, last_y, state)
 
+            if tracked:
                 # ==============================================================================
                 # 2. UI HANDLING (STRICT PRIORITY)
                 # MUST BE EVALUATED BEFORE ANY TOOL LOGIC
@@ -1029,139 +1006,155 @@ def main():
                 if state.control_panel_visible and panel_width > 0:
                     ui_targets.append(('PANEL', (panel_x, panel_y, panel_x + panel_width, panel_y + panel_height)))
 
-                # Determine UI Hit using RAW CURSOR COORDINATES
-                hit_ui_id = None
-                for uid, rect in ui_targets:
-                    if rect and is_point_in_rect((cursor_raw_x, cursor_raw_y), rect):
-                        hit_ui_id = uid
-                        break
+                for hand, event in tracked:
+                    hand_confidence = hand.confidence
+
+                    # COMPUTE RAW CURSOR POSITION (REQUIRED FOR UI HIT TEST)
+                    # We use event.x/y (Midpoint during pinch) rather than index tip to align with visual cursor location
+                    cursor_raw_x, cursor_raw_y = int(event.x * w), int(event.y * h)
                 
-                ui_consumed = False
+                    # DEBUG LOGS (REQUIRED)
+                    if event.type == GestureType.PINCH and event.state == GestureState.START:
+                         print(f"PINCH_START at {cursor_raw_x}, {cursor_raw_y}")
+
+                    # Determine UI Hit using RAW CURSOR COORDINATES
+                    hit_ui_id = None
+                    for uid, rect in ui_targets:
+                        if rect and is_point_in_rect((cursor_raw_x, cursor_raw_y), rect):
+                            hit_ui_id = uid
+                            break
+                
+                    ui_consumed = False
 
-                # FIX: Check for UI Interaction (Global Override)
-                # Ignore all locks if a NEW pinch starts on UI
-                if event.type == GestureType.PINCH and event.state == GestureState.START and hit_ui_id:
-                     print(f"UI HIT {hit_ui_id}")
-                     print("UI CLICK FIRED")
+                    # FIX: Check for UI Interaction (Global Override)
+                    # Ignore all locks if a NEW pinch starts on UI
+                    if event.type == GestureType.PINCH and event.state == GestureState.START and hit_ui_id:
+                         print(f"UI HIT {hit_ui_id}")
+                         print("UI CLICK FIRED")
                      
-                     # Consumed immediately
-                     ui_consumed = True
+                         # Consumed immediately
+                         ui_consumed = True
                      
-                     # Execute Actions
-                     if hit_ui_id == 'CONTROL':
-                         state.control_panel_visible = not state.control_panel_visible
-                     elif hit_ui_id == 'DRAWING':
-                         if isinstance(state.active_tool, PenTool):
+                         # Execute Actions
+                         if hit_ui_id == 'CONTROL':
+                             state.control_panel_visible = not state.control_panel_visible
+                         elif hit_ui_id == 'DRAWING':
+                             if isinstance(state.active_tool, PenTool):
+                                 state.set_tool(PointerTool())
+                                 state.selecting = False
+                                 state.cancel_selection()
+                             else:
+                                 state.set_tool(PenTool())
+                         elif hit_ui_id == 'ERASE_ALL':
+                             state.canvas = np.ones((550, 850, 3), dtype=np.uint8) * 255
+                             state.pages[state.current_page_index] = state.canvas.copy()
+                         elif hit_ui_id == 'FREEDOM':
                              state.set_tool(PointerTool())
-                             state.selecting = False
-                             state.cancel_selection()
-                         else:
-                             state.set_tool(PenTool())
-                     elif hit_ui_id == 'ERASE_ALL':
-                         state.canvas = np.ones((550, 850, 3), dtype=np.uint8) * 255
-                         state.pages[state.current_page_index] = state.canvas.copy()
-                     elif hit_ui_id == 'FREEDOM':
-                         state.set_tool(PointerTool())
-                         if state.selecting:
-                             state.complete_selection()
-                         else:
-                             state.start_selection(cursor_raw_x, cursor_raw_y)
-                     elif hit_ui_id.startswith('NAV_'):
-                         action = hit_ui_id.replace('NAV_', '')
-                         if action == 'new': state.add_new_page()
-                         elif action == 'next': state.switch_page("next")
-                         elif action == 'prev': state.switch_page("prev")
-                     elif hit_ui_id.startswith('UNDO_'):
-                         action = hit_ui_id.replace('UNDO_', '')
-                         if action == 'undo': state.undo()
-                         elif action == 'redo': state.redo()
+                             if state.selecting:
+                                 state.complete_selection()
+                             else:
+                                 state.start_selection(cursor_raw_x, cursor_raw_y)
+                         elif hit_ui_id.startswith('NAV_'):
+                             action = hit_ui_id.replace('NAV_', '')
+                             if action == 'new': state.add_new_page()
+                             elif action == 'next': state.switch_page("next")
+                             elif action == 'prev': state.switch_page("prev")
+                         elif hit_ui_id.startswith('UNDO_'):
+                             action = hit_ui_id.replace('UNDO_', '')
+                             if action == 'undo': state.undo()
+                             elif action == 'redo': state.redo()
                      
-                     elif hit_ui_id.startswith('SHAPE_'):
-                         shape_action = hit_ui_id.replace('SHAPE_', '')
+                         elif hit_ui_id.startswith('SHAPE_'):
+                             shape_action = hit_ui_id.replace('SHAPE_', '')
                          
-                         if shape_action == "MAIN_TOGGLE":
-                             state.shape_palette_open = not state.shape_palette_open
-                         else:
-                             state.set_tool(ShapeTool(shape_action))
-                             state.selecting = False
-                             state.cancel_selection()
-                             state.shape_palette_open = False # Auto-close
+                             if shape_action == "MAIN_TOGGLE":
+                                 state.shape_palette_open = not state.shape_palette_open
+                             else:
+                                 state.set_tool(ShapeTool(shape_action))
+                                 state.selecting = False
+                                 state.cancel_selection()
+                                 state.shape_palette_open = False # Auto-close
                      
-                     # Always lock intent to UI to consume HOLD frames (Debounce)
-                     state.intent_owner = "UI"
+                         # Always lock intent to UI to consume HOLD frames (Debounce)
+                         hand.intent_owner = "UI"
                 
-                # Handle existing UI Intent (Dragging Sliders)
-                elif state.intent_owner == "UI":
-                    if event.type == GestureType.PINCH:
-                         if event.state == GestureState.HOLD:
-                             if state.control_panel_visible and panel_width > 0:
-                                 # Use RAW for slider responsiveness as well
-                                 update_control_panel_values(state, cursor_raw_x, cursor_raw_y, panel_x, panel_y, panel_width, panel_height)
-                         elif event.state == GestureState.END:
-                             state.intent_owner = None
-                    ui_consumed = True
-
-                # ==============================================================================
-                # 3. Tool Routing (Only if UI didn't consume)
-                # ==============================================================================
+                    # Handle existing UI Intent (Dragging Sliders)
+                    elif hand.intent_owner == "UI":
+                        if event.type == GestureType.PINCH:
+                             if event.state == GestureState.HOLD:
+                                 if state.control_panel_visible and panel_width > 0:
+                                     # Use RAW for slider responsiveness as well
+                                     update_control_panel_values(state, cursor_raw_x, cursor_raw_y, panel_x, panel_y, panel_width, panel_height)
+                             elif event.state == GestureState.END:
+                                 hand.intent_owner = None
+                        ui_consumed = True
+
+                    # ==============================================================================
+                    # 3. Tool Routing (Only if UI didn't consume)
+                    # ==============================================================================
                 
-                # Default for drawing cursor
-                smoothed_x, smoothed_y = cursor_raw_x, cursor_raw_y
+                    # Default for drawing cursor
+                    smoothed_x, smoothed_y = cursor_raw_x, cursor_raw_y
 
-                if not ui_consumed:
-                    # Smoothing Logic (Only update smoother if active)
-                    cursor_raw_x, cursor_raw_y = int(event.x * w), int(event.y * h)
+                    if not ui_consumed:
+                        # Smoothing Logic (Only update smoother if active)
+                        cursor_raw_x, cursor_raw_y = int(event.x * w), int(event.y * h)
                 
-                    should_update_cursor = True
-                    if hand_confidence < 0.5: 
-                         should_update_cursor = False
-                    
-                    if state.last_point and should_update_cursor:
-                         dist = np.sqrt((cursor_raw_x - state.smoother.last_x)**2 + (cursor_raw_y - state.smoother.last_y)**2)
-                         if dist > 300: # Extreme jump prevention
+                        should_update_cursor = True
+                        if hand_confidence < 0.5: 
                              should_update_cursor = False
                     
-                    if should_update_cursor:
-                         smoothed_x, smoothed_y = state.smoother.update(cursor_raw_x, cursor_raw_y, w, h)
-                    else:
-                         smoothed_x = int(state.smoother.prev_smoothed_x) if state.smoother.prev_smoothed_x else cursor_raw_x
-                         smoothed_y = int(state.smoother.prev_smoothed_y) if state.smoother.prev_smoothed_y else cursor_raw_y
-
-                    # Route to Tool
-                    if state.intent_owner is None:
-                        # Try to assign to Tool
-                        if event.type == GestureType.PINCH and event.state == GestureState.START:
-                            state.intent_owner = "TOOL"
-                            state.active_tool.on_event(event, smoothed_x, smoothed_y, state)
-                        
+                        # Jump prevention only while this hand's pen stroke is in progress
+                        if getattr(hand.tool_for(state.active_tool), "last_point", None) and should_update_cursor:
+                             dist = np.sqrt((cursor_raw_x - hand.smoother.last_x)**2 + (cursor_raw_y - hand.smoother.last_y)**2)
+                             if dist > 300: # Extreme jump prevention
+                                 should_update_cursor = False
+                    
+                        if should_update_cursor:
+                             smoothed_x, smoothed_y = hand.smoother.update(cursor_raw_x, cursor_raw_y, w, h, captured_at)
                         else:
-                            # Hover / Global Gestures
-                            is_hovering_ui = (hit_ui_id is not None)
+                             smoothed_x = int(hand.smoother.prev_smoothed_x) if hand.smoother.prev_smoothed_x else cursor_raw_x
+                             smoothed_y = int(hand.smoother.prev_smoothed_y) if hand.smoother.prev_smoothed_y else cursor_raw_y
+
+                        # Route to Tool
+                        if hand.intent_owner is None:
+                            # Try to assign to Tool
+                            if event.type == GestureType.PINCH and event.state == GestureState.START:
+                                hand.intent_owner = "TOOL"
+                                hand.tool_for(state.active_tool).on_event(event, smoothed_x, smoothed_y, state)
+                        
+                            else:
+                                # Hover / Global Gestures
+                                is_hovering_ui = (hit_ui_id is not None)
                             
-                            if not is_hovering_ui:
-                                if check_thumb_pinky_touch(hand_landmarks):
-                                    if state.color_change_start_time is None:
-                                        state.color_change_start_time = time.time()
-                                    elif time.time() - state.color_change_start_time >= state.color_change_duration:
-                                        state.using_vibgyor = True
-                                        state.current_color_index = (state.current_color_index + 1) % len(state.vibgyor_colors)
-                                        state.color_change_start_time = None
-                                else:
-                                    state.color_change_start_time = None
-
-                                # Safe to update cursor/tool
-                                state.active_tool.on_event(event, smoothed_x, smoothed_y, state)
+                                if not is_hovering_ui:
+                                    if check_thumb_pinky_touch(event):
+                                        if hand.color_change_start_time is None:
+                                            hand.color_change_start_time = time.time()
+                                        elif time.time() - hand.color_change_start_time >= state.color_change_duration:
+                                            state.using_vibgyor = True
+                                            state.current_color_index = (state.current_color_index + 1) % len(state.vibgyor_colors)
+                                            hand.color_change_start_time = None
+                                    else:
+                                        hand.color_change_start_time = None
+
+                                    # Safe to update cursor/tool
+                                    hand.tool_for(state.active_tool).on_event(event, smoothed_x, smoothed_y, state)
                             
-                    elif state.intent_owner == "TOOL":
-                        # Forward Pinch Events
-                        if event.type == GestureType.PINCH:
-                            state.active_tool.on_event(event, smoothed_x, smoothed_y, state)
-                            if event.state == GestureState.END:
-                                state.intent_owner = None
-
-                # 4. Draw Visual Feedback (Cursors, Overlays)
-                # Ensure cursor is drawn even if UI was triggered (for feedback)
-                state.active_tool.draw_overlay(canvas, smoothed_x, smoothed_y, state)
+                        elif hand.intent_owner == "TOOL":
+                            # Forward Pinch Events
+                            if event.type == GestureType.PINCH:
+                                hand.tool_for(state.active_tool).on_event(event, smoothed_x, smoothed_y, state)
+                                if event.state == GestureState.END:
+                                    hand.intent_owner = None
+
+                    # 4. Draw Visual Feedback (Cursors, Overlays)
+                    # The cursor is shown where the finger will be once this frame is on screen
+                    # (strokes stay at the smoothed position)
+                    hand.predictor.update(smoothed_x, smoothed_y, captured_at)
+                    cursor_x, cursor_y = hand.predictor.predict(state.hands.prediction_stats.latency, w, h)
+                    # Ensure cursor is drawn even if UI was triggered (for feedback)
+                    hand.tool_for(state.active_tool).draw_overlay(canvas, cursor_x, cursor_y, state)
 
                 # Freedom Selection Move visualization
                 if state.selected_region is not None:
@@ -1184,6 +1177,10 @@ def main():
             
             # Display the canvas
             cv2.imshow('Drawing Canvas', canvas)
+            # Capture-to-display latency, the lead of next frame's cursor prediction
+            stats = state.hands.prediction_stats
+            latency = time.time() - captured_at
+            stats.latency = 0.9 * stats.latency + 0.1 * latency if stats.latency else latency
 
             # Handle keyboard input
             key = cv2.waitKey(1) & 0xFF
@@ -1224,7 +1221,9 @@ def main():
                     state.complete_selection()
                     state.selecting = False
                 else:
-                    state.start_selection(state.smoother.last_x, state.smoother.last_y)
+                    primary = state.hands.primary()
+                    state.start_selection(primary.smoother.last_x if primary else None,
+                                          primary.smoother.last_y if primary else None)
 
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -1234,6 +1233,7 @@ def main():
         if 'cap' in locals():
             cap.release()
         cv2.destroyAllWindows()
+        print(state.hands.prediction_stats.summary())
 
 # Initialize MediaPipe Hands with Tasks API
 hands = None
@@ -1258,7 +1258,7 @@ try:
     base_options = python.BaseOptions(model_asset_path=model_path)
     options = vision.HandLandmarkerOptions(
         base_options=base_options,
-        num_hands=1,
+        num_hands=MAX_HANDS,
         min_hand_detection_confidence=0.6,
         min_hand_presence_confidence=0.6,
         min_tracking_confidence=0.6
@@ -1274,4 +1274,4 @@ state = State()
 if __name__ == "__main__":
     root = Tk()
     root.withdraw()
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else "0")
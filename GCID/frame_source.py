@@ -0,0 +1,27 @@
+"""
+Frame sources of the desktop app, shared with the backend
+(backend/app/core/sources.py): a camera, a video file, a directory of
+images or synthetic frames, each read() as (success, frame, timestamp).
+The desktop app plays recorded sources back in real time and stops at
+their end.
+"""
+import shared  # noqa: F401  (backend on the import path)
+from app.core.sources import (
+    CameraSource, FrameSource, ImageDirectorySource, SyntheticSource, VideoFileSource, open_source as _open_source,
+)
+
+__all__ = ["CameraSource", "FrameSource", "ImageDirectorySource", "SyntheticSource", "VideoFileSource",
+           "open_source"]
+
+
+def open_source(spec="0", paced=True, loop=False):
+    """
+    Build a source from a command-line style description: a camera index,
+    "synthetic", a directory of images or a video file. Raises ValueError
+    if it cannot be opened.
+    """
+    source = _open_source(str(spec), paced, loop)
+    if isinstance(source, CameraSource) and not source.cap.isOpened():
+        source.release()
+        raise ValueError(f"Could not open camera {spec}")
+    return source
@@ -3,6 +3,9 @@ import numpy as np
 import time
 from enum import Enum, IntEnum, auto
 
+from gesture_rules import DESKTOP_RULES, GestureClassifier, feature_vector
+from hand_features import HandFeatures, landmarks_to_array
+
 class GestureType(Enum):
     NO_HAND = auto()
     IDLE = auto()      # Hand detected but no specific intent
@@ -20,13 +23,15 @@ class GestureEvent:
     Represents a high-level user intent.
     Decouples 'what the hand is doing' from 'what the app triggers'.
     """
-    def __init__(self, gesture_type, state, x=0.0, y=0.0, landmarks=None):
+    def __init__(self, gesture_type, state, x=0.0, y=0.0, landmarks=None, features=None, gestures=()):
         self.type = gesture_type
         self.state = state
         self.x = x  # Normalized (0.0 - 1.0)
         self.y = y  # Normalized (0.0 - 1.0)
         self.time = time.time()
         self.landmarks = landmarks
+        self.features = features  # HandFeatures of the frame, reused by callers instead of re-reading landmarks
+        self.gestures = gestures  # names of every active rule in gesture_rules (e.g. "THUMB_PINKY")
 
     def __repr__(self):
         return f"Event({self.type.name}, {self.state.name}, x={self.x:.2f}, y={self.y:.2f})"
@@ -69,21 +74,18 @@ class GestureInterpreter:
     - Pinch is NOT cancelled by other fingers, jitter, or hand rotation
     """
     
-    def __init__(self):
+    def __init__(self, rules=DESKTOP_RULES, classifier=None, slot=()):
         self.current_gesture = GestureType.NO_HAND
         self.state_start_time = 0
         
         # --- Pinch Latching State Machine (FIX 1) ---
+        # Thresholds, hysteresis and release debounce live in the rule table (gesture_rules.py).
+        # A HandTracker passes its shared multi-hand classifier and this hand's slot in it.
+        self.rules = classifier if classifier is not None else GestureClassifier(rules)
+        self._slot = slot
+        self._pinch = self.rules.table.index("PINCH")
+        self._open_palm = self.rules.table.index("OPEN_PALM")
         self._pinch_latched = False
-        self._pinch_release_frames = 0  # Counter for consistent release detection
-        
-        # --- Configurable Thresholds (Normalized) ---
-        # Hysteresis for stable pinch detection
-        self.PINCH_ENTER_THRESH = 0.045   # Strict to enter pinch (tighter)
-        self.PINCH_EXIT_THRESH = 0.10     # Loose to exit pinch (more forgiving)
-        
-        # Debounce: Require consistent release for N frames before ending pinch
-        self.PINCH_RELEASE_FRAMES_REQUIRED = 3
         
         # Safety buffer for state switching
         self.min_state_duration = 0.05 # 50ms stability required
@@ -99,29 +101,43 @@ class GestureInterpreter:
         FIX 1: Implements proper pinch latching with debounce
         """
         if not hand_landmarks:
+            self.rules.reset(self._slot)
             # Hand lost - if we were pinching, send END event
             if self._pinch_latched:
                 self._pinch_latched = False
-                self._pinch_release_frames = 0
                 return GestureEvent(GestureType.PINCH, GestureState.END, 
                                    self._last_valid_x, self._last_valid_y)
             return self._transition_to(GestureType.NO_HAND, 0.0, 0.0)
 
-        # 1. Extract Key Coordinates using numeric indices
-        thumb_tip = hand_landmarks.landmark[HandLandmark.THUMB_TIP]
-        index_tip = hand_landmarks.landmark[HandLandmark.INDEX_FINGER_TIP]
+        # 1. One conversion to a (21, 3) array, all geometry in one vectorized pass
+        features = HandFeatures(landmarks_to_array(hand_landmarks))
+
+        # 2. Evaluate every rule of the table at once
+        self.rules.update(feature_vector(features))
+        return self.interpret(hand_landmarks, features)
 
-        # 2. Analyze Geometry
-        pinch_dist = np.sqrt((thumb_tip.x - index_tip.x)**2 + (thumb_tip.y - index_tip.y)**2)
-        is_palm_open = self._check_palm_open(hand_landmarks)
+    def interpret(self, hand_landmarks, features, points=None):
+        """
+        Steps 3-4 of process() for a hand whose features and rules were
+        already evaluated, e.g. by a HandTracker for all hands at once.
+        The cursor follows `points` ((21, 3), default features.points), so
+        features can come from filtered landmarks and the cursor from raw ones.
+        """
+        if points is None:
+            points = features.points
+        active = self.rules.active[self._slot]
+        pinching = bool(active[self._pinch])
+        gestures = self.rules.gestures(self._slot)
+        thumb_x, thumb_y = points[HandLandmark.THUMB_TIP, :2].tolist()
+        index_x, index_y = points[HandLandmark.INDEX_FINGER_TIP, :2].tolist()
         
         # Calculate cursor position (midpoint for pinch, index_tip otherwise)
-        if self._pinch_latched or pinch_dist < self.PINCH_ENTER_THRESH:
+        if self._pinch_latched or pinching:
             # Use midpoint for precision during pinch
-            target_x = (thumb_tip.x + index_tip.x) / 2
-            target_y = (thumb_tip.y + index_tip.y) / 2
+            target_x = (thumb_x + index_x) / 2
+            target_y = (thumb_y + index_y) / 2
         else:
-            target_x, target_y = index_tip.x, index_tip.y
+            target_x, target_y = index_x, index_y
         
         # Store last valid position for END events
         self._last_valid_x = target_x
@@ -129,61 +145,31 @@ class GestureInterpreter:
         
         # 3. Pinch State Machine (FIX 1: Latching with Debounce)
         if self._pinch_latched:
-            # Currently in pinch - check for release
-            if pinch_dist > self.PINCH_EXIT_THRESH:
-                self._pinch_release_frames += 1
-                
-                # Only end pinch after consistent release
-                if self._pinch_release_frames >= self.PINCH_RELEASE_FRAMES_REQUIRED:
-                    self._pinch_latched = False
-                    self._pinch_release_frames = 0
-                    return GestureEvent(GestureType.PINCH, GestureState.END, 
-                                       target_x, target_y, hand_landmarks)
-            else:
-                # Still pinching - reset release counter
-                self._pinch_release_frames = 0
+            # Only ends after the rule's consistent release frames
+            if not pinching:
+                self._pinch_latched = False
+                return GestureEvent(GestureType.PINCH, GestureState.END, 
+                                   target_x, target_y, hand_landmarks, features, gestures)
             
             # Continue pinch HOLD - this fires EVERY FRAME while pinched
             return GestureEvent(GestureType.PINCH, GestureState.HOLD, 
-                               target_x, target_y, hand_landmarks)
-        else:
-            # Not currently pinching - check for entry
-            if pinch_dist < self.PINCH_ENTER_THRESH:
-                self._pinch_latched = True
-                self._pinch_release_frames = 0
-                self.current_gesture = GestureType.PINCH
-                self.state_start_time = time.time()
-                return GestureEvent(GestureType.PINCH, GestureState.START, 
-                                   target_x, target_y, hand_landmarks)
+                               target_x, target_y, hand_landmarks, features, gestures)
+        elif pinching:
+            self._pinch_latched = True
+            self.current_gesture = GestureType.PINCH
+            self.state_start_time = time.time()
+            return GestureEvent(GestureType.PINCH, GestureState.START, 
+                               target_x, target_y, hand_landmarks, features, gestures)
         
         # 4. Non-pinch gesture detection (only when not latched)
         # FIX 3: OPEN_PALM does NOT trigger eraser - it's just detected for pause functionality
-        if is_palm_open:
-            return self._transition_to(GestureType.OPEN_PALM, target_x, target_y, hand_landmarks)
+        if active[self._open_palm]:
+            return self._transition_to(GestureType.OPEN_PALM, target_x, target_y, hand_landmarks, features, gestures)
         
         # Default: Pointing (cursor movement)
-        return self._transition_to(GestureType.POINTING, target_x, target_y, hand_landmarks)
-
-    def _check_palm_open(self, landmarks):
-        """
-        Checks if all fingers are extended relative to their PIP joints.
-        Used for 'Pause' gesture - NOT for erasing (FIX 3).
-        """
-        fingers = [
-            (HandLandmark.INDEX_FINGER_TIP, HandLandmark.INDEX_FINGER_PIP),
-            (HandLandmark.MIDDLE_FINGER_TIP, HandLandmark.MIDDLE_FINGER_PIP),
-            (HandLandmark.RING_FINGER_TIP, HandLandmark.RING_FINGER_PIP),
-            (HandLandmark.PINKY_TIP, HandLandmark.PINKY_PIP)
-        ]
-        
-        extended_count = 0
-        for tip_idx, pip_idx in fingers:
-            if landmarks.landmark[tip_idx].y < landmarks.landmark[pip_idx].y:
-                extended_count += 1
-                
-        return extended_count >= 4
+        return self._transition_to(GestureType.POINTING, target_x, target_y, hand_landmarks, features, gestures)
 
-    def _transition_to(self, new_gesture, x, y, landmarks=None):
+    def _transition_to(self, new_gesture, x, y, landmarks=None, features=None, gestures=()):
         """
         Manages state integrity. Ensures we send START/HOLD/END correctly.
         """
@@ -193,9 +179,9 @@ class GestureInterpreter:
             # Gesture changed - send START for new gesture
             self.current_gesture = new_gesture
             self.state_start_time = current_time
-            return GestureEvent(new_gesture, GestureState.START, x, y, landmarks)
+            return GestureEvent(new_gesture, GestureState.START, x, y, landmarks, features, gestures)
             
-        return GestureEvent(new_gesture, GestureState.HOLD, x, y, landmarks)
+        return GestureEvent(new_gesture, GestureState.HOLD, x, y, landmarks, features, gestures)
     
     def is_pinch_active(self):
         """Helper to check pinch latch status from external code."""
@@ -204,4 +190,4 @@ class GestureInterpreter:
     def force_end_pinch(self):
         """Force end pinch state (e.g., when tool is switched)."""
         self._pinch_latched = False
-        self._pinch_release_frames = 0
+        self.rules.clear("PINCH", self._slot)
@@ -0,0 +1,36 @@
+"""
+The desktop app's gesture table. Rules, their compiled RuleTable, the
+per-frame GestureClassifier (hysteresis and debounce, one or many hand
+slots) and the batch evaluate_sequence are shared with the backend
+(backend/app/core/gesture_rules.py); only the thresholds here are the
+desktop app's own.
+"""
+from hand_features import FEATURES, HandFeatures, feature_vector
+from app.core.gesture_rules import GestureClassifier, GestureRule, RuleTable, evaluate_sequence as _evaluate_sequence
+
+__all__ = ["DESKTOP_RULES", "FEATURES", "GestureClassifier", "GestureRule", "RuleTable",
+           "classify_recording", "evaluate_sequence", "feature_vector"]
+
+
+# The desktop app's gestures (GestureInterpreter and the color-cycle check)
+DESKTOP_RULES = [
+    # Strict to enter, forgiving to exit, 3 frames of release before the pinch ends
+    GestureRule("PINCH", "pinch_distance", below=True, enter=0.045, exit=0.10, exit_frames=3),
+    # Index to pinky extended, thumb ignored (pause gesture, NOT erasing)
+    GestureRule("OPEN_PALM", "fingers_extended", below=False, enter=3.5),
+    GestureRule("THUMB_PINKY", "thumb_pinky", below=True, enter=0.07),
+]
+
+
+def evaluate_sequence(vectors, rules=DESKTOP_RULES):
+    """
+    Batch version of GestureClassifier.update over (frames, ..., F)
+    feature vectors (e.g. a whole landmark recording). Returns
+    (frames, ..., rules) bool, identical to feeding the frames one by one.
+    """
+    return _evaluate_sequence(vectors, rules if isinstance(rules, RuleTable) else RuleTable(rules))
+
+
+def classify_recording(landmarks, rules=DESKTOP_RULES):
+    """(frames, 21, 3) landmarks -> (frames, rules) bool, for tuning rules offline."""
+    return evaluate_sequence(feature_vector(HandFeatures(landmarks)), rules)
@@ -0,0 +1,13 @@
+"""
+Landmark arrays and their geometric features, shared with the backend
+(backend/app/core/landmarks.py):
+
+    landmarks_to_array(hand)  one detected hand -> (21, 3) float32, once per detection
+    HandFeatures(points)      extended / curled / bend / pinch_distance / thumb_pinky
+                              of (..., 21, 3) landmarks in one vectorized pass
+    feature_vector(features)  -> (..., len(FEATURES)) columns compared by the rule table
+"""
+import shared  # noqa: F401  (backend on the import path)
+from app.core.landmarks import FEATURES, HandFeatures, feature_vector, to_array as landmarks_to_array
+
+__all__ = ["FEATURES", "HandFeatures", "feature_vector", "landmarks_to_array"]
@@ -0,0 +1,129 @@
+import copy
+import time
+
+import numpy as np
+
+import shared  # noqa: F401  (backend on the import path)
+# Palm-centre matching, the handedness vote and slot bookkeeping, shared with the backend
+from app.core.tracking import HandIdentities
+from gesture_interpreter import GestureInterpreter
+from gesture_rules import DESKTOP_RULES, FEATURES, GestureClassifier, feature_vector
+from hand_features import HandFeatures, landmarks_to_array
+from smoother import CursorPredictor, LandmarkFilter, PredictionStats, SpeedAdaptiveSmoother
+
+
+class TrackedHand:
+    """
+    One hand followed across frames, with everything that must not leak
+    between hands: its gesture latch (interpreter), cursor smoother and
+    predictor, who owns its pinch ("UI" / "TOOL"), its color-cycle timer
+    and its own instance of the active tool (so two hands never share a
+    stroke).
+    """
+    def __init__(self, hand_id, slot, interpreter, prediction_stats=None):
+        self.id = hand_id
+        self.slot = slot
+        self.interpreter = interpreter
+        self.handedness = None  # "Left" / "Right"
+        self.confidence = 1.0   # handedness score of the latest detection
+        self.smoother = SpeedAdaptiveSmoother(min_alpha=0.6, max_alpha=0.9, min_speed=50.0, max_speed=1000.0)
+        self.predictor = CursorPredictor(stats=prediction_stats)
+        self.intent_owner = None  # None, "UI", "TOOL"
+        self.color_change_start_time = None
+        self._tool = None
+        self._tool_source = None
+
+    def tool_for(self, active_tool):
+        """This hand's copy of the app's active tool, renewed whenever the tool changes."""
+        if self._tool_source is not active_tool:
+            self._tool_source = active_tool
+            self._tool = copy.deepcopy(active_tool)
+        return self._tool
+
+
+class HandTracker:
+    """
+    Follows up to `max_hands` hands with stable ids and handedness.
+
+    Detections are matched to the hands of the previous frame by the
+    backend's HandIdentities (palm centre distance up to `max_distance`,
+    handedness vote). Unmatched detections start a new hand; hands not
+    found again are dropped, and their last interpreter event
+    (process(None), i.e. PINCH END if they were pinching) is left in
+    `lost` so the caller can finish their tool's stroke or shape.
+
+    All landmarks of all hands are de-jittered by one LandmarkFilter
+    update (disable with smoothing=False) before one HandFeatures pass,
+    and the rule table is evaluated for every hand in one classifier
+    update; each hand's interpreter only runs its latch on the result.
+    The cursor still follows the raw landmarks (it has its own smoother).
+    """
+    def __init__(self, max_hands=2, max_distance=0.2, rules=DESKTOP_RULES, smoothing=True):
+        self.max_hands = max_hands
+        self.identities = HandIdentities(max_hands, max_distance)
+        self.classifier = GestureClassifier(rules, shape=(max_hands,))
+        self.filter = LandmarkFilter((max_hands, 21, 3)) if smoothing else None
+        self._slotted = np.zeros((max_hands, 21, 3), dtype=np.float32)
+        self.prediction_stats = PredictionStats()  # of every hand's CursorPredictor
+        self.hands = {}  # slot -> TrackedHand
+        self.lost = []  # [(TrackedHand, GestureEvent)] of the hands dropped by the latest update
+
+    def primary(self):
+        """The hand tracked the longest, or None."""
+        return min(self.hands.values(), key=lambda hand: hand.id, default=None)
+
+    def update(self, landmarks_list, handedness=(), timestamp=None):
+        """
+        Detected hands of one frame (MediaPipe hands or (21, 3) arrays),
+        their (label, score) handedness and the frame's capture time
+        (default now) -> [(TrackedHand, GestureEvent)], oldest hand first.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        landmarks_list = list(landmarks_list)[:self.max_hands]
+        handedness = list(handedness)
+        n = len(landmarks_list)
+        points = np.zeros((n, 21, 3), dtype=np.float32)
+        for i, hand_landmarks in enumerate(landmarks_list):
+            points[i] = landmarks_to_array(hand_landmarks)
+
+        slots = self._assign(points, handedness)
+
+        # One filter step, one feature pass and one rule update for every hand
+        smoothed = points
+        if self.filter is not None and n:
+            self._slotted[slots] = points
+            smoothed = self.filter.update(self._slotted, timestamp)[slots]
+        features = HandFeatures(smoothed)
+        vectors = np.full((self.max_hands, len(FEATURES)), np.nan, dtype=np.float32)
+        vectors[slots] = feature_vector(features)
+        self.classifier.update(vectors)
+
+        tracked = []
+        for i, slot in enumerate(slots):
+            hand = self.hands[slot]
+            # Keeps the last known side while the vote is undecided
+            hand.handedness = self.identities.handedness(hand.id) or hand.handedness
+            if i < len(handedness):
+                hand.confidence = handedness[i][1]
+            tracked.append((hand, hand.interpreter.interpret(landmarks_list[i], features[i], points[i])))
+        tracked.sort(key=lambda pair: pair[0].id)
+        return tracked
+
+    def _assign(self, points, handedness):
+        slots = self.identities.assign(points, handedness).tolist()
+        ids = self.identities.ids
+
+        self.lost = []
+        for slot in sorted(self.hands):
+            if ids[slot] != self.hands[slot].id:
+                hand = self.hands.pop(slot)
+                self.lost.append((hand, hand.interpreter.process(None)))
+        started = self.identities.started
+        self.classifier.reset(started)
+        if self.filter is not None:
+            self.filter.reset(started)
+        for slot in np.flatnonzero(started).tolist():
+            self.hands[slot] = TrackedHand(int(ids[slot]), slot, GestureInterpreter(
+                self.classifier.table, classifier=self.classifier, slot=slot), self.prediction_stats)
+        return slots
@@ -0,0 +1,74 @@
+import json
+import sys
+import time
+import numpy as np
+
+from gesture_interpreter import GestureInterpreter
+from hand_tracking import HandTracker
+
+
+class _Point:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+
+class ReplayLandmarks:
+    """Stands in for a MediaPipe hand: exposes .landmark[i].x / .y / .z."""
+    def __init__(self, points):
+        self.landmark = [_Point(float(x), float(y), float(z)) for x, y, z in points]
+
+
+def load_recording(path):
+    """
+    Load a landmark recording (.npz written by the backend's
+    app.core.recording): landmarks (frames, hands, 21, 3), ids,
+    timestamps, confidence, gestures, inferred and a JSON meta string.
+    """
+    with np.load(path) as data:
+        recording = {name: data[name] for name in data.files}
+    recording["meta"] = json.loads(str(recording["meta"]))
+    return recording
+
+
+def replay_hands(recording, hand=0):
+    """
+    Yield (timestamp, hand_landmarks or None) for every frame that went
+    through the hand model. Extrapolated frames only hold fingertips and
+    are skipped.
+    """
+    for points, timestamp, inferred in zip(recording["landmarks"], recording["timestamps"], recording["inferred"]):
+        if not inferred:
+            continue
+        if np.isnan(points[hand, 0, 0]):
+            yield float(timestamp), None
+        else:
+            yield float(timestamp), ReplayLandmarks(points[hand])
+
+
+def replay_tracker(recording, tracker=None):
+    """
+    Run a HandTracker over every hand of a recording; returns its
+    [(TrackedHand, GestureEvent)] list per inferred frame.
+    """
+    tracker = tracker or HandTracker(recording["landmarks"].shape[1])
+    frames = []
+    for points, timestamp, inferred in zip(recording["landmarks"], recording["timestamps"], recording["inferred"]):
+        if inferred:
+            frames.append(tracker.update([p for p in points if not np.isnan(p[0, 0])], (), float(timestamp)))
+    return frames
+
+
+def replay_interpreter(recording, interpreter=None):
+    """Run GestureInterpreter.process over a recording and return its events."""
+    interpreter = interpreter or GestureInterpreter()
+    return [interpreter.process(hand_landmarks) for _, hand_landmarks in replay_hands(recording)]
+
+
+if __name__ == "__main__":
+    recording = load_recording(sys.argv[1])
+    start = time.perf_counter()
+    events = replay_interpreter(recording)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {len(events)} frames in {elapsed:.3f}s ({len(events) / max(elapsed, 1e-9):.0f} frames/s)")
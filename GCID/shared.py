@@ -0,0 +1,14 @@
+"""
+Puts the backend directory on the import path. The landmark features,
+gesture rule table, landmark filter, cursor Kalman filter, hand identities
+and frame sources live in backend/app/core and are imported from there as
+`app.core.*` instead of being kept as copies that drift apart. Those
+modules only need NumPy and OpenCV; nothing else of the backend is loaded.
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "backend"))
+
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
@@ -2,6 +2,11 @@
 import time
 import math
 
+import shared  # noqa: F401  (backend on the import path)
+# One Euro filter over whole (..., 21, 3) landmark arrays and the cursor Kalman filter, shared with the backend
+from app.core.prediction import CursorTrack
+from app.core.smoothing import LandmarkFilter
+
 class SpeedAdaptiveSmoother:
     def __init__(self, min_alpha=0.1, max_alpha=0.9, min_speed=50.0, max_speed=1000.0):
         """
@@ -24,20 +29,21 @@ class SpeedAdaptiveSmoother:
         self.prev_smoothed_x = None
         self.prev_smoothed_y = None
 
-    def reset(self, x, y):
+    def reset(self, x, y, timestamp=None):
         """Snap to a position, confusing history."""
         self.last_x = x
         self.last_y = y
-        self.last_time = time.time()
+        self.last_time = time.time() if timestamp is None else timestamp
         self.prev_smoothed_x = x
         self.prev_smoothed_y = y
         return x, y
 
-    def update(self, x, y, canvas_w=None, canvas_h=None):
-        current_time = time.time()
+    def update(self, x, y, canvas_w=None, canvas_h=None, timestamp=None):
+        """Smooth a point seen at `timestamp` (capture time in seconds, default now)."""
+        current_time = time.time() if timestamp is None else timestamp
         
         if self.prev_smoothed_x is None:
-            return self.reset(x, y)
+            return self.reset(x, y, current_time)
             
         dt = current_time - self.last_time
         if dt <= 0:
@@ -93,3 +99,89 @@ class SpeedAdaptiveSmoother:
         self.prev_smoothed_y = smoothed_y
         
         return int(smoothed_x), int(smoothed_y)
+
+
+class PredictionStats:
+    """
+    Running totals of CursorPredictor, shared by every hand's predictor
+    so they outlive the hands: how far cursors were moved ahead, how often
+    that was clamped, and how far the predicted and the unpredicted cursor
+    each were from where the finger turned out to be.
+    """
+    def __init__(self):
+        self.predictions = 0
+        self.clamped = 0
+        self.lead_px = 0.0
+        self.scored = 0
+        self.error_predicted = 0.0
+        self.error_measured = 0.0
+        self.latency = 0.0  # seconds, capture to display, set by the app
+
+    def summary(self):
+        if not self.predictions:
+            return "Cursor prediction: no predictions"
+        n = max(self.scored, 1)
+        return (f"Cursor prediction: latency {self.latency * 1000:.0f} ms, "
+                f"mean lead {self.lead_px / self.predictions:.1f} px, "
+                f"{self.clamped / self.predictions:.0%} clamped, "
+                f"error {self.error_predicted / n:.1f} px predicted vs {self.error_measured / n:.1f} px unpredicted")
+
+
+class CursorPredictor:
+    """
+    Latency compensation for one cursor: a constant-velocity Kalman filter
+    (CursorTrack, shared with the backend) on its (smoothed) position,
+    extrapolated by the measured capture-to-display latency so the cursor
+    is drawn where the finger is by the time the frame is on screen. Only
+    the drawn cursor is predicted, never the stroke.
+
+    Extrapolation overshoots when the finger stops or turns, so the lead
+    is clamped: nothing below `min_speed` px/s, never farther than the last
+    measured motion reaches in the same time, at most `max_distance` px
+    and `max_lead` seconds, and inside the canvas.
+    """
+    def __init__(self, max_lead=0.15, max_distance=80.0, min_speed=60.0,
+                 process_noise=1e5, measurement_noise=4.0, stats=None):
+        self.max_lead = max_lead
+        self.max_distance = max_distance
+        self.min_speed = min_speed
+        self.process_noise = process_noise  # px^2/s^3, white-noise acceleration
+        self.measurement_noise = measurement_noise  # px^2
+        self.stats = stats if stats is not None else PredictionStats()
+        self.track = None  # CursorTrack once the first position is known
+
+    def update(self, x, y, timestamp=None):
+        """Feed the cursor position seen at `timestamp` (capture time, default now)."""
+        timestamp = time.time() if timestamp is None else timestamp
+        track = self.track
+        if track is None:
+            self.track = CursorTrack(timestamp, (x, y), self.measurement_noise)
+            return
+        if timestamp <= track.timestamp:
+            return
+        if track.pending is not None and timestamp >= track.pending[0]:
+            _, (px, py), (mx, my) = track.pending
+            self.stats.scored += 1
+            self.stats.error_predicted += math.hypot(px - x, py - y)
+            self.stats.error_measured += math.hypot(mx - x, my - y)
+            track.pending = None
+        track.correct(timestamp, (x, y), self.process_noise, self.measurement_noise)
+
+    def predict(self, lead, canvas_w=None, canvas_h=None):
+        """Cursor `lead` seconds after the last update, as int pixels."""
+        track = self.track
+        if track is None:
+            return None
+        lead = min(max(lead, 0.0), self.max_lead)
+        dx, dy, clamped = track.lead(lead, self.min_speed, self.max_distance)
+        if clamped:
+            self.stats.clamped += 1
+        self.stats.predictions += 1
+        self.stats.lead_px += math.hypot(dx, dy)
+        x, y = track.x + dx, track.y + dy
+        if canvas_w and canvas_h:
+            x = min(max(x, 0.0), canvas_w - 1.0)
+            y = min(max(y, 0.0), canvas_h - 1.0)
+        if track.pending is None and lead > 0:
+            track.pending = (track.timestamp + lead, (x, y), track.measured)
+        return int(round(x)), int(round(y))
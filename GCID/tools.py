@@ -112,6 +112,8 @@ class PenTool(Tool):
     def __init__(self):
         # Dedicated stroke smoother: Very smooth at low speed, responsive at high speed
         self.stroke_smoother = SpeedAdaptiveSmoother(min_alpha=0.1, max_alpha=0.8, min_speed=50.0, max_speed=2000.0)
+        # End of the stroke so far; on the tool, not the app state, so each hand's copy draws its own stroke
+        self.last_point = None
 
     def on_event(self, event, x, y, state):
         # FIX 2: Only react to PINCH gestures for drawing
@@ -125,27 +127,27 @@ class PenTool(Tool):
                 # Start of stroke - Reset smoother and Save Undo
                 state.save_state()
                 sx, sy = self.stroke_smoother.reset(raw_x, raw_y)
-                state.last_point = (sx, sy)
+                self.last_point = (sx, sy)
                 
             elif event.state == GestureState.HOLD:
                 # Continuous drawing - fires EVERY frame while pinched
                 sx, sy = self.stroke_smoother.update(raw_x, raw_y)
                 
-                if state.last_point:
-                    cmd = DrawStrokeCommand(state.last_point, (sx, sy), state.get_current_color(), state.default_thickness)
+                if self.last_point:
+                    cmd = DrawStrokeCommand(self.last_point, (sx, sy), state.get_current_color(), state.default_thickness)
                     cmd.execute(state)
-                    state.last_point = (sx, sy)
+                    self.last_point = (sx, sy)
                 else:
-                    state.last_point = (sx, sy)
+                    self.last_point = (sx, sy)
                     
             elif event.state == GestureState.END:
                 # Stroke completed - clear state
-                state.last_point = None
+                self.last_point = None
         else:
             # Non-pinch gesture (POINTING, OPEN_PALM, etc.) - just clear last_point
             # FIX 5: OPEN_PALM pauses drawing but doesn't cancel intent
             if event.state == GestureState.START:
-                state.last_point = None
+                self.last_point = None
 
     def draw_overlay(self, canvas, x, y, state):
         # Draw Pen Cursor - color indicates current drawing color
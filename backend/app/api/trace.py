@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+
+from app.core.tracing import TRACER
+
+router = APIRouter()
+
+@router.get("/trace")
+def trace_dump():
+    """Buffered spans as a Chrome/Perfetto trace (save as .json and open in ui.perfetto.dev)."""
+    return TRACER.export()
+
+@router.get("/trace/status")
+def trace_status():
+    return TRACER.stats()
+
+@router.post("/trace/start")
+def trace_start():
+    TRACER.clear()
+    TRACER.enable(True)
+    return TRACER.stats()
+
+@router.post("/trace/stop")
+def trace_stop():
+    TRACER.enable(False)
+    return TRACER.stats()
@@ -1,94 +1,310 @@
-from fastapi import APIRouter, WebSocket
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
 import asyncio
 import json
-from typing import Any
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
 
 from app.core.state import State
 from app.core.gesture_engine import GestureEngine
-from app.core.frame_processor import FrameProcessor
+from app.core.hub import get_hub
+from app.core.metrics import SESSIONS, STAGE_SECONDS
+from app.core.tracing import TRACER, set_frame
+from app.core.pipeline import FramePacket, Subscription
+from app.core.prediction import CursorPredictor
+from app.core.tracking import Landmarks, TrackedHand
+from app.models.message import StreamOptions
+from app.core.outbound import Message, OutboundChannel, websocket_sender
+from app.config import (
+    CANVAS_KEYFRAME_INTERVAL, CURSOR_MAX_LEAD, CURSOR_MAX_LEAD_PX, CURSOR_MIN_SPEED, CURSOR_PREDICTION,
+    CURSOR_PROCESS_NOISE,
+)
+from app.utils import framing
+from app.utils.encoding import bytes_to_base64
 
 router = APIRouter()
 
 
-async def _receive_commands(ws: WebSocket, state: State):
+async def _receive_commands(ws: WebSocket, state: State, outbound: OutboundChannel, frames: Subscription):
     """Background task that receives client messages and applies commands to state."""
     try:
         while True:
             msg = await ws.receive_text()
             try:
                 payload = json.loads(msg)
-            except Exception:
+            except ValueError:
+                continue
+            if not isinstance(payload, dict):
                 continue
 
-            if payload.get("type") == "command":
-                action = payload.get("action")
-                params = payload.get("params", {})
-
-                # Standard commands
-                if action == "undo":
-                    state.undo()
-                elif action == "redo":
-                    state.redo()
-                elif action == "new_page":
-                    state.add_new_page()
-                elif action == "erase_all":
-                    state.erase_all()
-                elif action == "set_tool":
-                    state.set_tool(params.get("tool"))
-                elif action == "set_color":
-                    state.set_color(tuple(params.get("color", state.color)))
-                elif action == "set_thickness":
-                    state.set_thickness(params.get("thickness", state.thickness))
-
-    except Exception:
-        # When client disconnects, receive loop will raise; we exit silently
+            if payload.get("type") == "ack":
+                seq = payload.get("seq")
+                if isinstance(seq, int) and not isinstance(seq, bool):
+                    outbound.ack(seq)
+
+            elif payload.get("type") == "command":
+                # A bad command is dropped on its own; the connection keeps taking commands
+                try:
+                    _apply_command(state, frames, payload.get("action"), payload.get("params") or {})
+                except Exception as e:
+                    print(f"Ignored command {payload.get('action')!r}:", e)
+
+    except WebSocketDisconnect:
+        # The client went away; the endpoint cleans up
         return
 
 
+def _apply_command(state: State, frames: Subscription, action: Any, params: Dict[str, Any]) -> None:
+    # Standard commands
+    if action == "undo":
+        state.undo()
+    elif action == "redo":
+        state.redo()
+    elif action == "new_page":
+        state.add_new_page()
+    elif action == "erase_all":
+        state.erase_all()
+    elif action == "set_tool":
+        state.set_tool(params.get("tool"))
+    elif action == "set_color":
+        state.set_color(tuple(params.get("color", state.color)))
+    elif action == "set_thickness":
+        state.set_thickness(params.get("thickness", state.thickness))
+    elif action == "request_keyframe":
+        state.request_keyframe()
+    elif action == "set_tracing":
+        enabled = bool(params.get("enabled", True))
+        if enabled and not TRACER.enabled:
+            TRACER.clear()
+        TRACER.enable(enabled)
+    elif action == "set_stream":
+        # The camera is chosen on connect; switching it would need another hub
+        params = {k: v for k, v in params.items() if k != "camera"}
+        frames.options = _stream_options(frames.options, params)
+        state.set_canvas_encoding(frames.options.canvas_codec, frames.options.jpeg_quality)
+
+
+def _negotiate_transport(ws: WebSocket) -> str:
+    """Pick the wire format for this connection: `?transport=binary` or JSON (default)."""
+    transport = ws.query_params.get("transport", "json")
+    return "binary" if transport == "binary" else "json"
+
+
+def _stream_options(current: StreamOptions, params: Dict[str, Any]) -> StreamOptions:
+    """Merge `params` into `current`; invalid values leave the options unchanged."""
+    fields = {k: v for k, v in params.items() if k in StreamOptions.model_fields}
+    try:
+        return StreamOptions(**{**current.model_dump(), **fields})
+    except ValidationError:
+        return current
+
+
+def _negotiate_camera(ws: WebSocket) -> Optional[int]:
+    """`?camera=N` picks one of the configured `CAMERAS` (default 0); None if it is not one."""
+    try:
+        return StreamOptions(camera=ws.query_params.get("camera", 0)).camera
+    except ValidationError:
+        return None
+
+
+def _negotiate_canvas_mode(ws: WebSocket) -> str:
+    """`?canvas=tiles` streams dirty canvas tiles and `?canvas=vector` stroke
+    operations; the default resends the full canvas."""
+    mode = ws.query_params.get("canvas", "full")
+    return mode if mode in ("tiles", "vector") else "full"
+
+
+def _with_cursors(packet: FramePacket, cursors: Dict[int, Tuple[int, int]]) -> Tuple[Landmarks, List[TrackedHand]]:
+    """The packet's landmarks with each hand's predicted "cursor" added (the packet is shared, so copies)."""
+    if not cursors:
+        return packet.landmarks, packet.hands
+    hands = [{**hand, "landmarks": {**hand["landmarks"], "cursor": cursors[hand["id"]]}}
+             if hand["id"] in cursors else hand for hand in packet.hands]
+    return (hands[0]["landmarks"] if hands else packet.landmarks), hands
+
+
+def _frame_message(transport: str, seq: int, packet: FramePacket, options: StreamOptions,
+                   cursors: Optional[Dict[int, Tuple[int, int]]] = None) -> Message:
+    # Clients that opted out of the camera image still get landmarks and gestures
+    variant = options.variant if options.frames else None
+    landmarks, hands = _with_cursors(packet, cursors)
+    if transport == "binary":
+        return framing.encode_frame(seq, packet.timestamp, packet.image(variant) or b"",
+                                    landmarks, packet.gestures, packet.image_format(options.variant), hands)
+    return {
+        "type": "frame",
+        "seq": seq,
+        "image": packet.image_base64(variant),
+        "format": packet.image_format(options.variant),
+        "landmarks": landmarks,
+        "gestures": packet.gestures,
+        "hands": hands,
+    }
+
+
+def _state_message(transport: str, seq: int, timestamp: float,
+                   state: State, include_canvas: bool) -> Message:
+    if transport == "binary":
+        canvas = state.get_canvas_image() if include_canvas else b""
+        return framing.encode_state(seq, timestamp, state.serialize(include_canvas=False), canvas,
+                                    state.canvas_format)
+    return {
+        "type": "state",
+        **state.serialize(include_canvas=include_canvas)
+    }
+
+
+def _ops_message(transport: str, seq: int, timestamp: float, ops) -> Message:
+    if transport == "binary":
+        return framing.encode_ops(seq, timestamp, ops)
+    return {"type": "ops", "ops": ops}
+
+
+def _patches_message(transport: str, seq: int, timestamp: float, patches, image_format: str) -> Message:
+    if transport == "binary":
+        return framing.encode_patches(seq, timestamp, patches, image_format)
+    return {
+        "type": "canvas_patch",
+        "format": image_format,
+        "tiles": [
+            {"x": x, "y": y, "w": w, "h": h, "image": bytes_to_base64(image)}
+            for x, y, w, h, image in patches
+        ],
+    }
+
+
+class _CanvasStream:
+    """Builds the state/canvas messages for one connection.
+
+    State only goes out when it changed since the last send. In tiles mode
+    only the dirty canvas tiles follow it and in vector mode the stroke
+    operations; both send a full keyframe when the whole canvas changed
+    (page, undo/redo, UI) and periodically for resync.
+    """
+
+    def __init__(self, state: State, transport: str, canvas_mode: str):
+        self.state = state
+        self.transport = transport
+        self.canvas_mode = canvas_mode
+        self.sent_version = -1
+        self.sent_meta = None
+        self.last_keyframe = 0.0
+        state.record_ops = canvas_mode == "vector"
+
+    def messages(self, seq: int, timestamp: float) -> List[Message]:
+        state, transport = self.state, self.transport
+        out = []
+
+        # Ops go out before any keyframe so the raster always lands on top
+        if self.canvas_mode == "vector":
+            ops = state.take_ops()
+            if ops:
+                out.append(_ops_message(transport, seq, timestamp, ops))
+
+        if self.canvas_mode != "full" and timestamp - self.last_keyframe >= CANVAS_KEYFRAME_INTERVAL:
+            state.request_keyframe()
+        if state.version == self.sent_version:
+            return out
+        self.sent_version = state.version
+
+        if self.canvas_mode != "full" and not state.tiles.all_dirty:
+            patches = state.get_canvas_patches() if self.canvas_mode == "tiles" else []
+            state.tiles.clear()
+            # Ink-only changes travel as patches/ops; skip the unchanged state
+            meta = state.serialize(include_canvas=False)
+            if meta != self.sent_meta:
+                self.sent_meta = meta
+                out.append(_state_message(transport, seq, timestamp, state, include_canvas=False))
+            if patches:
+                out.append(_patches_message(transport, seq, timestamp, patches, state.canvas_format))
+        else:
+            state.tiles.clear()
+            self.last_keyframe = timestamp
+            self.sent_meta = state.serialize(include_canvas=False)
+            out.append(_state_message(transport, seq, timestamp, state, include_canvas=True))
+        return out
+
+
 @router.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
+    camera = _negotiate_camera(ws)
+    if camera is None:
+        # Closing before accept rejects the handshake, so no hub or device is touched
+        await ws.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     await ws.accept()
+    transport = _negotiate_transport(ws)
+    seq = 0
 
     state = State()
     gesture_engine = GestureEngine(state)
-    processor = FrameProcessor()
+    canvas_stream = _CanvasStream(state, transport, _negotiate_canvas_mode(ws))
+    # The camera, hand model and frame encoding are shared by all
+    # connections; they run on worker threads so the event loop stays free
+    # for the receiver and the sends.
+    options = _stream_options(StreamOptions(), dict(ws.query_params))
+    state.set_canvas_encoding(options.canvas_codec, options.jpeg_quality)
+    hub = get_hub(camera)
+    try:
+        frames = await asyncio.to_thread(hub.subscribe, asyncio.get_running_loop(), options)
+    except Exception as e:
+        print("WebSocket closed:", e)
+        await ws.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+
+    # Sends are decoupled from production: stale frames are dropped when the
+    # client falls behind instead of queuing up latency.
+    outbound = OutboundChannel(websocket_sender(ws))
+    sender_task = asyncio.create_task(outbound.run())
+    session_id = SESSIONS.add(SimpleNamespace(state=state, outbound=outbound))
+    # The cursor is drawn one measured latency after capture; show it where the finger will be by then
+    predictor = CursorPredictor((850, 550), CURSOR_MAX_LEAD, CURSOR_MAX_LEAD_PX, CURSOR_MIN_SPEED,
+                                CURSOR_PROCESS_NOISE) if CURSOR_PREDICTION else None
 
     # Start receiver task
-    receiver_task = asyncio.create_task(_receive_commands(ws, state))
+    receiver_task = asyncio.create_task(_receive_commands(ws, state, outbound, frames))
 
     try:
-        while True:
-            frame_b64, landmarks, gestures = processor.read_frame()
+        while not sender_task.done():
+            packet = await frames.next_packet()
+            set_frame(packet.trace_id)
+            if predictor is not None:
+                predictor.update(packet.timestamp, packet.hands)
 
-            if frame_b64 is None:
-                break
+            # Apply gestures to state (also on the frame the last hand is lost, to end its stroke)
+            if packet.hands or gesture_engine.tracking:
+                with STAGE_SECONDS.time(stage="gesture"), TRACER.span("gesture"):
+                    gesture_engine.process(packet.gestures, packet.landmarks, packet.hands, packet.timestamp)
 
-            # Apply gestures to state
-            if gestures or landmarks:
-                gesture_engine.process(gestures, landmarks)
+            # Gestures run on every frame; sends are capped at the client's max_fps
+            if not frames.frame_due(packet.timestamp):
+                continue
+            frames.mark_sent(packet.timestamp)
 
-            # Send frame + lightweight state
-            await ws.send_json({
-                "type": "frame",
-                "image": frame_b64,
-                "landmarks": landmarks,
-                "gestures": gestures,
-            })
+            with TRACER.span("frame_message"):
+                cursors = predictor.predict(outbound.latency) if predictor is not None else None
+                message = _frame_message(transport, seq, packet, frames.options, cursors)
+            outbound.offer_frame(seq, packet.timestamp, message, packet.trace_id)
 
-            await ws.send_json({
-                "type": "state",
-                **state.serialize()
-            })
+            # Canvas updates coalesce in State until the previous ones are out
+            if not outbound.busy:
+                with STAGE_SECONDS.time(stage="canvas"), TRACER.span("canvas"):
+                    messages = canvas_stream.messages(seq, packet.timestamp)
+                for message in messages:
+                    outbound.push(message)
+            seq += 1
 
-            await asyncio.sleep(1 / 30)
+        sender_task.result()
 
     except Exception as e:
         print("WebSocket closed:", e)
 
     finally:
+        SESSIONS.remove(session_id)
         receiver_task.cancel()
-        processor.release()
-        processor.release()
+        sender_task.cancel()
+        await asyncio.to_thread(hub.unsubscribe, frames)
         try:
             await ws.close()
         except RuntimeError:
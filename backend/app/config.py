@@ -1,3 +1,65 @@
-FRAME_WIDTH = 1280
-FRAME_HEIGHT = 720
-FPS = 30
+import os
+
+# Camera capture, requested from the driver (unsupported settings are ignored by it)
+CAPTURE_FOURCC = "MJPG"     # compressed transfer allows higher fps over USB; "" = driver default
+CAPTURE_WIDTH = 960         # native resolution close to the 850x550 processing size
+CAPTURE_HEIGHT = 540
+CAPTURE_FPS = 30
+CAPTURE_BUFFER_SIZE = 1     # frames queued in the driver; 0 = driver default
+CAPTURE_THREADED = True     # read the device on its own thread, keeping only the newest frame
+
+# Canvas delta streaming (?canvas=tiles)
+CANVAS_TILE_SIZE = 64
+CANVAS_KEYFRAME_INTERVAL = 10.0  # seconds between periodic full-canvas resyncs
+
+# Outbound backpressure
+MAX_FRAME_AGE = 0.25  # seconds; older camera frames are dropped instead of sent
+ACK_WINDOW = 2        # unacknowledged frames in flight for clients that send acks
+ACK_TIMEOUT = 1.0     # seconds without acks before the window is reopened
+
+# Processed frames kept for reuse per camera pipeline (frames in flight between analyze and encode)
+PREPROCESS_BUFFERS = 4
+
+# Hands tracked at once, each with its own identity, gesture state and stroke
+MAX_HANDS = 2
+HAND_MATCH_DISTANCE = 0.2  # normalized palm-centre movement between inferences still counted as the same hand
+
+# One Euro landmark smoothing (app.core.smoothing): cutoff = MIN_CUTOFF + BETA * speed, in Hz
+LANDMARK_SMOOTHING = True
+LANDMARK_MIN_CUTOFF = 1.0   # Hz at rest; lower = less jitter
+LANDMARK_BETA = 20.0        # cutoff increase per frame-size/s of speed; higher = less lag while moving
+
+# Predicted cursor (app.core.prediction): shown where the fingertip will be after the measured latency
+CURSOR_PREDICTION = True
+CURSOR_MAX_LEAD = 0.15          # seconds; latency beyond this is not compensated
+CURSOR_MAX_LEAD_PX = 80.0       # farthest the cursor is moved ahead of the measured fingertip
+CURSOR_MIN_SPEED = 60.0         # px/s; slower fingertips are not extrapolated (jitter, not motion)
+CURSOR_PROCESS_NOISE = 1e5      # px^2/s^3; higher follows turns faster, overshoots stops more
+
+# Inference stride: run the hand model every Nth frame and extrapolate in between
+INFERENCE_STRIDE = 2
+INFERENCE_MAX_SPEED = 900.0  # px/s; faster fingertips force inference on every frame
+INFERENCE_PINCH_GUARD = 0.09  # normalized thumb-index distance; closer forces inference
+
+# ROI-cropped inference: after a detection, the hand model only sees a crop around the hand
+ROI_ENABLED = True
+ROI_MARGIN = 0.6            # crop padding as a fraction of the hand box size
+ROI_LOOKAHEAD = 0.1         # seconds of hand motion added to the padding
+ROI_MIN_SIZE = 192          # px; smallest crop side
+ROI_FULL_SEARCH_INTERVAL = 30  # inferences between full-frame searches
+
+# Hand inference worker processes (0 = run the model inside the server process)
+INFERENCE_WORKERS = 0
+INFERENCE_TIMEOUT = 2.0  # seconds before a stalled worker is restarted
+INFERENCE_BATCH_WINDOW = 0.004  # seconds to gather frames from other streams into one batch (0 = off)
+INFERENCE_MAX_BATCH = 8         # frames per batch; a full batch flushes immediately
+
+# Camera indices clients may select with ?camera=N; each one opens its own device and pipeline
+CAMERAS = [0]
+
+# Replaces camera 0 when set: a camera index, "synthetic", a video file or an image directory
+FRAME_SOURCE = os.environ.get("GCID_FRAME_SOURCE")
+
+# Per-frame tracing (toggle at runtime via /trace/start or the set_tracing command)
+TRACE_ENABLED = False
+TRACE_BUFFER_SIZE = 50000  # spans kept in the ring buffer
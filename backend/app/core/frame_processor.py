@@ -1,7 +1,22 @@
 import cv2
+import time
 import numpy as np
-from typing import Tuple, Dict, List
-from app.utils.encoding import frame_to_base64
+from typing import Tuple, Dict, List, Optional
+from app.config import (
+    MAX_HANDS, HAND_MATCH_DISTANCE, INFERENCE_STRIDE, INFERENCE_MAX_SPEED, INFERENCE_PINCH_GUARD, PREPROCESS_BUFFERS,
+    LANDMARK_SMOOTHING, LANDMARK_MIN_CUTOFF, LANDMARK_BETA, ROI_ENABLED, ROI_MARGIN, ROI_LOOKAHEAD, ROI_MIN_SIZE, ROI_FULL_SEARCH_INTERVAL,
+)
+from app.core.gesture_rules import GestureClassifier, classify
+from app.core.landmarks import (
+    FEATURES, bounding_box, feature_vector, fingertip_pixels, handedness, hands_array, to_array, uncrop,
+)
+from app.core.metrics import INFERENCE_SECONDS, STAGE_SECONDS
+from app.core.preprocess import Preprocessor
+from app.core.smoothing import LandmarkFilter
+from app.core.tracing import TRACER, current_frame, next_frame_id, set_frame
+from app.core.sources import CameraSource, FrameSource
+from app.core.tracking import HandIdentities, HandROI, LandmarkExtrapolator, Landmarks, TrackedHand
+from app.utils.encoding import encode_frame
 
 # mediapipe is optional for the server to start; gracefully degrade if not available
 try:
@@ -9,22 +24,70 @@ try:
 except Exception:
     mp = None
 
+# Shown while the camera fails; built once and never written to
+_PLACEHOLDER = np.zeros((480, 640, 3), dtype=np.uint8)
+cv2.putText(_PLACEHOLDER, "Camera Error", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+_PLACEHOLDER.flags.writeable = False
+
 
 class FrameProcessor:
     """Read frames from camera, run MediaPipe hands and detect simple gestures.
 
-    read_frame() -> Tuple[str, Dict[str, Tuple[float,float]], List[str]]
-    returns (base64_frame, landmarks_dict, gestures_list)
-    """
+    read_frame() -> Tuple[bytes, Dict[str, Tuple[float,float]], List[str]]
+    returns (jpeg_bytes, landmarks_dict, gestures_list)
+
+    Up to `MAX_HANDS` hands are tracked, each with a stable id, its
+    handedness and its own gesture hysteresis (`HandIdentities`).
+    `analyze()` also returns them all as a list of tracked hands, oldest
+    first; the landmarks and gestures it returns are those of the first.
+
+    The work is split into `capture()`, `analyze()` and `encode()` so the
+    stages can run concurrently (see `app.core.pipeline.FramePipeline`);
+    `read_frame()` simply runs them back to back.
+
+    With `inference_stride` N > 1 the hand model only runs on every Nth
+    frame (more often on fast motion or near a pinch); the frames in
+    between get extrapolated landmarks, see `LandmarkExtrapolator`. Once
+    a hand is found the model only sees a crop around it (`HandROI`).
 
-    def __init__(self, camera_index: int = 0):
-        self.cap = cv2.VideoCapture(camera_index)
+    Detected landmarks of all hands are smoothed together, per identity
+    slot and by capture time (`LandmarkFilter`), before gestures and
+    fingertips are derived from them, and recorded as smoothed so a replay
+    sees the same landmarks.
 
-        if mp is not None:
+    Given a `pool` (an `InferencePool` or `InferenceScheduler`), the hand
+    model runs in a worker process instead of this one. Frames come from
+    the camera unless another `source` (video, images, synthetic) is given.
+
+    Frames returned by `analyze()` come from a small buffer pool; pass them
+    to `recycle()` once encoded so the next frames reuse the memory.
+    """
+
+    def __init__(self, camera_index: int = 0, inference_stride: int = INFERENCE_STRIDE,
+                 pool=None, source: Optional[FrameSource] = None):
+        self.source = source or CameraSource(camera_index)
+        self.pool = pool
+        self.recorder = None  # LandmarkRecorder receiving every analyzed frame
+        self.identities = HandIdentities(MAX_HANDS, HAND_MATCH_DISTANCE)
+        # Hysteresis/debounce state across inferred frames, one row per identity slot
+        self.gesture_rules = GestureClassifier(shape=(MAX_HANDS,))
+        self.smoother = LandmarkFilter((MAX_HANDS, 21, 3), LANDMARK_MIN_CUTOFF,
+                                       LANDMARK_BETA) if LANDMARK_SMOOTHING else None
+        self._slotted = np.zeros((MAX_HANDS, 21, 3), dtype=np.float32)
+        self.preprocess = Preprocessor((850, 550), PREPROCESS_BUFFERS)
+        self.tracker = LandmarkExtrapolator(inference_stride, INFERENCE_MAX_SPEED,
+                                            INFERENCE_PINCH_GUARD, (850, 550))
+        self.roi = HandROI((850, 550), ROI_MARGIN, ROI_LOOKAHEAD,
+                           ROI_MIN_SIZE, ROI_FULL_SEARCH_INTERVAL, MAX_HANDS) if ROI_ENABLED else None
+
+        if mp is not None and pool is not None:
+            self.mp_hands = mp.solutions.hands
+            self.hands = None
+        elif mp is not None:
             try:
                 self.mp_hands = mp.solutions.hands
                 self.hands = self.mp_hands.Hands(
-                    max_num_hands=1,
+                    max_num_hands=MAX_HANDS,
                     min_detection_confidence=0.6,
                     min_tracking_confidence=0.6
                 )
@@ -36,107 +99,139 @@ class FrameProcessor:
             self.mp_hands = None
             self.hands = None
 
-    # --- simple gesture detectors ---
-    @staticmethod
-    def _is_palm_open(hand_landmarks) -> bool:
-        try:
-            tips = [
-                hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_TIP],
-                hand_landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP],
-                hand_landmarks.landmark[self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP],
-                hand_landmarks.landmark[self.mp_hands.HandLandmark.RING_FINGER_TIP],
-                hand_landmarks.landmark[self.mp_hands.HandLandmark.PINKY_TIP],
-            ]
-            # fingertips are above their respective tip-2 landmarks in an open palm
-            return all(tip.y < hand_landmarks.landmark[idx - 2].y for idx, tip in [
-                (self.mp_hands.HandLandmark.THUMB_TIP, tips[0]),
-                (self.mp_hands.HandLandmark.INDEX_FINGER_TIP, tips[1]),
-                (self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP, tips[2]),
-                (self.mp_hands.HandLandmark.RING_FINGER_TIP, tips[3]),
-                (self.mp_hands.HandLandmark.PINKY_TIP, tips[4]),
-            ])
-        except Exception:
-            return False
-
-    @staticmethod
-    def _thumb_pinky_touch(hand_landmarks) -> bool:
-        thumb = hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_TIP]
-        pinky = hand_landmarks.landmark[self.mp_hands.HandLandmark.PINKY_TIP]
-        d = np.sqrt((thumb.x - pinky.x) ** 2 + (thumb.y - pinky.y) ** 2 + (thumb.z - pinky.z) ** 2)
-        return d < 0.08
-
-    @staticmethod
-    def _is_pinch(hand_landmarks) -> bool:
-        thumb = hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_TIP]
-        index = hand_landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
-        d = np.sqrt((thumb.x - index.x) ** 2 + (thumb.y - index.y) ** 2)
-        return d < 0.06
-
-    @staticmethod
-    def _is_fist(hand_landmarks) -> bool:
-        # simplified heuristic: fingertip y greater (lower) than pip for fingers
-        tips = [
-            hand_landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP],
-            hand_landmarks.landmark[self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP],
-            hand_landmarks.landmark[self.mp_hands.HandLandmark.RING_FINGER_TIP],
-            hand_landmarks.landmark[self.mp_hands.HandLandmark.PINKY_TIP],
-        ]
-        try:
-            return all(tip.y > hand_landmarks.landmark[i - 2].y for i, tip in [
-                (self.mp_hands.HandLandmark.INDEX_FINGER_TIP, tips[0]),
-                (self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP, tips[1]),
-                (self.mp_hands.HandLandmark.RING_FINGER_TIP, tips[2]),
-                (self.mp_hands.HandLandmark.PINKY_TIP, tips[3]),
-            ])
-        except Exception:
-            return False
-
-    def _landmarks_dict(self, hand_landmarks, img_w: int, img_h: int) -> Dict[str, Tuple[int, int]]:
-        d = {}
-        for name in [
-            'THUMB_TIP', 'INDEX_FINGER_TIP', 'MIDDLE_FINGER_TIP', 'RING_FINGER_TIP', 'PINKY_TIP'
-        ]:
-            lm = hand_landmarks.landmark[getattr(self.mp_hands.HandLandmark, name)]
-            d[name.lower()] = (int(lm.x * img_w), int(lm.y * img_h))
-        return d
-
-    def read_frame(self) -> Tuple[str, Dict[str, Tuple[int, int]], List[str]]:
-        success, frame = self.cap.read()
+    def classify(self, hand_landmarks) -> List[str]:
+        """Gesture names of one hand's landmarks (a (21, 3) array or a MediaPipe hand), ignoring
+        the hysteresis and debounce state that `analyze()` applies."""
+        return classify(to_array(hand_landmarks))
+
+    def capture(self) -> Tuple[bool, np.ndarray, float]:
+        """Grab the next camera frame -> (success, frame, capture_time)."""
+        success, frame, timestamp = self.source.read()
         if not success:
-            # Create a black placeholder image (480x640)
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            cv2.putText(frame, "Camera Error", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+            frame = _PLACEHOLDER
             # return None, {}, []  <-- Don't disconnect
-
-
-        frame = cv2.flip(frame, 1)
-        # Resize to match canvas size (850x550)
-        frame = cv2.resize(frame, (850, 550))
+        return success, frame, timestamp
+
+    def analyze(self, frame: np.ndarray, timestamp: Optional[float] = None
+                ) -> Tuple[np.ndarray, Landmarks, List[str], List[TrackedHand]]:
+        """Mirror and resize a raw frame, then run hand tracking on it.
+
+        Returns (frame, landmarks, gestures, hands): the fingertips and
+        gestures of the first tracked hand, and every tracked hand.
+        """
+        start = time.perf_counter_ns()
+        # Mirror and resize to match canvas size (850x550)
+        frame = self.preprocess.mirror_resize(frame)
         h, w, _ = frame.shape
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        if self.hands:
+        if timestamp is None:
+            timestamp = time.time()
+        if self.mp_hands and not self.tracker.should_infer():
+            _stage_done("preprocess", start)
+            hands = self._tracked_hands(*self.tracker.predict(timestamp))
+            landmarks, gestures = _first_hand(hands)
+            if self.recorder is not None:
+                self.recorder.add_tracked(timestamp, hands)
+            return frame, landmarks, gestures, hands
+
+        region = self.roi.region() if self.roi else None
+        if region:
+            rx, ry, rw, rh = region
+            rgb = self.preprocess.to_rgb(frame[ry:ry + rh, rx:rx + rw])
+        else:
+            rgb = self.preprocess.to_rgb(frame)
+        inference_start = _stage_done("preprocess", start)
+        labels = []
+        if self.pool is not None and self.mp_hands:
+            points, labels = self.pool.detect(rgb, stream=self)
+        elif self.hands:
             results = self.hands.process(rgb)
+            points = hands_array(results.multi_hand_landmarks)
+            labels = handedness(getattr(results, "multi_handedness", None))
         else:
-            results = type('obj', (object,), {'multi_hand_landmarks': None})
+            points = hands_array(None)
+        if self.mp_hands:
+            INFERENCE_SECONDS.observe((_stage_done("inference", inference_start) - inference_start) / 1e9)
+
+        if region and len(points):
+            points = uncrop(points, region, (w, h))
+
+        # One filter step, one feature pass and one classifier update for all hands, in identity slots
+        slots = self.identities.assign(points, labels)
+        self.gesture_rules.reset(self.identities.started)
+        found = np.flatnonzero(slots >= 0)
+        smoothed = points
+        if self.smoother is not None and len(found):
+            self.smoother.reset(self.identities.started)
+            self._slotted[slots[found]] = points[found]
+            smoothed = points.copy()
+            smoothed[found] = self.smoother.update(self._slotted, timestamp)[slots[found]]
+        features = np.full((self.identities.slots, len(FEATURES)), np.nan, dtype=np.float32)
+        features[slots[found]] = feature_vector(smoothed[found])
+        active = self.gesture_rules.update(features)
+
+        tips, gestures_by_hand = {}, {}
+        for i in found:
+            hand_id = int(self.identities.ids[slots[i]])
+            tips[hand_id] = fingertip_pixels(smoothed[i], w, h)
+            gestures_by_hand[hand_id] = self.gesture_rules.table.gestures(active[slots[i]])
+        hands = self._tracked_hands(tips, gestures_by_hand)
+        landmarks, gestures = _first_hand(hands)
+
+        if self.roi:
+            # One crop around all hands, only once every slot is tracked and they fit in it
+            self.roi.update(timestamp, bounding_box(points[found].reshape(-1, 3), w, h) if len(found) else None,
+                            len(found))
+        self.tracker.update(timestamp, tips, gestures_by_hand)
+        if self.recorder is not None:
+            order = found[np.argsort(self.identities.ids[slots[found]])]
+            ids = self.identities.ids[slots[order]]
+            confidence = [labels[i][1] for i in order] if len(labels) == len(points) else None
+            self.recorder.add(timestamp, smoothed[order], [gestures_by_hand[int(i)] for i in ids], ids, confidence)
+        return frame, landmarks, gestures, hands
+
+    def _tracked_hands(self, tips: Dict[int, Landmarks], gestures: Dict[int, List[str]]) -> List[TrackedHand]:
+        return [
+            {"id": hand_id, "handedness": self.identities.handedness(hand_id),
+             "landmarks": tips[hand_id], "gestures": gestures.get(hand_id, [])}
+            for hand_id in sorted(tips)
+        ]
+
+    def encode(self, frame: np.ndarray, size: Optional[Tuple[int, int]] = None,
+               quality: Optional[int] = None, codec: str = "jpeg") -> bytes:
+        """Encode a processed frame with `codec`, optionally scaled to `size` (w, h)."""
+        if size and (frame.shape[1], frame.shape[0]) != tuple(size):
+            frame = cv2.resize(frame, tuple(size), interpolation=cv2.INTER_AREA)
+        return encode_frame(frame, codec, quality)
+
+    def recycle(self, frame: Optional[np.ndarray]) -> None:
+        """Hand a frame returned by `analyze()` back for reuse; it must not be used afterwards."""
+        self.preprocess.buffers.release(frame)
+
+    def read_frame(self) -> Tuple[bytes, Dict[str, Tuple[int, int]], List[str]]:
+        set_frame(next_frame_id())
+        with TRACER.span("capture"):
+            _, frame, timestamp = self.capture()
+        with TRACER.span("analyze"):
+            frame, landmarks, gestures, _ = self.analyze(frame, timestamp)
+        with TRACER.span("encode"):
+            image = self.encode(frame)
+        self.recycle(frame)
+        return image, landmarks, gestures
 
-        gestures = []
-        landmarks = {}
+    def release(self):
+        self.source.release()
+        if self.pool is not None:
+            self.pool.release(self)
 
-        if results.multi_hand_landmarks:
-            hand_landmarks = results.multi_hand_landmarks[0]
-            landmarks = self._landmarks_dict(hand_landmarks, w, h)
 
-            if self._is_palm_open(hand_landmarks):
-                gestures.append("OPEN_PALM")
-            if self._is_fist(hand_landmarks):
-                gestures.append("FIST")
-            if self._thumb_pinky_touch(hand_landmarks):
-                gestures.append("THUMB_PINKY")
-            if self._is_pinch(hand_landmarks):
-                gestures.append("PINCH")
+def _first_hand(hands: List[TrackedHand]) -> Tuple[Landmarks, List[str]]:
+    return (hands[0]["landmarks"], hands[0]["gestures"]) if hands else ({}, [])
 
-        encoded = frame_to_base64(frame)
-        return encoded, landmarks, gestures
 
-    def release(self):
-        self.cap.release()
+def _stage_done(stage: str, start_ns: int) -> int:
+    """Record a stage that started at `start_ns` in metrics and the trace; returns the end time."""
+    end_ns = time.perf_counter_ns()
+    STAGE_SECONDS.observe((end_ns - start_ns) / 1e9, stage=stage)
+    if TRACER.enabled:
+        TRACER.record(stage, start_ns, end_ns - start_ns, current_frame())
+    return end_ns
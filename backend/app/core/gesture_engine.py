@@ -1,48 +1,92 @@
-from typing import List, Dict, Tuple
+from typing import Any, List, Dict, Optional, Tuple
 import time
-import math
+
+
+class _Hand:
+    """What the engine remembers about one tracked hand between frames."""
+
+    __slots__ = ("pinching", "last_click_time")
+
+    def __init__(self):
+        self.pinching = False
+        self.last_click_time = float("-inf")
+
 
 class GestureEngine:
+    """Turns gestures and fingertips into state changes.
+
+    Each tracked hand (see `FrameProcessor.analyze`) has its own pinch
+    state, click cooldown and stroke, so one hand can draw while another
+    presses buttons, or two people can draw on one board.
+    """
+
     def __init__(self, state):
         self.state = state
-        self.last_click_time = 0
         self.click_cooldown = 0.5
         self.W, self.H = state.CANVAS_SIZE[:2] # 850, 550
         # Swap W, H because cv2 shape is (H, W) -> (550, 850)
         self.H, self.W = 550, 850
+        self._hands: Dict[int, _Hand] = {}
+
+    @property
+    def tracking(self) -> bool:
+        """Hands are being followed; keep calling `process` so their loss ends their strokes."""
+        return bool(self._hands)
 
-    def _is_clicked(self, landmarks, x1, y1, x2, y2):
+    def _is_clicked(self, hand: _Hand, now: float, landmarks, x1, y1, x2, y2):
         """Check if index finger is in box and we are pinching (click)."""
         idx = landmarks.get('index_finger_tip')
-        thumb = landmarks.get('thumb_tip')
         
-        if not idx or not thumb: return False
+        if not idx: return False
         
         # Check if index finger is inside bounds
         ix, iy = idx
         if not (x1 <= ix <= x2 and y1 <= iy <= y2):
             return False
 
-        # Check pinch (distance between thumb and index)
-        dist = math.sqrt((ix - thumb[0])**2 + (iy - thumb[1])**2)
-        if dist < 40: # Threshold in pixels
-            if time.time() - self.last_click_time > self.click_cooldown:
-                self.last_click_time = time.time()
+        # Pinch state comes from the gesture rule table (hysteresis included), see app.core.gesture_rules
+        if hand.pinching:
+            if now - hand.last_click_time > self.click_cooldown:
+                hand.last_click_time = now
                 return True
         return False
 
-    def process(self, gestures: List[str], landmarks: Dict[str, Tuple[int, int]]):
-        """Process gestures and landmarks for UI interaction."""
+    def process(self, gestures: List[str], landmarks: Dict[str, Tuple[int, int]],
+                hands: Optional[List[Dict[str, Any]]] = None, timestamp: Optional[float] = None):
+        """Process gestures and landmarks for UI interaction.
+
+        `hands` lists every tracked hand ({"id", "landmarks", "gestures"});
+        without it `gestures` and `landmarks` are one hand. Hands missing
+        from a call are forgotten and their strokes ended. Click cooldowns
+        run on `timestamp` (the frame's capture time, default now), so a
+        replay clicks exactly as the live session did.
+        """
+        now = time.time() if timestamp is None else timestamp
+        if hands is None:
+            hands = [{"id": 0, "landmarks": landmarks, "gestures": gestures}] if gestures or landmarks else []
+        seen = set()
+        for tracked in hands:
+            seen.add(tracked["id"])
+            self._process_hand(tracked["id"], tracked["gestures"], tracked["landmarks"], now)
+        for hand_id in [h for h in self._hands if h not in seen]:
+            self.state.end_stroke(hand_id)
+            del self._hands[hand_id]
+
+    def _process_hand(self, hand_id: int, gestures: List[str], landmarks: Dict[str, Tuple[int, int]], now: float):
+        hand = self._hands.get(hand_id)
+        if hand is None:
+            hand = self._hands[hand_id] = _Hand()
+        hand.pinching = "PINCH" in gestures
         
         # 1. UI Interactions (if landmarks available)
         if landmarks:
             # Control Panel Button (C)
             # x, y, w, h = 20, 550-70, 40, 40 -> y = 480
-            if self._is_clicked(landmarks, 20, 480, 60, 520):
-                self.state.control_panel_visible = not self.state.control_panel_visible
+            if self._is_clicked(hand, now, landmarks, 20, 480, 60, 520):
+                self.state.toggle_control_panel()
                 
             # Drawing Mode Button (D) - y = 550-190 = 360
-            if self._is_clicked(landmarks, 20, 360, 60, 400):
+            if self._is_clicked(hand, now, landmarks, 20, 360, 60, 400):
                 # Toggle logic: simple tool switch for now
                 if self.state.tool == 'pen': 
                     self.state.set_tool('eraser')
@@ -50,24 +94,24 @@ class GestureEngine:
                     self.state.set_tool('pen')
 
             # Erase All (EA) - y = 550-130 = 420
-            if self._is_clicked(landmarks, 20, 420, 60, 460):
+            if self._is_clicked(hand, now, landmarks, 20, 420, 60, 460):
                 self.state.erase_all()
 
             # Undo (U) - x = 850-50 = 800, y = 420
-            if self._is_clicked(landmarks, 800, 420, 835, 455):
+            if self._is_clicked(hand, now, landmarks, 800, 420, 835, 455):
                 self.state.undo()
 
             # Redo (R) - x = 800, y = 360
-            if self._is_clicked(landmarks, 800, 360, 835, 395):
+            if self._is_clicked(hand, now, landmarks, 800, 360, 835, 395):
                 self.state.redo()
 
             # Navigation
             # Prev: y = 300
             # New: y = 250
             # Next: y = 200
-            if self._is_clicked(landmarks, 20, 300, 60, 340): self.state.switch_page("prev")
-            if self._is_clicked(landmarks, 20, 250, 60, 290): self.state.add_new_page()
-            if self._is_clicked(landmarks, 20, 200, 60, 240): self.state.switch_page("next")
+            if self._is_clicked(hand, now, landmarks, 20, 300, 60, 340): self.state.switch_page("prev")
+            if self._is_clicked(hand, now, landmarks, 20, 250, 60, 290): self.state.add_new_page()
+            if self._is_clicked(hand, now, landmarks, 20, 200, 60, 240): self.state.switch_page("next")
             
             # Shapes (Right side center)
             # Center y = 275 (half of 550) - 100 = 175
@@ -75,10 +119,8 @@ class GestureEngine:
             shapes = ["Oval", "Circle", "Square", "Triangle"]
             for i, shape in enumerate(shapes):
                 sy = 175 + i * 45
-                if self._is_clicked(landmarks, 800, sy, 835, sy+35):
-                    self.state.shape_mode_active = True
-                    self.state.selected_shape = shape
-                    self.state.tool = 'shape' # Implicit tool switch
+                if self._is_clicked(hand, now, landmarks, 800, sy, 835, sy+35):
+                    self.state.select_shape(shape)
 
         # 2. Drawing Logic
         if landmarks:
@@ -88,27 +130,22 @@ class GestureEngine:
                 
                 # Check D button again: if we are in drawing mode (and not hovering a button), draw
                 if self.state.tool == 'pen' or self.state.tool == 'eraser':
-                    # Simple smoothing could go here, for now direct draw
+                    # Fingertips arrive smoothed (LandmarkFilter in FrameProcessor), draw directly
                     color = self.state.color if self.state.tool == 'pen' else self.state.background_color
                     thickness = self.state.thickness if self.state.tool == 'pen' else 30
                     
-                    import cv2
-                    if self.state.last_point:
-                        cv2.line(self.state.canvas, self.state.last_point, (ix, iy), color, thickness)
-                    
-                    # Store last point
-                    self.state.last_point = (ix, iy)
+                    self.state.stroke_to((ix, iy), color, thickness, hand_id)
                 else:
-                    self.state.last_point = None
+                    self.state.end_stroke(hand_id)
             else:
-                self.state.last_point = None
+                self.state.end_stroke(hand_id)
 
         # 3. Global Gestures (Backwards compatibility)
         for g in gestures:
             if g == "FIST":
                 # Maybe stop drawing? handled by frontend usually, but backend state has 'tool'
-                self.state.last_point = None # Stop stripe
+                self.state.end_stroke(hand_id) # Stop stripe
             elif g == "THUMB_PINKY":
-                if time.time() - self.last_click_time > self.click_cooldown:
+                if now - hand.last_click_time > self.click_cooldown:
                     self.state.cycle_color()
-                    self.last_click_time = time.time()
+                    hand.last_click_time = now
@@ -0,0 +1,228 @@
+"""Table-driven gesture classification.
+
+Every gesture is one `GestureRule` row: a column of the landmark feature
+vector (`app.core.landmarks.FEATURES`), the side of the threshold that
+means "on", separate enter and exit thresholds (hysteresis) and the number
+of consecutive frames each transition needs (debounce). The table is
+compiled into arrays, so all rules are evaluated together, for one hand per
+frame (`GestureClassifier`) or over a whole recorded sequence at once
+(`evaluate_sequence`). Both give the same result. The desktop app runs
+its own table (GCID/gesture_rules.py) through the same classes.
+
+Tune a table offline against a recording:
+
+    cd backend && python -m app.core.gesture_rules session.npz --set PINCH.exit=0.09
+"""
+import argparse
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.landmarks import FEATURES, feature_vector
+
+
+class GestureRule:
+    """One gesture: on while `feature` is below (or above) its thresholds.
+
+    Off -> on once the feature passes `enter` for `enter_frames` frames in a
+    row; on -> off once it is past `exit` (the looser side, defaults to
+    `enter`) for `exit_frames` frames. A lost hand switches every gesture
+    off immediately.
+    """
+
+    __slots__ = ("name", "feature", "below", "enter", "exit", "enter_frames", "exit_frames")
+
+    def __init__(self, name: str, feature: str, below: bool, enter: float, exit: Optional[float] = None,
+                 enter_frames: int = 1, exit_frames: int = 1):
+        if feature not in FEATURES:
+            raise ValueError(f"Unknown feature '{feature}', expected one of {FEATURES}")
+        self.name = name
+        self.feature = feature
+        self.below = below
+        self.enter = enter
+        self.exit = enter if exit is None else exit
+        self.enter_frames = max(1, int(enter_frames))
+        self.exit_frames = max(1, int(exit_frames))
+
+    def __repr__(self) -> str:
+        side = "<" if self.below else ">"
+        return (f"GestureRule({self.name}: {self.feature} {side} {self.enter}, exit {self.exit}, "
+                f"frames {self.enter_frames}/{self.exit_frames})")
+
+
+# Order is the order gestures are reported in
+GESTURE_RULES = [
+    GestureRule("OPEN_PALM", "extended", below=False, enter=4.5, enter_frames=2),
+    GestureRule("FIST", "curled_fingers", below=False, enter=3.5, enter_frames=2),
+    # Cycles the color, so it must be held briefly before it counts
+    GestureRule("THUMB_PINKY", "thumb_pinky", below=True, enter=0.08, exit=0.09, enter_frames=2),
+    # Enters on the first close frame so strokes start immediately; jitter near the threshold does not end them
+    GestureRule("PINCH", "pinch_distance", below=True, enter=0.06, exit=0.075, exit_frames=2),
+]
+
+
+class RuleTable:
+    """`GestureRule`s compiled into arrays over the feature vector."""
+
+    def __init__(self, rules: Sequence[GestureRule]):
+        self.rules = list(rules)
+        self.names = tuple(rule.name for rule in self.rules)
+        self._columns = np.array([FEATURES.index(rule.feature) for rule in self.rules], dtype=np.intp)
+        # Above-rules are flipped to below-rules: v > t  <=>  -v < -t
+        self._sign = np.array([1.0 if rule.below else -1.0 for rule in self.rules], dtype=np.float32)
+        self._enter = np.array([rule.enter for rule in self.rules], dtype=np.float32) * self._sign
+        self._exit = np.array([rule.exit for rule in self.rules], dtype=np.float32) * self._sign
+        self.enter_frames = np.array([rule.enter_frames for rule in self.rules])
+        self.exit_frames = np.array([rule.exit_frames for rule in self.rules])
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def index(self, name: str) -> int:
+        """Column of gesture `name` in the active arrays."""
+        return self.names.index(name)
+
+    def crossings(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(..., F) features -> (entering, exiting, missing) bool, the first two (..., rules)."""
+        values = features[..., self._columns] * self._sign
+        missing = np.isnan(features[..., 0])
+        return values < self._enter, values > self._exit, missing
+
+    def classify_batch(self, features: np.ndarray) -> np.ndarray:
+        """Stateless (..., rules) bool: enter thresholds only, no hysteresis or debounce."""
+        return self.crossings(features)[0]
+
+    def gestures(self, active: np.ndarray) -> List[str]:
+        """Names of the active gestures of one hand."""
+        return [name for name, on in zip(self.names, active.tolist()) if on]
+
+
+DEFAULT_TABLE = RuleTable(GESTURE_RULES)
+
+
+class GestureClassifier:
+    """Per-frame evaluation of a rule table with hysteresis and debounce.
+
+    State is kept per hand slot: `shape` () is one hand, (n,) n hands
+    updated together from (n, F) features. `table` may also be a plain
+    list of rules.
+    """
+
+    def __init__(self, table: RuleTable = DEFAULT_TABLE, shape: Tuple[int, ...] = ()):
+        self.table = table if isinstance(table, RuleTable) else RuleTable(table)
+        self.active = np.zeros(shape + (len(table),), dtype=bool)
+        self._entering = np.zeros(self.active.shape, dtype=np.int32)
+        self._exiting = np.zeros(self.active.shape, dtype=np.int32)
+
+    def update(self, features: np.ndarray) -> np.ndarray:
+        """Advance one frame with (*shape, F) features (NaN rows = hand lost) -> active (*shape, rules)."""
+        entering, exiting, missing = self.table.crossings(features)
+        self._entering = np.where(entering, self._entering + 1, 0)
+        self._exiting = np.where(exiting, self._exiting + 1, 0)
+        self.active = np.where(self._entering >= self.table.enter_frames, True,
+                               np.where(self._exiting >= self.table.exit_frames, False, self.active))
+        self.active &= ~missing[..., None]
+        self._entering[missing] = 0
+        self._exiting[missing] = 0
+        return self.active
+
+    def reset(self, slots=...) -> None:
+        """Hand lost (or replaced by a new hand in `slots`): gestures off, debounce counters cleared."""
+        self.active[slots] = False
+        self._entering[slots] = 0
+        self._exiting[slots] = 0
+
+    def clear(self, name: str, slots=...) -> None:
+        """Force one gesture off, e.g. end a pinch when the tool changes."""
+        i = self.table.index(name)
+        self.active[..., i][slots] = False
+        self._entering[..., i][slots] = 0
+        self._exiting[..., i][slots] = 0
+
+    def is_active(self, name: str, slots=...) -> bool:
+        return bool(self.active[..., self.table.index(name)][slots].any())
+
+    def gestures(self, slot=()) -> List[str]:
+        """Active gesture names of one hand (`slot` of a multi-hand classifier)."""
+        return self.table.gestures(self.active[slot])
+
+
+def classify_batch(points: np.ndarray, table: RuleTable = DEFAULT_TABLE) -> np.ndarray:
+    """Stateless (..., 21, 3) landmarks -> (..., rules) bool, columns in `table.names` order."""
+    return table.classify_batch(feature_vector(points))
+
+
+def classify(points: np.ndarray, table: RuleTable = DEFAULT_TABLE) -> List[str]:
+    """Stateless gesture names of one (21, 3) hand."""
+    return table.gestures(classify_batch(points, table))
+
+
+def _run_lengths(mask: np.ndarray) -> np.ndarray:
+    """Length of the run of True ending at each index along axis 0."""
+    index = np.arange(len(mask)).reshape((-1,) + (1,) * (mask.ndim - 1))
+    last_false = np.maximum.accumulate(np.where(mask, -1, index), axis=0)
+    return index - last_false
+
+
+def evaluate_sequence(features: np.ndarray, table: RuleTable = DEFAULT_TABLE) -> np.ndarray:
+    """(frames, ..., F) features -> (frames, ..., rules) bool, as `GestureClassifier` fed frame by frame.
+
+    The debounce counters equal the run lengths of each condition, and the
+    state at a frame is decided by the last on or off transition up to it
+    (on wins a tie, as in `update`); both come from cumulative maxima
+    instead of a per-frame loop.
+    """
+    entering, exiting, missing = table.crossings(features)
+    on = _run_lengths(entering) >= table.enter_frames
+    off = (_run_lengths(exiting) >= table.exit_frames) | missing[..., None]
+    index = np.arange(len(features)).reshape((-1,) + (1,) * (on.ndim - 1))
+    last_on = np.maximum.accumulate(np.where(on, index, -1), axis=0)
+    last_off = np.maximum.accumulate(np.where(off, index, -1), axis=0)
+    return (last_on >= 0) & (last_on >= last_off)
+
+
+def _override(rules: List[GestureRule], assignment: str) -> None:
+    target, value = assignment.split("=", 1)
+    name, field = target.split(".", 1)
+    for rule in rules:
+        if rule.name == name:
+            setattr(rule, field, int(value) if field.endswith("frames") else float(value))
+            return
+    raise SystemExit(f"No rule named {name}")
+
+
+def main() -> None:
+    from app.core.recording import LandmarkRecording
+    from app.utils.framing import GESTURE_BITS
+
+    parser = argparse.ArgumentParser(description="Evaluate the gesture table against a landmark recording.")
+    parser.add_argument("recording")
+    parser.add_argument("--set", action="append", default=[], metavar="RULE.FIELD=VALUE",
+                        help="override a threshold, e.g. PINCH.exit=0.09 or FIST.enter_frames=3")
+    args = parser.parse_args()
+
+    rules = [GestureRule(r.name, r.feature, r.below, r.enter, r.exit, r.enter_frames, r.exit_frames)
+             for r in GESTURE_RULES]
+    for assignment in args.set:
+        _override(rules, assignment)
+    table = RuleTable(rules)
+
+    recording = LandmarkRecording.load(args.recording)
+    # Extrapolated frames carry fingertips only; the live classifier never sees them
+    inferred = recording.inferred
+    active = evaluate_sequence(feature_vector(recording.landmarks[inferred, 0]), table)
+    recorded = recording.gestures[inferred, 0]
+
+    print(f"{inferred.sum()} inferred frames")
+    print(f"{'gesture':<12} {'frames':>7} {'onsets':>7} {'recorded':>9} {'agree':>7}")
+    for i, rule in enumerate(table.rules):
+        column = active[:, i]
+        onsets = int(np.count_nonzero(column[1:] & ~column[:-1]) + (column[:1].sum() if len(column) else 0))
+        bit = GESTURE_BITS.get(rule.name, 0)
+        was = (recorded & bit) != 0
+        agree = float((column == was).mean()) if len(column) else 1.0
+        print(f"{rule.name:<12} {int(column.sum()):>7} {onsets:>7} {int(was.sum()):>9} {agree:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
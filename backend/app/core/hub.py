@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from typing import Dict, List, Optional
+
+from app.core.frame_processor import FrameProcessor
+from app.core.inference_pool import get_inference_pool
+from app.core.metrics import REGISTRY
+from app.core.sources import CameraSource, open_source
+from app.config import CAMERAS, FRAME_SOURCE
+from app.core.pipeline import FramePipeline, Subscription, Variant
+from app.models.message import StreamOptions
+
+
+class CaptureHub:
+    """Process-wide owner of one camera and its hand model.
+
+    The camera is opened when the first subscriber arrives and released
+    when the last one leaves; a pipeline stopped by a failing stage is
+    restarted for the next subscriber. Each frame is captured and analyzed
+    once, encoded once per resolution/quality variant that a subscriber is
+    due to receive, and the same packet is fanned out to every subscription.
+    """
+
+    def __init__(self, camera_index: int = 0):
+        self.camera_index = camera_index
+        self._lock = threading.Lock()
+        self._subscribers: List[Subscription] = []
+        self._processor: Optional[FrameProcessor] = None
+        self._pipeline: Optional[FramePipeline] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop,
+                  options: Optional[StreamOptions] = None) -> Subscription:
+        """Blocking (may open the camera); call via `asyncio.to_thread` from async code."""
+        sub = Subscription(loop, options)
+        with self._lock:
+            if self._pipeline is not None and self._pipeline.error is not None:
+                # A stage failed: the old subscribers got the error, the new one gets a fresh pipeline
+                self._stop()
+            self._subscribers.append(sub)
+            if self._pipeline is None:
+                try:
+                    self._start()
+                except Exception:
+                    self._subscribers.remove(sub)
+                    raise
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        """Blocking (may stop the stages and release the camera)."""
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+            if not self._subscribers and self._pipeline is not None:
+                self._stop()
+
+    def _start(self) -> None:
+        # A configured source stands in for the default camera (headless runs)
+        source = open_source(FRAME_SOURCE) if FRAME_SOURCE and self.camera_index == 0 else None
+        self._processor = FrameProcessor(self.camera_index, pool=get_inference_pool(), source=source)
+        self._pipeline = FramePipeline(self._processor, self._publish, self._variants)
+        self._pipeline.start()
+
+    def _stop(self) -> None:
+        self._pipeline.stop()
+        self._processor.release()
+        self._pipeline = None
+        self._processor = None
+
+    def _variants(self, timestamp: float) -> List[Variant]:
+        return [
+            sub.options.variant for sub in list(self._subscribers)
+            if sub.options.frames and sub.frame_due(timestamp)
+        ]
+
+    def _publish(self, item) -> None:
+        for sub in list(self._subscribers):
+            sub.deliver(item)
+
+
+_hubs: Dict[int, CaptureHub] = {}
+_hubs_lock = threading.Lock()
+
+
+def get_hub(camera_index: int = 0) -> CaptureHub:
+    """Return the shared hub for one of the configured `CAMERAS`, creating it on first use."""
+    if camera_index not in CAMERAS:
+        raise ValueError(f"Unknown camera {camera_index}")
+    with _hubs_lock:
+        if camera_index not in _hubs:
+            _hubs[camera_index] = CaptureHub(camera_index)
+        return _hubs[camera_index]
+
+
+def _pipelines():
+    with _hubs_lock:
+        hubs = list(_hubs.values())
+    return [(hub.camera_index, hub._pipeline) for hub in hubs if hub._pipeline is not None]
+
+
+REGISTRY.collector("gcid_pipeline_frames_total", "counter", "Frames analyzed and published per camera.",
+                   lambda: [({"camera": str(cam)}, p.published) for cam, p in _pipelines()])
+REGISTRY.collector("gcid_pipeline_dropped_frames_total", "counter",
+                   "Frames replaced between pipeline stages because the next stage was busy.",
+                   lambda: [({"camera": str(cam)}, p.dropped) for cam, p in _pipelines()])
+REGISTRY.collector("gcid_camera_frames_skipped_total", "counter",
+                   "Camera frames replaced by a newer one before the pipeline read them.",
+                   lambda: [({"camera": str(cam)}, p.processor.source.skipped) for cam, p in _pipelines()
+                            if isinstance(p.processor.source, CameraSource)])
+REGISTRY.collector("gcid_hub_subscribers", "gauge", "Sessions subscribed to each camera.",
+                   lambda: [({"camera": str(i)}, h.subscriber_count) for i, h in list(_hubs.items())])
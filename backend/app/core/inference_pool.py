@@ -0,0 +1,329 @@
+import multiprocessing as mp_proc
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.landmarks import handedness, hands_array
+from app.core.metrics import REGISTRY
+from app.config import MAX_HANDS, INFERENCE_WORKERS, INFERENCE_TIMEOUT, INFERENCE_BATCH_WINDOW, INFERENCE_MAX_BATCH
+
+# Largest image a worker accepts: the full 850x550 RGB analysis frame
+MAX_FRAME_BYTES = 850 * 550 * 3
+
+_NO_HANDS = (np.zeros((0, 21, 3), dtype=np.float32), [])
+
+# (n_hands, 21, 3) normalized landmarks and [(label, score)] handedness per hand
+Detection = Tuple[np.ndarray, List[Tuple[str, float]]]
+
+
+def _worker_main(conn, shm_name: str) -> None:
+    """Worker process: hold a warmed hand model and answer detect requests.
+
+    Requests are `(height, width)` tuples naming an RGB image at the start
+    of the shared buffer; replies are an (n_hands, 21, 3) float32 array of
+    normalized landmarks and the (label, score) handedness of each hand.
+    """
+    try:
+        import mediapipe as mp
+        hands = mp.solutions.hands.Hands(
+            max_num_hands=MAX_HANDS,
+            min_detection_confidence=0.6,
+            min_tracking_confidence=0.6
+        )
+        hands.process(np.zeros((256, 256, 3), dtype=np.uint8))  # warm up
+    except Exception:
+        hands = None
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            h, w = request
+            rgb = np.ndarray((h, w, 3), dtype=np.uint8, buffer=shm.buf).copy()
+            hands_found = _NO_HANDS
+            if hands is not None:
+                results = hands.process(rgb)
+                hands_found = (hands_array(results.multi_hand_landmarks), handedness(results.multi_handedness))
+            conn.send(hands_found)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        shm.close()
+
+
+class _Worker:
+    """One worker process with its own shared frame buffer."""
+
+    def __init__(self, ctx, index: int):
+        self.index = index
+        self.lock = threading.Lock()
+        self.restarts = 0
+        self._ctx = ctx
+        self.shm = shared_memory.SharedMemory(create=True, size=MAX_FRAME_BYTES)
+        self._spawn()
+
+    def _spawn(self) -> None:
+        self.conn, child = self._ctx.Pipe()
+        self.process = self._ctx.Process(target=_worker_main, args=(child, self.shm.name),
+                                         name=f"gcid-inference-{self.index}", daemon=True)
+        self.process.start()
+        child.close()
+
+    def restart(self) -> None:
+        self.kill()
+        self.restarts += 1
+        self._spawn()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1.0)
+        self.conn.close()
+
+    def submit(self, rgb: np.ndarray) -> None:
+        h, w = rgb.shape[:2]
+        np.ndarray((h, w, 3), dtype=np.uint8, buffer=self.shm.buf)[:] = rgb
+        self.conn.send((h, w))
+
+    def result(self, timeout: float) -> Detection:
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"inference worker {self.index} did not answer in {timeout}s")
+        return self.conn.recv()
+
+
+class InferencePool:
+    """Hand inference in separate processes, one warmed model per worker.
+
+    Frames are copied into a per-worker shared memory buffer, so only a
+    small request and the detected landmarks cross the pipe. Each stream is
+    pinned to one worker (the least loaded when it first asks) because the
+    hand model tracks across consecutive frames; throughput scales with
+    the number of streams up to the number of workers.
+
+    `detect` blocks and is meant to be called from a pipeline's inference
+    thread. A worker that crashes or stalls is restarted and that frame is
+    reported as having no hand, so the sessions keep running.
+    """
+
+    def __init__(self, workers: int, timeout: float = 2.0):
+        ctx = mp_proc.get_context("spawn")
+        self.timeout = timeout
+        self._workers = [_Worker(ctx, i) for i in range(max(1, workers))]
+        self._assigned: Dict[object, _Worker] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def restarts(self) -> int:
+        return sum(w.restarts for w in self._workers)
+
+    def detect(self, rgb: np.ndarray, stream: object) -> Detection:
+        """Hands in an RGB image -> ((n_hands, 21, 3) normalized landmarks, handedness)."""
+        return self.detect_batch([(rgb, stream)])[0]
+
+    def detect_batch(self, items: List[Tuple[np.ndarray, object]]) -> List[Detection]:
+        """`detect` for several (rgb, stream) pairs, overlapping the workers.
+
+        Each round hands one frame to every worker that has one queued and
+        then collects the replies, so frames of different workers run in
+        parallel while each worker still sees its streams in order.
+        """
+        for rgb, _ in items:
+            if rgb.nbytes > MAX_FRAME_BYTES:
+                raise ValueError(f"frame of {rgb.nbytes} bytes exceeds the shared buffer")
+        results = [_NO_HANDS] * len(items)
+        queued: Dict[_Worker, List[int]] = {}
+        for i, (_, stream) in enumerate(items):
+            queued.setdefault(self._worker_for(stream), []).append(i)
+
+        while queued:
+            round_ = sorted(((w, indices.pop(0)) for w, indices in queued.items()), key=lambda wi: wi[0].index)
+            queued = {w: indices for w, indices in queued.items() if indices}
+            for worker, _ in round_:
+                worker.lock.acquire()
+            try:
+                sent = []
+                for worker, i in round_:
+                    try:
+                        worker.submit(items[i][0])
+                        sent.append((worker, i))
+                    except OSError as e:
+                        self._failed(worker, e)
+                for worker, i in sent:
+                    try:
+                        results[i] = worker.result(self.timeout)
+                    except (EOFError, OSError, TimeoutError) as e:
+                        self._failed(worker, e)
+            finally:
+                for worker, _ in round_:
+                    worker.lock.release()
+        return results
+
+    @staticmethod
+    def _failed(worker: _Worker, error: Exception) -> None:
+        print(f"Inference worker {worker.index} failed ({error!r}); restarting")
+        worker.restart()
+
+    def release(self, stream: object) -> None:
+        """Forget a finished stream's worker assignment."""
+        with self._lock:
+            self._assigned.pop(stream, None)
+
+    def close(self) -> None:
+        for worker in self._workers:
+            with worker.lock:
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+                worker.process.join(timeout=1.0)
+                worker.kill()
+                worker.shm.close()
+                worker.shm.unlink()
+
+    def _worker_for(self, stream: object) -> _Worker:
+        with self._lock:
+            if stream not in self._assigned:
+                load = {w.index: 0 for w in self._workers}
+                for w in self._assigned.values():
+                    load[w.index] += 1
+                self._assigned[stream] = min(self._workers, key=lambda w: load[w.index])
+            return self._assigned[stream]
+
+
+class _Request:
+    __slots__ = ("rgb", "stream", "result", "done")
+
+    def __init__(self, rgb: np.ndarray, stream: object):
+        self.rgb = rgb
+        self.stream = stream
+        self.result = None
+        self.done = threading.Event()
+
+
+class InferenceScheduler:
+    """Batches detect requests from all streams before they reach the pool.
+
+    Requests arriving within `window` seconds of the first pending one are
+    flushed together through `InferencePool.detect_batch`, which overlaps
+    them across the workers. A batch is flushed early once it holds
+    `max_batch` frames or one frame from every active stream (each stream
+    has at most one request in flight), so a lone session pays no window.
+    Same `detect` / `release` interface as the pool.
+    """
+
+    def __init__(self, pool: InferencePool, window: float, max_batch: int):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.batches = 0
+        self.batched_frames = 0
+        self._cond = threading.Condition()
+        self._pending: List[_Request] = []
+        self._streams = set()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="gcid-inference-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.batched_frames / self.batches if self.batches else 0.0
+
+    def detect(self, rgb: np.ndarray, stream: object) -> Detection:
+        request = _Request(rgb, stream)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("inference scheduler is closed")
+            self._streams.add(stream)
+            self._pending.append(request)
+            self._cond.notify()
+        request.done.wait()
+        if isinstance(request.result, Exception):
+            raise request.result
+        return request.result
+
+    def release(self, stream: object) -> None:
+        with self._cond:
+            self._streams.discard(stream)
+            self._cond.notify()
+        self.pool.release(stream)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=2.0)
+        self.pool.close()
+
+    def _batch_ready(self) -> bool:
+        return len(self._pending) >= min(self.max_batch, max(1, len(self._streams)))
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.window
+                while not self._closed and not self._batch_ready():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+                if self._closed and not batch:
+                    return
+
+            try:
+                results = self.pool.detect_batch([(r.rgb, r.stream) for r in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            self.batches += 1
+            self.batched_frames += len(batch)
+            for request, result in zip(batch, results):
+                request.result = result
+                request.done.set()
+
+
+_pool = None  # InferencePool or InferenceScheduler
+_pool_lock = threading.Lock()
+
+
+def get_inference_pool():
+    """The process-wide pool (behind a batching scheduler when
+    `INFERENCE_BATCH_WINDOW` > 0), started on first use; None when
+    `INFERENCE_WORKERS` is 0."""
+    global _pool
+    if INFERENCE_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = InferencePool(INFERENCE_WORKERS, INFERENCE_TIMEOUT)
+            if INFERENCE_BATCH_WINDOW > 0:
+                _pool = InferenceScheduler(_pool, INFERENCE_BATCH_WINDOW, INFERENCE_MAX_BATCH)
+        return _pool
+
+
+def close_inference_pool() -> None:
+    """Stop the worker processes, if they were started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def _pool_samples(read):
+    pool = _pool
+    if pool is None:
+        return []
+    return [({}, read(pool))]
+
+
+REGISTRY.collector("gcid_inference_worker_restarts_total", "counter", "Inference worker processes restarted.",
+                   lambda: _pool_samples(lambda p: getattr(p, "pool", p).restarts))
+REGISTRY.collector("gcid_inference_batch_size", "gauge", "Mean frames per inference batch.",
+                   lambda: _pool_samples(lambda p: getattr(p, "mean_batch_size", 1.0)))
@@ -0,0 +1,137 @@
+"""Hand landmarks as NumPy arrays and the gesture features computed from them.
+
+Every detection is converted once into a (21, 3) float32 array of
+normalized x, y, z (MediaPipe landmark order). `HandFeatures` then derives
+finger extension, joint angles and the pinch distances in one vectorized
+pass, and `feature_vector` flattens them into the columns the gesture rule
+table compares. All of it accepts any leading shape, so (hands, 21, 3) or
+(frames, 21, 3) stacks, e.g. a whole `LandmarkRecording`, are processed in
+a single call.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# MediaPipe indices of the fingertips reported in landmark dicts
+FINGERTIPS = {
+    "thumb_tip": 4,
+    "index_finger_tip": 8,
+    "middle_finger_tip": 12,
+    "ring_finger_tip": 16,
+    "pinky_tip": 20,
+}
+
+_TIPS = np.array([4, 8, 12, 16, 20])
+# Rows: base (thumb CMC, finger MCPs), joint (thumb MCP, finger PIPs), tip;
+# columns: thumb, index, middle, ring, pinky. One gather feeds every feature.
+_CHAINS = np.stack([_TIPS - 3, _TIPS - 2, _TIPS])
+
+# Columns of `feature_vector`, the inputs of the gesture rule table (app.core.gesture_rules)
+FEATURES = ("pinch_distance", "thumb_pinky", "extended", "fingers_extended", "curled_fingers")
+
+
+def to_array(hand_landmarks) -> np.ndarray:
+    """One hand (MediaPipe proto, anything with `.landmark[i].x/.y/.z`, or an array) -> (21, 3) float32."""
+    if isinstance(hand_landmarks, np.ndarray):
+        return hand_landmarks.astype(np.float32, copy=False)
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark], dtype=np.float32)
+
+
+def hands_array(multi_hand_landmarks: Iterable) -> np.ndarray:
+    """`results.multi_hand_landmarks` (or None) -> (n_hands, 21, 3) float32."""
+    hands = [to_array(hand) for hand in multi_hand_landmarks or ()]
+    return np.stack(hands) if hands else np.zeros((0, 21, 3), dtype=np.float32)
+
+
+def handedness(multi_handedness: Iterable) -> List[Tuple[str, float]]:
+    """`results.multi_handedness` (or None) -> [(label, score)] per hand, label "Left" or "Right".
+
+    MediaPipe expects a mirrored (selfie) image, which is what the processed
+    frames are, so the labels name the user's actual hands.
+    """
+    return [(hand.classification[0].label, float(hand.classification[0].score))
+            for hand in multi_handedness or ()]
+
+
+def uncrop(points: np.ndarray, region: Tuple[int, int, int, int], size: Tuple[int, int]) -> np.ndarray:
+    """Map (..., 21, 3) landmarks detected in a crop back to full-frame normalized coordinates."""
+    rx, ry, rw, rh = region
+    w, h = size
+    return (points * np.array([rw, rh, rw]) + (rx, ry, 0.0)) / (w, h, w)
+
+
+def bounding_box(points: np.ndarray, w: int, h: int) -> Tuple[int, int, int, int]:
+    """Pixel (x, y, w, h) box around one (21, 3) hand."""
+    xs = points[:, 0].astype(np.float64) * w
+    ys = points[:, 1].astype(np.float64) * h
+    x, y = int(xs.min()), int(ys.min())
+    return x, y, int(xs.max()) - x + 1, int(ys.max()) - y + 1
+
+
+def fingertip_pixels(points: np.ndarray, w: int, h: int) -> Dict[str, Tuple[int, int]]:
+    """Pixel fingertip dict of one (21, 3) hand, as sent to clients."""
+    tips = (points[_TIPS, :2].astype(np.float64) * (w, h)).astype(np.int64)
+    return {name: (int(x), int(y)) for name, (x, y) in zip(FINGERTIPS, tips.tolist())}
+
+
+class HandFeatures:
+    """Geometric features of (..., 21, 3) landmarks, each with the leading shape of the input.
+
+    points          (..., 21, 3) float32 landmarks the features were computed from
+    extended        (..., 5) bool   tip above its joint (thumb MCP, finger PIPs)
+    curled          (..., 5) bool   tip below its joint
+    bend            (..., 5) float  radians between base->joint and joint->tip; 0 = straight
+    pinch_distance  (...)    float  2D thumb tip to index tip
+    thumb_pinky     (...)    float  3D thumb tip to pinky tip
+
+    Also used by the desktop app (GCID/hand_features.py).
+    """
+
+    __slots__ = ("points", "extended", "curled", "bend", "pinch_distance", "thumb_pinky")
+
+    def __init__(self, points: np.ndarray):
+        self.points = np.asarray(points, dtype=np.float32)
+        chains = self.points[..., _CHAINS, :]  # (..., 3, 5, 3)
+        base, joint, tips = chains[..., 0, :, :], chains[..., 1, :, :], chains[..., 2, :, :]
+        self.extended = tips[..., 1] < joint[..., 1]
+        self.curled = tips[..., 1] > joint[..., 1]
+
+        lower = joint - base
+        upper = tips - joint
+        # Plain sums instead of einsum/linalg.norm: on 5x3 arrays the call overhead dominates
+        cos = (lower * upper).sum(-1) / np.maximum(np.sqrt((lower * lower).sum(-1) * (upper * upper).sum(-1)), 1e-9)
+        self.bend = np.arccos(np.minimum(np.maximum(cos, -1.0), 1.0))
+
+        # Thumb tip to index tip and to pinky tip
+        d = tips[..., :1, :] - tips[..., 1::3, :]
+        self.pinch_distance = np.sqrt((d[..., 0, :2] ** 2).sum(-1))
+        self.thumb_pinky = np.sqrt((d[..., 1, :] ** 2).sum(-1))
+
+    def fingers_extended(self) -> np.ndarray:
+        """Index, middle, ring and pinky all extended (the thumb is ignored)."""
+        return self.extended[..., 1:].all(axis=-1)
+
+    def __getitem__(self, index) -> "HandFeatures":
+        """Features of one hand of a stack (`features[i]`), sliced instead of recomputed."""
+        part = HandFeatures.__new__(HandFeatures)
+        for name in self.__slots__:
+            setattr(part, name, getattr(self, name)[index])
+        return part
+
+
+def feature_vector(points) -> np.ndarray:
+    """(..., 21, 3) landmarks or their `HandFeatures` -> (..., len(FEATURES)) float32; rows of missing hands are NaN.
+
+    extended counts all five extended fingers, fingers_extended and
+    curled_fingers only index to pinky.
+    """
+    f = points if isinstance(points, HandFeatures) else HandFeatures(points)
+    out = np.empty(f.pinch_distance.shape + (len(FEATURES),), dtype=np.float32)
+    out[..., 0] = f.pinch_distance
+    out[..., 1] = f.thumb_pinky
+    out[..., 2] = f.extended.sum(-1)
+    out[..., 3] = f.extended[..., 1:].sum(-1)
+    out[..., 4] = f.curled[..., 1:].sum(-1)
+    # NaN comparisons count as False; keep missing hands distinguishable from a count of 0
+    out[np.isnan(f.pinch_distance)] = np.nan
+    return out
@@ -0,0 +1,207 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Hot paths only touch `Histogram.observe` / `Counter.inc` (a bisect and a
+couple of additions under an uncontended lock). Values that already exist
+elsewhere (per-session send stats, queue drops, undo memory) are not
+mirrored on every frame; collectors read them when `/metrics` is scraped.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Seconds; spans sub-millisecond gesture logic up to slow inference
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.02, 0.035, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0)
+
+
+def _label_key(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        lines += [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, List[float]] = {}  # bucket counts..., sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                labels = key + (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(labels)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(series[-1])}")
+        return lines
+
+
+class Registry:
+    """Metrics plus scrape-time collectors; `expose()` renders them all."""
+
+    def __init__(self):
+        self._metrics: List[object] = []
+        self._collectors: List[Tuple[str, str, str, Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = []
+
+    def counter(self, name: str, help: str) -> Counter:
+        metric = Counter(name, help)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, name: str, kind: str, help: str,
+                  collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> None:
+        """Register a gauge or counter whose (labels, value) samples are read at scrape time."""
+        self._collectors.append((name, kind, help, collect))
+
+    def expose(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines += metric.expose()
+        for name, kind, help, collect in self._collectors:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for labels, value in collect():
+                lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "gcid_stage_seconds", "Time spent per pipeline stage (capture, preprocess, inference, encode, gesture, canvas, send).")
+INFERENCE_SECONDS = REGISTRY.histogram(
+    "gcid_model_inference_seconds", "Hand model call latency.")
+FRAME_LATENCY_SECONDS = REGISTRY.histogram(
+    "gcid_frame_latency_seconds",
+    "Camera capture to frame sent, and to frame displayed (acknowledged) for clients that send acks.")
+
+# Pixels on the 850x550 canvas
+_PX_BUCKETS = (1.0, 2.0, 5.0, 10.0, 20.0, 40.0, 60.0, 100.0)
+CURSOR_LEAD_PX = REGISTRY.histogram(
+    "gcid_cursor_lead_px", "Distance the predicted cursor was moved ahead of the measured fingertip.", _PX_BUCKETS)
+CURSOR_ERROR_PX = REGISTRY.histogram(
+    "gcid_cursor_error_px",
+    "Distance from the shown cursor (predicted or measured) to where the fingertip was at display time.", _PX_BUCKETS)
+CURSOR_PREDICTIONS_CLAMPED = REGISTRY.counter(
+    "gcid_cursor_predictions_clamped_total", "Cursor predictions shortened to avoid overshoot.")
+
+
+class SessionRegistry:
+    """Live websocket sessions, read by the scrape-time collectors."""
+
+    def __init__(self):
+        self._sessions: Dict[int, object] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def add(self, session) -> int:
+        with self._lock:
+            self._next_id += 1
+            self._sessions[self._next_id] = session
+            return self._next_id
+
+    def remove(self, session_id: int) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def items(self) -> List[Tuple[int, object]]:
+        with self._lock:
+            return list(self._sessions.items())
+
+
+SESSIONS = SessionRegistry()
+
+
+def _per_session(read: Callable[[object], float]) -> Callable[[], List[Tuple[Dict[str, str], float]]]:
+    return lambda: [({"session": str(sid)}, read(session)) for sid, session in SESSIONS.items()]
+
+
+REGISTRY.collector("gcid_active_sessions", "gauge", "Connected websocket sessions.",
+                   lambda: [({}, len(SESSIONS.items()))])
+REGISTRY.collector("gcid_session_fps", "gauge", "Frames per second sent to each session.",
+                   _per_session(lambda s: s.outbound.send_fps))
+REGISTRY.collector("gcid_fps", "gauge", "Frames per second sent, summed over all sessions.",
+                   lambda: [({}, sum(s.outbound.send_fps for _, s in SESSIONS.items()))])
+REGISTRY.collector("gcid_session_frames_sent_total", "counter", "Camera frames sent to each session.",
+                   _per_session(lambda s: s.outbound.frames_sent))
+REGISTRY.collector("gcid_session_frames_dropped_total", "counter",
+                   "Camera frames replaced or expired in each session's outbound slot.",
+                   _per_session(lambda s: s.outbound.frames_dropped))
+REGISTRY.collector("gcid_session_bytes_sent_total", "counter", "Bytes sent to each session.",
+                   _per_session(lambda s: s.outbound.bytes_sent))
+REGISTRY.collector("gcid_session_latency_seconds", "gauge",
+                   "Measured capture-to-display latency of each session, the cursor prediction lead.",
+                   _per_session(lambda s: s.outbound.latency))
+REGISTRY.collector("gcid_session_undo_bytes", "gauge", "Memory held by each session's undo/redo history.",
+                   _per_session(lambda s: s.state.history_bytes))
+
+
+def render() -> str:
+    return REGISTRY.expose()
+
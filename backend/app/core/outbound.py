@@ -0,0 +1,174 @@
+import asyncio
+import collections
+import json
+import time
+from typing import Awaitable, Callable, Optional, Tuple, Union
+
+from app.config import ACK_TIMEOUT, ACK_WINDOW, MAX_FRAME_AGE
+from app.core.metrics import FRAME_LATENCY_SECONDS, STAGE_SECONDS
+from app.core.tracing import TRACER, current_frame
+
+Message = Union[bytes, dict]
+
+
+class OutboundChannel:
+    """Per-connection send queue that adapts to how fast the client drains it.
+
+    Camera frames go through a single latest-wins slot: while a send is in
+    flight newer frames replace the pending one, and frames older than
+    `max_frame_age` are dropped, so latency stays bounded when a client
+    falls behind. Canvas updates (state, patches, ops) are deltas and go
+    through an ordered queue that is never dropped; producers should only
+    build new ones while `busy` is False so they coalesce at the source.
+
+    Clients that acknowledge frames (`{"type": "ack", "seq": N}`) are
+    additionally limited to `ack_window` unacknowledged frames in flight.
+
+    `latency` is the measured capture-to-display time of the frames: capture
+    to acknowledgement for clients that ack once a frame is shown, capture
+    to sent otherwise (a lower bound).
+    """
+
+    def __init__(self, send: Callable[[Message], Awaitable[int]],
+                 max_frame_age: float = MAX_FRAME_AGE, ack_window: int = ACK_WINDOW):
+        self._send = send
+        self.max_frame_age = max_frame_age
+        self.ack_window = ack_window
+        self._frame = None  # (seq, timestamp, message, trace_id)
+        self._reliable = collections.deque()
+        self._sending_reliable = False
+        self._wake = asyncio.Event()
+
+        self._acks_seen = False
+        self._acked_seq = -1
+        self._last_sent_seq = -1
+        self._in_flight = {}  # seq -> capture timestamp of frames sent and not yet acknowledged
+        self._sent_latency = 0.0
+        self._displayed_latency = None
+
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self.send_fps = 0.0
+        self._last_frame_sent = None
+
+    @property
+    def busy(self) -> bool:
+        """True while canvas updates are still queued or being sent."""
+        return bool(self._reliable) or self._sending_reliable
+
+    def offer_frame(self, seq: int, timestamp: float, message: Message,
+                    trace_id: Optional[int] = None) -> None:
+        if self._frame is not None:
+            self.frames_dropped += 1
+        self._frame = (seq, timestamp, message, trace_id)
+        self._wake.set()
+
+    def push(self, message: Message) -> None:
+        # Canvas updates are traced under the frame being handled when queued
+        self._reliable.append((message, current_frame()))
+        self._wake.set()
+
+    @property
+    def latency(self) -> float:
+        """Smoothed capture-to-display seconds of the frames sent so far."""
+        return self._sent_latency if self._displayed_latency is None else self._displayed_latency
+
+    def ack(self, seq: int) -> None:
+        self._acks_seen = True
+        self._acked_seq = max(self._acked_seq, seq)
+        timestamp = self._in_flight.pop(seq, None)
+        if timestamp is not None:
+            latency = time.time() - timestamp
+            FRAME_LATENCY_SECONDS.observe(latency, point="displayed")
+            previous = self._displayed_latency
+            self._displayed_latency = latency if previous is None else 0.9 * previous + 0.1 * latency
+        for old in [s for s in self._in_flight if s < seq]:
+            del self._in_flight[old]
+        self._wake.set()
+
+    def stats(self) -> dict:
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "bytes_sent": self.bytes_sent,
+            "send_fps": round(self.send_fps, 1),
+        }
+
+    def _window_full(self) -> bool:
+        return self._acks_seen and self._last_sent_seq - self._acked_seq >= self.ack_window
+
+    def _next_frame(self) -> Optional[Tuple[Message, float, Optional[int]]]:
+        if self._frame is None or self._window_full():
+            return None
+        seq, timestamp, message, trace_id = self._frame
+        self._frame = None
+        if time.time() - timestamp > self.max_frame_age:
+            self.frames_dropped += 1
+            return None
+        self._last_sent_seq = seq
+        if self._acks_seen or not self.frames_sent:
+            self._in_flight[seq] = timestamp
+        return message, timestamp, trace_id
+
+    async def run(self) -> None:
+        """Send loop; runs until the connection fails."""
+        while True:
+            self._wake.clear()
+            if self._reliable:
+                self._sending_reliable = True
+                try:
+                    message, trace_id = self._reliable.popleft()
+                    await self._timed_send(message, "send.canvas", trace_id)
+                finally:
+                    self._sending_reliable = False
+                continue
+
+            frame = self._next_frame()
+            if frame is not None:
+                message, timestamp, trace_id = frame
+                await self._timed_send(message, "send.frame", trace_id)
+                self._count_frame(timestamp)
+                continue
+
+            if self._frame is not None and self._window_full():
+                # Waiting on acks; if they stop coming assume they were lost
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=ACK_TIMEOUT)
+                except asyncio.TimeoutError:
+                    self._acked_seq = self._last_sent_seq
+                    self._in_flight.clear()
+            else:
+                await self._wake.wait()
+
+    async def _timed_send(self, message: Message, span: str, trace_id: Optional[int]) -> None:
+        start = time.perf_counter_ns()
+        self.bytes_sent += await self._send(message)
+        duration = time.perf_counter_ns() - start
+        STAGE_SECONDS.observe(duration / 1e9, stage="send")
+        if TRACER.enabled:
+            TRACER.record(span, start, duration, trace_id)
+
+    def _count_frame(self, timestamp: float) -> None:
+        now = time.time()
+        latency = now - timestamp
+        FRAME_LATENCY_SECONDS.observe(latency, point="sent")
+        self._sent_latency = 0.9 * self._sent_latency + 0.1 * latency if self.frames_sent else latency
+        if self._last_frame_sent is not None:
+            dt = now - self._last_frame_sent
+            if dt > 0:
+                self.send_fps = 0.9 * self.send_fps + 0.1 * (1.0 / dt)
+        self._last_frame_sent = now
+        self.frames_sent += 1
+
+
+def websocket_sender(ws) -> Callable[[Message], Awaitable[int]]:
+    """Return a send callable for `OutboundChannel` that reports bytes written."""
+    async def send(message: Message) -> int:
+        if isinstance(message, bytes):
+            await ws.send_bytes(message)
+            return len(message)
+        text = json.dumps(message)
+        await ws.send_text(text)
+        return len(text)
+    return send
@@ -0,0 +1,244 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import CAPTURE_FPS
+from app.core.metrics import STAGE_SECONDS
+from app.core.tracing import TRACER, next_frame_id, set_frame
+from app.models.message import StreamOptions
+from app.utils.encoding import bytes_to_base64, get_encoder
+
+
+class LatestSlot:
+    """Thread-safe single-item handoff with latest-wins semantics.
+
+    `put` never blocks: an item that has not been consumed yet is replaced
+    (and counted in `dropped`), so a slow consumer always sees the newest
+    item instead of building up a backlog.
+    """
+
+    def __init__(self, on_drop: Optional[Callable[[object], None]] = None):
+        self._cond = threading.Condition()
+        self._item = None
+        self._has_item = False
+        self._closed = False
+        self._on_drop = on_drop
+        self.dropped = 0
+
+    def put(self, item) -> None:
+        with self._cond:
+            replaced = self._item if self._has_item else None
+            if self._has_item:
+                self.dropped += 1
+            self._item = item
+            self._has_item = True
+            self._cond.notify()
+        if replaced is not None and self._on_drop is not None:
+            self._on_drop(replaced)
+
+    def get(self, timeout: Optional[float] = None):
+        """Return the newest item, or None once the slot is closed."""
+        with self._cond:
+            while not self._has_item and not self._closed:
+                if not self._cond.wait(timeout):
+                    return None
+            if not self._has_item:
+                return None
+            item, self._item, self._has_item = self._item, None, False
+            return item
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class AsyncLatestSlot:
+    """Event-loop side counterpart of `LatestSlot`; only touch it from the loop thread."""
+
+    def __init__(self):
+        self._event = asyncio.Event()
+        self._item = None
+        self.dropped = 0
+
+    def put(self, item) -> None:
+        if self._event.is_set():
+            self.dropped += 1
+        self._item = item
+        self._event.set()
+
+    async def get(self):
+        await self._event.wait()
+        self._event.clear()
+        item, self._item = self._item, None
+        return item
+
+
+Variant = Tuple[int, int, int, str]  # (width, height, quality, codec)
+
+DEFAULT_VARIANT: Variant = StreamOptions().variant
+
+
+class FramePacket:
+    """One processed camera frame on its way to the senders.
+
+    `images` holds one encoding per requested variant. Packets are shared by
+    every subscriber and must be treated as read-only.
+    """
+
+    __slots__ = ("timestamp", "frame", "landmarks", "gestures", "hands", "images", "trace_id", "_b64")
+
+    def __init__(self, timestamp: float, frame, landmarks: Dict[str, Tuple[int, int]], gestures: List[str],
+                 trace_id: Optional[int] = None, hands: Optional[List[Dict[str, Any]]] = None):
+        self.timestamp = timestamp
+        self.trace_id = trace_id
+        self.frame = frame
+        self.landmarks = landmarks
+        self.gestures = gestures
+        self.hands = hands or []  # every tracked hand; landmarks/gestures are the first one's
+        self.images: Dict[Variant, bytes] = {}
+        self._b64: Dict[Variant, str] = {}
+
+    def image(self, variant: Variant = DEFAULT_VARIANT) -> Optional[bytes]:
+        return self.images.get(variant)
+
+    def image_base64(self, variant: Variant = DEFAULT_VARIANT) -> Optional[str]:
+        # Computed once per variant and shared by all JSON subscribers
+        if variant not in self._b64 and variant in self.images:
+            self._b64[variant] = bytes_to_base64(self.images[variant])
+        return self._b64.get(variant)
+
+    @staticmethod
+    def image_format(variant: Variant = DEFAULT_VARIANT) -> str:
+        return get_encoder(variant[3]).format
+
+
+class Subscription:
+    """Receives pipeline output on one event loop, newest packet wins.
+
+    `options` are read by the encode stage to decide which variants to
+    produce; replace the whole object (never mutate it) to change them.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, options: Optional[StreamOptions] = None):
+        self.loop = loop
+        self.options = options or StreamOptions()
+        self.next_frame_at = 0.0
+        self._slot = AsyncLatestSlot()
+
+    def frame_due(self, timestamp: float) -> bool:
+        return timestamp >= self.next_frame_at
+
+    def mark_sent(self, timestamp: float) -> None:
+        # Allow 10% early so camera jitter does not halve the rate at max_fps
+        self.next_frame_at = timestamp + 0.9 / self.options.max_fps
+
+    @property
+    def dropped(self) -> int:
+        return self._slot.dropped
+
+    def deliver(self, item) -> None:
+        """Thread-safe: hand a packet (or a pipeline failure) to the loop."""
+        try:
+            self.loop.call_soon_threadsafe(self._slot.put, item)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    async def next_packet(self) -> FramePacket:
+        item = await self._slot.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+class FramePipeline:
+    """Capture, inference and encode stages running on their own threads.
+
+    The stages are linked by latest-wins slots, so they overlap and the
+    throughput approaches that of the slowest stage; stale frames are
+    dropped rather than queued. Every encoded packet (or the exception that
+    stopped a stage, also kept in `error`) is passed to `publish`, typically
+    `Subscription.deliver` or a hub fanning out to several subscriptions.
+    `variants(timestamp)` names the encodings wanted for a frame; frames
+    nobody wants as an image are published without encoding.
+    """
+
+    def __init__(self, processor, publish: Callable[[object], None],
+                 variants: Callable[[float], Iterable[Variant]] = lambda timestamp: (DEFAULT_VARIANT,)):
+        self.processor = processor
+        self._publish = publish
+        self._variants = variants
+        self._captured = LatestSlot()
+        # Dropped and encoded packets return their frame buffer to the processor
+        self._analyzed = LatestSlot(on_drop=lambda packet: processor.recycle(packet.frame))
+        self._stop = threading.Event()
+        self.error: Optional[Exception] = None  # set once a stage failed and the pipeline stopped
+        self.published = 0
+        self._threads = [
+            threading.Thread(target=self._run_stage, args=(self._capture,), name="gcid-capture", daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._infer,), name="gcid-inference", daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._encode,), name="gcid-encode", daemon=True),
+        ]
+
+    @property
+    def dropped(self) -> int:
+        return self._captured.dropped + self._analyzed.dropped
+
+    def start(self) -> None:
+        for t in self._threads:
+            t.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._captured.close()
+        self._analyzed.close()
+        for t in self._threads:
+            t.join(timeout=2.0)
+
+    # --- stages ---
+    def _run_stage(self, step) -> None:
+        try:
+            while not self._stop.is_set():
+                step()
+        except Exception as e:
+            # Surface the failure to the sender instead of silently stalling
+            self.error = e
+            self._stop.set()
+            self._captured.close()
+            self._analyzed.close()
+            self._publish(e)
+
+    def _capture(self) -> None:
+        frame_id = next_frame_id()
+        set_frame(frame_id)
+        with STAGE_SECONDS.time(stage="capture"), TRACER.span("capture"):
+            ok, frame, timestamp = self.processor.capture()
+        self._captured.put((frame, timestamp, frame_id))
+        if not ok:
+            # No camera frame to wait on; keep the placeholder at the nominal rate
+            time.sleep(1 / CAPTURE_FPS)
+
+    def _infer(self) -> None:
+        item = self._captured.get(timeout=0.5)
+        if item is None:
+            return
+        frame, timestamp, frame_id = item
+        set_frame(frame_id)
+        with TRACER.span("analyze"):
+            frame, landmarks, gestures, hands = self.processor.analyze(frame, timestamp)
+        self._analyzed.put(FramePacket(timestamp, frame, landmarks, gestures, frame_id, hands))
+
+    def _encode(self) -> None:
+        packet = self._analyzed.get(timeout=0.5)
+        if packet is None:
+            return
+        set_frame(packet.trace_id)
+        with STAGE_SECONDS.time(stage="encode"), TRACER.span("encode"):
+            for variant in set(self._variants(packet.timestamp)):
+                width, height, quality, codec = variant
+                packet.images[variant] = self.processor.encode(packet.frame, (width, height), quality, codec)
+        frame, packet.frame = packet.frame, None
+        self.processor.recycle(frame)
+        self.published += 1
+        self._publish(packet)
@@ -0,0 +1,151 @@
+"""Cursor latency compensation.
+
+A fingertip reaches the screen one pipeline latency after it was captured
+(inference, encoding, network, decoding), so the cursor trails the real
+finger. `CursorPredictor` runs a constant-velocity Kalman filter on each
+hand's cursor and shows it where the finger is expected to be when the
+frame is displayed, i.e. extrapolated by the measured latency (see
+`OutboundChannel.latency`). Strokes are still drawn at the measured
+positions; only the cursor is predicted.
+
+Plain extrapolation overshoots whenever the finger stops or turns, so the
+lead is clamped: no prediction below `min_speed`, never farther than the
+latest measured motion would carry the finger in the same time, never more
+than `max_distance` px and never outside the frame.
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+from app.core.metrics import CURSOR_ERROR_PX, CURSOR_LEAD_PX, CURSOR_PREDICTIONS_CLAMPED
+from app.core.tracking import TrackedHand
+
+Point = Tuple[int, int]
+
+
+class CursorTrack:
+    """Kalman state of one cursor: position and velocity per axis.
+
+    Both axes share the motion model and the measurement noise, so they
+    share one 2x2 covariance (p00 position, p01 cross, p11 velocity).
+    Also used by the desktop app's predictor (GCID/smoother.py).
+    """
+
+    __slots__ = ("x", "y", "vx", "vy", "p00", "p01", "p11", "timestamp", "measured", "speed", "pending")
+
+    def __init__(self, timestamp: float, point: Point, measurement_noise: float):
+        self.x, self.y = float(point[0]), float(point[1])
+        self.vx = self.vy = 0.0
+        self.p00, self.p01, self.p11 = measurement_noise, 0.0, 1e6  # velocity unknown at first
+        self.timestamp = timestamp
+        self.measured = self.x, self.y
+        self.speed = 0.0  # px/s between the last two measurements
+        # (display time, predicted cursor, unpredicted cursor) awaiting the measurement that scores it
+        self.pending: Optional[Tuple[float, Tuple[float, float], Tuple[float, float]]] = None
+
+    def correct(self, timestamp: float, point: Point, process_noise: float, measurement_noise: float) -> None:
+        """Advance to `timestamp` (after the last one) and correct with the measured `point`.
+
+        `process_noise` is the white-noise acceleration density (px^2/s^3),
+        `measurement_noise` the variance (px^2) of the measured point.
+        """
+        dt = timestamp - self.timestamp
+        zx, zy = float(point[0]), float(point[1])
+        self.speed = math.hypot(zx - self.measured[0], zy - self.measured[1]) / dt
+        self.measured = zx, zy
+
+        # Predict: constant velocity, white-noise acceleration
+        q = process_noise
+        self.x += self.vx * dt
+        self.y += self.vy * dt
+        p00 = self.p00 + dt * (2.0 * self.p01 + dt * self.p11) + q * dt ** 3 / 3.0
+        p01 = self.p01 + dt * self.p11 + q * dt ** 2 / 2.0
+        p11 = self.p11 + q * dt
+
+        # Correct with the measured position
+        s = p00 + measurement_noise
+        k0, k1 = p00 / s, p01 / s
+        ex, ey = zx - self.x, zy - self.y
+        self.x += k0 * ex
+        self.y += k0 * ey
+        self.vx += k1 * ex
+        self.vy += k1 * ey
+        self.p00, self.p01, self.p11 = (1.0 - k0) * p00, (1.0 - k0) * p01, p11 - k1 * p01
+        self.timestamp = timestamp
+
+    def lead(self, seconds: float, min_speed: float, max_distance: float) -> Tuple[float, float, bool]:
+        """Offset (dx, dy) of the cursor `seconds` ahead, and whether it had to be clamped."""
+        dx, dy = self.vx * seconds, self.vy * seconds
+        distance = math.hypot(dx, dy)
+        # Never farther than the last measured motion reaches in the same time: a stop or
+        # turn shows up there a frame before the filtered velocity follows
+        limit = min(max_distance, self.speed * seconds)
+        if self.speed < min_speed:
+            limit = 0.0
+        if distance <= limit:
+            return dx, dy, False
+        scale = limit / distance
+        return dx * scale, dy * scale, True
+
+
+class CursorPredictor:
+    """Predicts every tracked hand's cursor (index fingertip) `lead` seconds ahead.
+
+    `update` once per analyzed frame with its capture time, `predict` with
+    the latency to compensate. `process_noise` is the white-noise
+    acceleration density (px^2/s^3) of the motion model, `measurement_noise`
+    the variance (px^2) of the measured fingertip.
+    """
+
+    def __init__(self, size: Tuple[int, int] = (850, 550), max_lead: float = 0.15, max_distance: float = 80.0,
+                 min_speed: float = 60.0, process_noise: float = 1e5, measurement_noise: float = 4.0,
+                 landmark: str = "index_finger_tip"):
+        self.width, self.height = size
+        self.max_lead = max_lead
+        self.max_distance = max_distance
+        self.min_speed = min_speed
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.landmark = landmark
+        self._tracks: Dict[int, CursorTrack] = {}
+
+    def update(self, timestamp: float, hands: List[TrackedHand]) -> None:
+        """Feed the fingertips of one frame; hands no longer tracked are forgotten."""
+        seen = set()
+        for hand in hands:
+            point = hand["landmarks"].get(self.landmark)
+            if point is None:
+                continue
+            seen.add(hand["id"])
+            track = self._tracks.get(hand["id"])
+            if track is None:
+                self._tracks[hand["id"]] = CursorTrack(timestamp, point, self.measurement_noise)
+            elif timestamp > track.timestamp:
+                _score(track, timestamp, point)
+                track.correct(timestamp, point, self.process_noise, self.measurement_noise)
+        for hand_id in self._tracks.keys() - seen:
+            del self._tracks[hand_id]
+
+    def predict(self, lead: float) -> Dict[int, Point]:
+        """Cursor per hand id, `lead` seconds (clamped to `max_lead`) after the last update."""
+        lead = min(max(lead, 0.0), self.max_lead)
+        cursors = {}
+        for hand_id, track in self._tracks.items():
+            dx, dy, clamped = track.lead(lead, self.min_speed, self.max_distance)
+            if clamped:
+                CURSOR_PREDICTIONS_CLAMPED.inc()
+            CURSOR_LEAD_PX.observe(math.hypot(dx, dy))
+            x = min(max(track.x + dx, 0.0), self.width - 1.0)
+            y = min(max(track.y + dy, 0.0), self.height - 1.0)
+            if track.pending is None and lead > 0:
+                track.pending = (track.timestamp + lead, (x, y), track.measured)
+            cursors[hand_id] = (int(round(x)), int(round(y)))
+        return cursors
+
+
+def _score(track: CursorTrack, timestamp: float, point: Point) -> None:
+    if track.pending is not None and timestamp >= track.pending[0]:
+        # Both cursors were shown for this moment: how far each was from where the finger turned out to be
+        _, (px, py), (rx, ry) = track.pending
+        CURSOR_ERROR_PX.observe(math.hypot(px - point[0], py - point[1]), cursor="predicted")
+        CURSOR_ERROR_PX.observe(math.hypot(rx - point[0], ry - point[1]), cursor="measured")
+        track.pending = None
@@ -0,0 +1,78 @@
+"""Mirror / resize / RGB conversion into reused buffers.
+
+The naive path (`cv2.flip`, `cv2.resize`, `cv2.cvtColor`) allocates three
+full frames per call. `Preprocessor` writes into buffers it owns via the
+`dst=` arguments and produces the same bytes. Flip and resize are not
+fused into one `cv2.remap`: remap quantizes coordinates to 1/32 px, so its
+output differs from `resize` by up to one level, and it is slower.
+"""
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FrameBufferPool:
+    """Equally shaped uint8 frames handed out by `acquire` and returned with `release`.
+
+    When every buffer is out (a consumer kept its frame, or more frames are
+    in flight than `count`), `acquire` allocates a new one and counts a miss,
+    so a forgotten `release` costs an allocation, never a corrupted frame.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], count: int):
+        self.shape = shape
+        self.count = count
+        self.misses = 0
+        self._free: List[np.ndarray] = [np.empty(shape, dtype=np.uint8) for _ in range(count)]
+        self._lock = threading.Lock()
+
+    def acquire(self) -> np.ndarray:
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+            self.misses += 1
+        return np.empty(self.shape, dtype=np.uint8)
+
+    def release(self, buffer: Optional[np.ndarray]) -> None:
+        if buffer is None or buffer.shape != self.shape or buffer.dtype != np.uint8:
+            return
+        with self._lock:
+            if len(self._free) < self.count and not any(b is buffer for b in self._free):
+                self._free.append(buffer)
+
+
+class Preprocessor:
+    """Turns raw camera frames into mirrored `size` (w, h) BGR frames and RGB model input.
+
+    `mirror_resize` results come from `buffers` and belong to the caller
+    until handed back to `buffers.release`. `to_rgb` results live in one
+    scratch buffer that the next call overwrites.
+    """
+
+    def __init__(self, size: Tuple[int, int], buffers: int):
+        self.size = size
+        w, h = size
+        self.buffers = FrameBufferPool((h, w, 3), buffers)
+        self._flipped: Optional[np.ndarray] = None
+        self._rgb = np.empty(h * w * 3, dtype=np.uint8)
+
+    def mirror_resize(self, frame: np.ndarray) -> np.ndarray:
+        out = self.buffers.acquire()
+        if frame.shape == out.shape:
+            return cv2.flip(frame, 1, dst=out)
+        if self._flipped is None or self._flipped.shape != frame.shape:
+            self._flipped = np.empty(frame.shape, dtype=np.uint8)
+        # Flip before resizing: mirroring the smaller resized frame would be cheaper but is not bit-identical
+        cv2.flip(frame, 1, dst=self._flipped)
+        return cv2.resize(self._flipped, self.size, dst=out)
+
+    def to_rgb(self, frame: np.ndarray) -> np.ndarray:
+        """RGB copy of `frame` (a processed frame or a crop of one)."""
+        h, w = frame.shape[:2]
+        if h * w * 3 > self._rgb.size:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # A contiguous prefix of the scratch buffer, so crops of any size need no allocation
+        dst = self._rgb[:h * w * 3].reshape(h, w, 3)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=dst)
@@ -0,0 +1,219 @@
+"""Compact landmark recordings.
+
+A recording is a ``.npz`` file with one row per analyzed frame:
+
+    landmarks   float32 (frames, hands, 21, 3)  normalized x, y, z after smoothing, oldest tracked hand first;
+                                                NaN = no hand
+    ids         int32   (frames, hands)         tracked hand id (see `HandIdentities`); -1 = no hand
+    timestamps  float64 (frames,)               capture time in seconds
+    confidence  float32 (frames, hands)         handedness score; NaN if unknown
+    gestures    uint8   (frames, hands)         gesture bitmask per hand (see app.utils.framing)
+    inferred    bool    (frames,)               False for extrapolated frames
+    meta        JSON string                     {"version", "width", "height", ...}
+
+Extrapolated frames (see `LandmarkExtrapolator`) only carry the five
+fingertips, which is all `GestureEngine` consumes, so a replay of every
+hand, by id and at the recorded times, reproduces exactly what the engine
+saw. Version 1 recordings (first hand's gestures only, no ids) still load.
+Record from a frame source and replay with
+
+    cd backend && python -m app.core.recording record synthetic out.npz --frames 300
+    cd backend && python -m app.core.recording replay out.npz
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import MAX_HANDS
+from app.core.landmarks import FINGERTIPS
+from app.core.tracking import TrackedHand
+from app.utils.framing import pack_gestures, unpack_gestures
+
+FORMAT_VERSION = 2
+
+
+class LandmarkRecorder:
+    """Accumulates frames in memory until `save`."""
+
+    def __init__(self, max_hands: int = 1, width: int = 850, height: int = 550,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.max_hands = max_hands
+        self.meta = {"version": FORMAT_VERSION, "width": width, "height": height, **(metadata or {})}
+        self._landmarks: List[np.ndarray] = []
+        self._ids: List[np.ndarray] = []
+        self._timestamps: List[float] = []
+        self._confidence: List[np.ndarray] = []
+        self._gestures: List[np.ndarray] = []
+        self._inferred: List[bool] = []
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def add(self, timestamp: float, hands: np.ndarray, gestures: List[List[str]], ids: Optional[List[int]] = None,
+            confidence: Optional[List[float]] = None, inferred: bool = True) -> None:
+        """Add a frame; `hands` is (n, 21, 3) normalized with one gesture list and id per hand
+        (default 0, 1, ...), extra hands are dropped."""
+        row = np.full((self.max_hands, 21, 3), np.nan, dtype=np.float32)
+        hands = np.asarray(hands, dtype=np.float32)[:self.max_hands]
+        n = len(hands)
+        row[:n] = hands
+        hand_ids = np.full(self.max_hands, -1, dtype=np.int32)
+        hand_ids[:n] = list(ids)[:n] if ids is not None else range(n)
+        bits = np.zeros(self.max_hands, dtype=np.uint8)
+        bits[:n] = [pack_gestures(g) for g in list(gestures)[:n]]
+        scores = np.full(self.max_hands, np.nan, dtype=np.float32)
+        if confidence is not None:
+            confidence = list(confidence)[:self.max_hands]
+            scores[:len(confidence)] = confidence
+        self._landmarks.append(row)
+        self._ids.append(hand_ids)
+        self._timestamps.append(timestamp)
+        self._confidence.append(scores)
+        self._gestures.append(bits)
+        self._inferred.append(inferred)
+
+    def add_tracked(self, timestamp: float, hands: List[TrackedHand]) -> None:
+        """Add an extrapolated frame given as tracked hands with pixel fingertips."""
+        rows = np.full((len(hands), 21, 3), np.nan, dtype=np.float32)
+        for row, hand in zip(rows, hands):
+            for name, (x, y) in hand["landmarks"].items():
+                if name in FINGERTIPS:
+                    row[FINGERTIPS[name]] = (x / self.meta["width"], y / self.meta["height"], 0.0)
+        self.add(timestamp, rows, [hand["gestures"] for hand in hands], [hand["id"] for hand in hands],
+                 inferred=False)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            landmarks=np.stack(self._landmarks) if self._landmarks else np.zeros((0, self.max_hands, 21, 3), np.float32),
+            ids=np.stack(self._ids) if self._ids else np.zeros((0, self.max_hands), np.int32),
+            timestamps=np.asarray(self._timestamps, dtype=np.float64),
+            confidence=np.stack(self._confidence) if self._confidence else np.zeros((0, self.max_hands), np.float32),
+            gestures=np.stack(self._gestures) if self._gestures else np.zeros((0, self.max_hands), np.uint8),
+            inferred=np.asarray(self._inferred, dtype=bool),
+            meta=np.array(json.dumps(self.meta)),
+        )
+
+
+class LandmarkRecording:
+    """A loaded recording; columns are plain numpy arrays."""
+
+    def __init__(self, landmarks: np.ndarray, ids: np.ndarray, timestamps: np.ndarray, confidence: np.ndarray,
+                 gestures: np.ndarray, inferred: np.ndarray, meta: Dict[str, Any]):
+        self.landmarks = landmarks
+        self.ids = ids
+        self.timestamps = timestamps
+        self.confidence = confidence
+        self.gestures = gestures
+        self.inferred = inferred
+        self.meta = meta
+
+    @classmethod
+    def load(cls, path: str) -> "LandmarkRecording":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            landmarks, gestures = data["landmarks"], data["gestures"]
+            if meta.get("version") == 1:
+                # One bitmask for the first hand and no ids: number the hands of each frame
+                present = ~np.isnan(landmarks[:, :, 0, 0])
+                ids = np.where(present, np.arange(landmarks.shape[1], dtype=np.int32), -1)
+                gestures = np.zeros(present.shape, dtype=np.uint8)
+                gestures[:, 0] = data["gestures"]
+            elif meta.get("version") == FORMAT_VERSION:
+                ids = data["ids"]
+            else:
+                raise ValueError(f"Unsupported recording version {meta.get('version')}")
+            return cls(landmarks, ids, data["timestamps"], data["confidence"], gestures, data["inferred"], meta)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def duration(self) -> float:
+        return float(self.timestamps[-1] - self.timestamps[0]) if len(self) > 1 else 0.0
+
+    def fingertips(self, index: int, hand: int = 0) -> Dict[str, Tuple[int, int]]:
+        """Pixel fingertip dict of one frame, as produced by `FrameProcessor`."""
+        points = self.landmarks[index, hand]
+        w, h = self.meta["width"], self.meta["height"]
+        return {
+            name: (int(round(points[i, 0] * w)), int(round(points[i, 1] * h)))
+            for name, i in FINGERTIPS.items()
+            if not np.isnan(points[i, 0])
+        }
+
+    def hands(self, index: int) -> List[TrackedHand]:
+        """Tracked hands of one frame, as produced by `FrameProcessor.analyze` (handedness not recorded)."""
+        return [
+            {"id": int(self.ids[index, hand]), "handedness": None, "landmarks": self.fingertips(index, hand),
+             "gestures": unpack_gestures(int(self.gestures[index, hand]))}
+            for hand in np.flatnonzero(self.ids[index] >= 0)
+        ]
+
+    def frames(self) -> Iterator[Tuple[float, List[TrackedHand]]]:
+        """(timestamp, hands) per frame, the inputs of `GestureEngine.process`."""
+        for i in range(len(self)):
+            yield float(self.timestamps[i]), self.hands(i)
+
+
+def replay_engine(recording: LandmarkRecording, engine) -> int:
+    """Feed every frame into a `GestureEngine` at its recorded time; returns the number of frames."""
+    for timestamp, hands in recording.frames():
+        landmarks, gestures = (hands[0]["landmarks"], hands[0]["gestures"]) if hands else ({}, [])
+        engine.process(gestures, landmarks, hands, timestamp)
+    return len(recording)
+
+
+def record_source(processor, frames: int, recorder: Optional[LandmarkRecorder] = None) -> LandmarkRecorder:
+    """Analyze `frames` frames from a `FrameProcessor` into a recorder."""
+    recorder = recorder or LandmarkRecorder(max_hands=MAX_HANDS)
+    processor.recorder = recorder
+    try:
+        for _ in range(frames):
+            ok, frame, timestamp = processor.capture()
+            if not ok:
+                break
+            processor.analyze(frame, timestamp)
+    finally:
+        processor.recorder = None
+    return recorder
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record or replay hand landmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="analyze a frame source into a recording")
+    record.add_argument("source", help='camera index, "synthetic", video file or image directory')
+    record.add_argument("output")
+    record.add_argument("--frames", type=int, default=300)
+    replay = commands.add_parser("replay", help="replay a recording into a GestureEngine")
+    replay.add_argument("recording")
+    replay.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        from app.core.frame_processor import FrameProcessor
+        from app.core.sources import open_source
+        processor = FrameProcessor(source=open_source(args.source, paced=False, loop=False))
+        try:
+            recorder = record_source(processor, args.frames)
+        finally:
+            processor.release()
+        recorder.save(args.output)
+        print(f"Recorded {len(recorder)} frames to {args.output}")
+    else:
+        from app.core.gesture_engine import GestureEngine
+        from app.core.state import State
+        recording = LandmarkRecording.load(args.recording)
+        engine = GestureEngine(State())
+        start = time.perf_counter()
+        frames = sum(replay_engine(recording, engine) for _ in range(args.repeat))
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {frames} frames in {elapsed:.3f}s ({frames / max(elapsed, 1e-9):.0f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Landmark smoothing: a One Euro filter vectorized over whole landmark arrays.
+
+MediaPipe landmarks jitter by a few thousandths of the frame even when the
+hand is still, enough to flicker a gesture whose feature sits near its
+threshold and to make strokes wobble. A One Euro filter is an exponential
+moving average whose cutoff frequency rises with the signal's speed: a
+resting hand is smoothed heavily, a moving one hardly lags. Here every
+coordinate of (..., 21, 3) landmarks, e.g. all identity slots of
+`HandIdentities`, is filtered together in a fixed number of in-place NumPy
+operations per frame, so the cost does not grow with the number of hands
+or landmarks. Timing comes from capture timestamps, not processing time.
+The desktop app (GCID/hand_tracking.py) uses the same filter.
+"""
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class LandmarkFilter:
+    """One Euro filter over (*slots, 21, 3) normalized landmarks.
+
+    Per coordinate, cutoff = `min_cutoff` + `beta` * |speed| Hz, with the
+    speed (frame sizes per second) itself smoothed at `d_cutoff` Hz.
+    `reset(slots)` restarts slots taken over by a new hand: their next
+    input passes through unfiltered instead of being blended with the old
+    hand's landmarks.
+    """
+
+    def __init__(self, shape: Tuple[int, ...] = (21, 3), min_cutoff: float = 1.0, beta: float = 20.0,
+                 d_cutoff: float = 1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.value = np.zeros(shape, dtype=np.float32)
+        self.derivative = np.zeros(shape, dtype=np.float32)
+        self.timestamp: Optional[float] = None
+        self._restart = np.ones(shape[:-2], dtype=bool)
+        self._pending = True
+        # Scratch buffers: the update allocates nothing
+        self._step = np.empty(shape, dtype=np.float32)
+        self._alpha = np.empty(shape, dtype=np.float32)
+
+    def reset(self, slots=...) -> None:
+        """Forget `slots` (index or bool mask, default all); their next input is taken as is."""
+        self._restart[slots] = True
+        self._pending = True
+
+    def update(self, points: np.ndarray, timestamp: float) -> np.ndarray:
+        """Filter one frame captured at `timestamp` (seconds).
+
+        Returns the filter state itself: read or copy it, never write to it.
+        Repeated or older timestamps leave the state unchanged.
+        """
+        if self._pending:
+            restart = self._restart
+            self.value[restart] = points[restart]
+            self.derivative[restart] = 0.0
+            restart[...] = False
+            self._pending = False
+        if self.timestamp is None:
+            self.timestamp = timestamp
+        if timestamp <= self.timestamp:
+            return self.value
+        dt = timestamp - self.timestamp
+        self.timestamp = timestamp
+
+        # alpha(cutoff) = 1 / (1 + 1 / (2 pi cutoff dt)) = r / (1 + r) with r = 2 pi cutoff dt
+        r = 2.0 * math.pi * self.d_cutoff * dt
+        d_alpha = r / (1.0 + r)
+        step = np.subtract(points, self.value, out=self._step)
+        alpha = np.multiply(step, d_alpha / dt, out=self._alpha)
+        self.derivative *= 1.0 - d_alpha
+        self.derivative += alpha
+
+        k = 2.0 * math.pi * dt
+        np.abs(self.derivative, out=alpha)
+        alpha *= self.beta * k
+        alpha += self.min_cutoff * k
+        step *= alpha
+        alpha += 1.0
+        step /= alpha
+        self.value += step
+        return self.value
@@ -0,0 +1,222 @@
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.config import (
+    CAPTURE_BUFFER_SIZE, CAPTURE_FOURCC, CAPTURE_FPS, CAPTURE_HEIGHT, CAPTURE_THREADED, CAPTURE_WIDTH,
+)
+
+if TYPE_CHECKING:
+    from app.core.pipeline import LatestSlot
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+
+
+class FrameSource:
+    """Where camera frames come from.
+
+    `read()` returns (success, bgr_frame, capture_time), like
+    `cv2.VideoCapture.read` plus a timestamp; `success` is False once a
+    finite source is exhausted. Recorded and synthetic sources report
+    media time (start + index / fps), so a run is reproducible whether it
+    is `paced` to real time or runs as fast as possible.
+    """
+
+    fps: float = 30.0
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray], float]:
+        raise NotImplementedError
+
+    def release(self) -> None:
+        pass
+
+
+class _Pacer:
+    """Media clock for recorded sources; sleeps to real time when `paced`."""
+
+    def __init__(self, fps: float, paced: bool):
+        self.fps = fps
+        self.paced = paced
+        self.start = time.time()
+        self.index = 0
+
+    def tick(self) -> float:
+        timestamp = self.start + self.index / self.fps
+        self.index += 1
+        if self.paced:
+            delay = timestamp - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        return timestamp
+
+
+class CameraSource(FrameSource):
+    """A live capture device (always real time).
+
+    `cv2.VideoCapture.read` hands out frames from the driver's queue, which
+    are several frames old once the consumer falls behind. With `threaded`
+    a grab thread drains the device continuously into a `LatestSlot`, so
+    `read()` returns the newest frame, stamped when it came off the device;
+    frames nobody read are counted in `skipped`.
+    """
+
+    def __init__(self, index: int = 0, width: int = CAPTURE_WIDTH, height: int = CAPTURE_HEIGHT,
+                 fps: float = CAPTURE_FPS, fourcc: str = CAPTURE_FOURCC,
+                 buffer_size: int = CAPTURE_BUFFER_SIZE, threaded: bool = CAPTURE_THREADED):
+        self.cap = cv2.VideoCapture(index)
+        _configure_camera(self.cap, width, height, fps, fourcc, buffer_size)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or fps or 30.0
+        self.resolution = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self._latest: Optional["LatestSlot"] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if threaded and self.cap.isOpened():
+            # Imported here: the desktop app shares these sources without the server's dependencies
+            from app.core.pipeline import LatestSlot
+            self._latest = LatestSlot()
+            self._thread = threading.Thread(target=self._grab, name=f"gcid-camera-{index}", daemon=True)
+            self._thread.start()
+
+    @property
+    def skipped(self) -> int:
+        return self._latest.dropped if self._latest else 0
+
+    def _grab(self) -> None:
+        while not self._stop.is_set():
+            success, frame = self.cap.read()
+            self._latest.put((success, frame, time.time()))
+            if not success:
+                # Device unplugged or busy; don't spin on an instant failure
+                time.sleep(1 / self.fps)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray], float]:
+        if self._latest is None:
+            success, frame = self.cap.read()
+            return success, frame, time.time()
+        item = self._latest.get(timeout=1.0)
+        if item is None:
+            return False, None, time.time()
+        return item
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._latest.close()
+            # Let a read in progress finish before the device goes away
+            self._thread.join(timeout=1.0)
+        self.cap.release()
+
+
+def _configure_camera(cap: cv2.VideoCapture, width: int, height: int, fps: float,
+                      fourcc: str, buffer_size: int) -> None:
+    # FOURCC first: on V4L2 the available sizes and rates depend on the pixel format
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    if width and height:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    if buffer_size:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+
+class VideoFileSource(FrameSource):
+    """Frames decoded from a recorded video file."""
+
+    def __init__(self, path: str, paced: bool = False, loop: bool = False):
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video file '{path}'")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._pacer = _Pacer(self.fps, paced)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray], float]:
+        success, frame = self.cap.read()
+        if not success and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self.cap.read()
+        if not success:
+            return False, None, time.time()
+        return True, frame, self._pacer.tick()
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """The images of a directory in file name order, one per frame."""
+
+    def __init__(self, path: str, fps: float = 30.0, paced: bool = False, loop: bool = False):
+        self.files: List[str] = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self.files:
+            raise ValueError(f"No images found in '{path}'")
+        self.fps = fps
+        self.loop = loop
+        self._next = 0
+        self._pacer = _Pacer(fps, paced)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray], float]:
+        if self._next >= len(self.files):
+            if not self.loop:
+                return False, None, time.time()
+            self._next = 0
+        frame = cv2.imread(self.files[self._next])
+        self._next += 1
+        if frame is None:
+            return False, None, time.time()
+        return True, frame, self._pacer.tick()
+
+
+class SyntheticSource(FrameSource):
+    """Generated camera-like frames: a noisy gradient with a moving skin-toned blob.
+
+    Deterministic for a given `seed`; `frames` limits the length (None =
+    endless). Cheap enough that it never dominates a benchmark.
+    """
+
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 30.0,
+                 frames: Optional[int] = None, paced: bool = False, seed: int = 0):
+        self.width, self.height = width, height
+        self.fps = fps
+        self.frames = frames
+        self._pacer = _Pacer(fps, paced)
+        rng = np.random.default_rng(seed)
+        y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+        background = np.stack([60 + 80 * x / width, 80 + 60 * y / height, 70 + 40 * (x + y) / (width + height)], axis=2)
+        self._background = np.clip(background + rng.normal(0, 4, background.shape), 0, 255).astype(np.uint8)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray], float]:
+        index = self._pacer.index
+        if self.frames is not None and index >= self.frames:
+            return False, None, time.time()
+        timestamp = self._pacer.tick()
+        t = index / self.fps
+        frame = self._background.copy()
+        center = (int(self.width * (0.5 + 0.3 * np.cos(t))), int(self.height * (0.5 + 0.3 * np.sin(1.3 * t))))
+        cv2.circle(frame, center, min(self.width, self.height) // 8, (120, 160, 210), -1)
+        return True, frame, timestamp
+
+
+def open_source(spec: str, paced: bool = True, loop: bool = True) -> FrameSource:
+    """Build a source from a short description.
+
+    An integer is a camera index, "synthetic" the generator, a directory
+    an image sequence and anything else a video file.
+    """
+    if spec.isdigit():
+        return CameraSource(int(spec))
+    if spec == "synthetic":
+        return SyntheticSource(paced=paced)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, paced=paced, loop=loop)
+    return VideoFileSource(spec, paced=paced, loop=loop)
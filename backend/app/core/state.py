@@ -1,6 +1,9 @@
 import numpy as np
-from typing import Tuple, Dict, Any
-from app.utils.encoding import frame_to_base64
+from typing import Tuple, Dict, Any, List, Optional
+from app.config import CANVAS_TILE_SIZE
+from app.core.tiles import TileGrid
+from app.core.tracing import TRACER
+from app.utils.encoding import encode_frame, get_encoder, bytes_to_base64
 
 
 class State:
@@ -9,6 +12,13 @@ class State:
     Stores lightweight canvas pages (as numpy arrays), undo/redo stacks,
     drawing tool, color and thickness. Provides methods to manipulate
     the canvas and a JSON-serializable `serialize()` method.
+
+    Every mutator bumps `version`; the encoded canvas is cached against it
+    so unchanged state is never re-rendered or re-encoded. Changes to the
+    rendered canvas also mark the affected `tiles` dirty so that only those
+    regions need to be streamed (see `get_canvas_patches`). When
+    `record_ops` is set, ink changes are also logged as vector operations
+    for clients that render strokes themselves (see `take_ops`).
     """
 
     CANVAS_SIZE = (550, 850, 3)
@@ -42,7 +52,7 @@ class State:
         self.shape_mode_active = False
         self.selected_shape = None
         self.shape_start_point = None
-        self.last_point = None  # Track last drawing point
+        self.strokes: Dict[int, Tuple[int, Tuple[int, int]]] = {}  # hand id -> (stroke id, last point)
         
         # Selection / Freedom Select
         self.selecting = False
@@ -58,11 +68,88 @@ class State:
         self.background_color = (255, 255, 255) # BGR
         self.smoothing_factor = 0.5
 
+        # Change tracking
+        self.version = 0
+        self.tiles = TileGrid(*self.CANVAS_SIZE[:2], tile_size=CANVAS_TILE_SIZE)
+        self._composite_version = -1
+        self._composite = None
+        self._canvas_cache_version = -1
+        self._canvas_image = None
+        self._canvas_b64 = None
+        self.canvas_codec = "jpeg"
+        self.canvas_quality = None  # encoder default
+
+        # Vector operation log (only filled while a client consumes it)
+        self.record_ops = False
+        self.ops = []
+        self._stroke_id = 0
+
     # --- Canvas helpers ---
     @property
     def canvas(self) -> np.ndarray:
         return self.pages[self.current_page_index]
 
+    def touch(self, rect=None, redraw: bool = True) -> None:
+        """Mark the state as changed so cached encodings are refreshed.
+
+        `rect` (x1, y1, x2, y2) limits the dirty tiles to that region; by
+        default the whole canvas is dirty. Pass `redraw=False` for changes
+        that do not affect the rendered canvas.
+        """
+        self.version += 1
+        if not redraw:
+            return
+        if rect is None:
+            self.tiles.mark_all()
+        else:
+            self.tiles.mark_rect(*rect)
+
+    def draw_segment(self, start, end, color, thickness: int) -> None:
+        import cv2
+        cv2.line(self.canvas, start, end, color, thickness)
+        pad = thickness // 2 + 1
+        self.touch((min(start[0], end[0]) - pad, min(start[1], end[1]) - pad,
+                    max(start[0], end[0]) + pad, max(start[1], end[1]) + pad))
+
+    def _emit(self, op: str, **fields) -> None:
+        if self.record_ops:
+            self.ops.append({"op": op, **fields})
+
+    def take_ops(self) -> List[Dict[str, Any]]:
+        """Return and clear the pending vector operations."""
+        ops, self.ops = self.ops, []
+        return ops
+
+    # --- Strokes ---
+    def stroke_to(self, point, color, thickness: int, hand: int = 0) -> None:
+        """Extend the stroke of `hand` to `point`, starting a new stroke if it has none.
+
+        Every hand draws its own stroke, so several hands can draw at once.
+        """
+        stroke = self.strokes.get(hand)
+        if stroke is None:
+            self._stroke_id += 1
+            stroke_id = self._stroke_id
+            self._emit("stroke_begin", id=stroke_id, color=list(color),
+                       thickness=thickness, point=list(point))
+        else:
+            stroke_id, last_point = stroke
+            self.draw_segment(last_point, point, color, thickness)
+            self._emit("stroke_point", id=stroke_id, point=list(point))
+        self.strokes[hand] = (stroke_id, point)
+
+    def end_stroke(self, hand: Optional[int] = None) -> None:
+        """End the stroke of `hand`, or every active stroke."""
+        for h in [hand] if hand is not None else list(self.strokes):
+            stroke = self.strokes.pop(h, None)
+            if stroke is not None:
+                self._emit("stroke_end", id=stroke[0])
+
+    @property
+    def history_bytes(self) -> int:
+        """Memory held by the undo and redo snapshots."""
+        return sum(snapshot.nbytes for snapshot in self.undo_stack) + sum(snapshot.nbytes for snapshot in self.redo_stack)
+
     def save_state(self) -> None:
         self.undo_stack.append(self.canvas.copy())
         self.redo_stack.clear()
@@ -71,69 +158,146 @@ class State:
         if self.undo_stack:
             self.redo_stack.append(self.canvas.copy())
             self.pages[self.current_page_index] = self.undo_stack.pop()
+            self._emit("undo")
+            self.touch()
 
     def redo(self) -> None:
         if self.redo_stack:
             self.undo_stack.append(self.canvas.copy())
             self.pages[self.current_page_index] = self.redo_stack.pop()
+            self._emit("redo")
+            self.touch()
 
     def add_new_page(self) -> None:
         self.pages.append(np.ones(self.CANVAS_SIZE, dtype=np.uint8) * 255)
         self.current_page_index = len(self.pages) - 1
+        self._emit_page()
+        self.touch()
 
     def switch_page(self, direction: str) -> None:
         if direction == "next" and self.current_page_index < len(self.pages) - 1:
             self.current_page_index += 1
+            self._emit_page()
+            self.touch()
         elif direction == "prev" and self.current_page_index > 0:
             self.current_page_index -= 1
+            self._emit_page()
+            self.touch()
+
+    def _emit_page(self) -> None:
+        self._emit("page", index=self.current_page_index, total=len(self.pages))
 
     def erase_all(self) -> None:
         self.save_state()
         self.pages[self.current_page_index][:] = 255
+        self._emit("erase_all")
+        self.touch()
 
     # --- Tool setters ---
     def set_tool(self, tool: str) -> None:
         self.tool = tool
+        self.touch()
 
     def set_color(self, color) -> None:
         self.color = color
+        self.touch(redraw=False)
 
     def set_thickness(self, value: int) -> None:
         self.thickness = max(1, int(value))
+        self.touch(redraw=False)
 
     def cycle_color(self) -> None:
         self._palette_index = (self._palette_index + 1) % len(self.palette)
         self.color = self.palette[self._palette_index]
+        self.touch(redraw=False)
+
+    def toggle_control_panel(self) -> None:
+        self.control_panel_visible = not self.control_panel_visible
+        self.touch()
+
+    def select_shape(self, shape: str) -> None:
+        self.shape_mode_active = True
+        self.selected_shape = shape
+        self.tool = 'shape' # Implicit tool switch
+        self.touch()
 
     # --- Serialization ---
-    def get_canvas_base64(self) -> str:
+    def get_display_canvas(self) -> np.ndarray:
+        """Composite of the current page and the UI, cached per version."""
+        if self._composite_version == self.version:
+            return self._composite
+
         # Create a copy of the canvas for display
         display_canvas = self.canvas.copy()
         
         # Draw UI elements on top (imported locally to avoid circular imports)
         from app.core.ui_drawer import draw_all_ui
         draw_all_ui(display_canvas, self)
-        
-        # Convert composite canvas to base64
-        return frame_to_base64(display_canvas)
-
-    def serialize(self) -> Dict[str, Any]:
-        return {
-            "tool": self.tool,
-            "color": list(self.color),
-            "thickness": self.thickness,
-            "page_index": self.current_page_index,
-            "total_pages": len(self.pages),
-            "canvas": self.get_canvas_base64(),
-            "shape_mode": self.shape_mode_active,
-            "selected_shape": self.selected_shape,
-            "control_panel": self.control_panel_visible
-        }
+
+        self._composite = display_canvas
+        self._composite_version = self.version
+        return display_canvas
+
+    @property
+    def canvas_format(self) -> str:
+        """Image format ("jpeg", "webp", "png") of the encoded canvas and patches."""
+        return get_encoder(self.canvas_codec).format
+
+    def get_canvas_image(self) -> bytes:
+        if self._canvas_cache_version == self.version:
+            return self._canvas_image
+
+        self._canvas_image = encode_frame(self.get_display_canvas(), self.canvas_codec, self.canvas_quality)
+        self._canvas_b64 = None
+        self._canvas_cache_version = self.version
+        return self._canvas_image
+
+    def get_canvas_patches(self) -> List[Tuple[int, int, int, int, bytes]]:
+        """Encode the dirty tiles as (x, y, w, h, image) patches and clear them."""
+        display_canvas = self.get_display_canvas()
+        return [
+            (x, y, w, h, encode_frame(display_canvas[y:y + h, x:x + w], self.canvas_codec, self.canvas_quality))
+            for x, y, w, h in self.tiles.take_dirty()
+        ]
+
+    def set_canvas_encoding(self, codec: str, quality=None) -> None:
+        if (codec, quality) != (self.canvas_codec, self.canvas_quality):
+            self.canvas_codec = codec
+            self.canvas_quality = quality
+            self.touch()
+
+    def request_keyframe(self) -> None:
+        """Force the next canvas update to be a full resync."""
+        self.touch()
+
+    def get_canvas_base64(self) -> str:
+        image = self.get_canvas_image()
+        if self._canvas_b64 is None:
+            self._canvas_b64 = bytes_to_base64(image)
+        return self._canvas_b64
+
+    def serialize(self, include_canvas: bool = True) -> Dict[str, Any]:
+        with TRACER.span("state.serialize", canvas=include_canvas):
+            data = {
+                "tool": self.tool,
+                "color": list(self.color),
+                "thickness": self.thickness,
+                "page_index": self.current_page_index,
+                "total_pages": len(self.pages),
+                "shape_mode": self.shape_mode_active,
+                "selected_shape": self.selected_shape,
+                "control_panel": self.control_panel_visible
+            }
+            if include_canvas:
+                data["canvas"] = self.get_canvas_base64()
+                data["canvas_format"] = self.canvas_format
+            return data
 
     # --- Advanced Logic ---
     def update_background(self, b, g, r):
         """Update canvas background color."""
         self.background_color = (b, g, r)
+        self.touch(redraw=False)
         for page in self.pages:
             # Only update pixels that were originally white/background?
             # For simplicity in this implementation, we might just flood fill or set all
@@ -145,6 +309,7 @@ class State:
         self.selection_mask = np.zeros(self.CANVAS_SIZE[:2], dtype=np.uint8)
         self.current_selection = []
         self.save_state()
+        self.touch(redraw=False)
 
     def update_selection(self, x, y):
         import cv2
@@ -156,6 +321,7 @@ class State:
             pts = np.array(self.current_selection, np.int32)
             pts = pts.reshape((-1, 1, 2))
             cv2.fillPoly(self.selection_mask, [pts], 255)
+        self.touch(redraw=False)
 
     def complete_selection(self):
         import cv2
@@ -168,6 +334,7 @@ class State:
             self.selected_region[self.selection_mask == 0] = 0 
             self.current_selection = []
             self.save_state()
+            self.touch(redraw=False)
         else:
             self.cancel_selection()
 
@@ -177,3 +344,4 @@ class State:
         self.selection_mask = None
         self.current_selection = []
         self.selected_region = None
+        self.touch(redraw=False)
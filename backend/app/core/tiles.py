@@ -0,0 +1,60 @@
+import numpy as np
+from typing import List, Tuple
+
+
+class TileGrid:
+    """Per-tile dirty bits for a canvas split into fixed square tiles.
+
+    Drawing paths mark the pixel rectangles they touch; `take_dirty()`
+    returns the dirty tiles (merged into horizontal runs to keep the number
+    of encoded patches low) and clears them.
+    """
+
+    def __init__(self, height: int, width: int, tile_size: int = 64):
+        self.height = height
+        self.width = width
+        self.tile_size = tile_size
+        self.rows = -(-height // tile_size)
+        self.cols = -(-width // tile_size)
+        # Everything is dirty until the first keyframe has been sent
+        self.dirty = np.ones((self.rows, self.cols), dtype=bool)
+
+    def mark_rect(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """Mark tiles overlapping the inclusive pixel rectangle (x1, y1)-(x2, y2)."""
+        x1, x2 = sorted((x1, x2))
+        y1, y2 = sorted((y1, y2))
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(self.width - 1, x2), min(self.height - 1, y2)
+        if x1 > x2 or y1 > y2:
+            return
+        ts = self.tile_size
+        self.dirty[y1 // ts:y2 // ts + 1, x1 // ts:x2 // ts + 1] = True
+
+    def mark_all(self) -> None:
+        self.dirty[:] = True
+
+    def clear(self) -> None:
+        self.dirty[:] = False
+
+    @property
+    def all_dirty(self) -> bool:
+        return bool(self.dirty.all())
+
+    def take_dirty(self) -> List[Tuple[int, int, int, int]]:
+        """Return dirty regions as (x, y, w, h) pixel rects and clear them."""
+        ts = self.tile_size
+        rects = []
+        for r in np.flatnonzero(self.dirty.any(axis=1)).tolist():
+            row = self.dirty[r]
+            c = 0
+            while c < self.cols:
+                if not row[c]:
+                    c += 1
+                    continue
+                start = c
+                while c < self.cols and row[c]:
+                    c += 1
+                x, y = start * ts, r * ts
+                rects.append((x, y, min(c * ts, self.width) - x, min(y + ts, self.height) - y))
+        self.clear()
+        return rects
@@ -0,0 +1,110 @@
+"""Per-frame tracing into a ring buffer, exported as a Chrome trace.
+
+Every captured frame gets a trace id. Pipeline stages, gesture handling,
+state serialization and sends record spans tagged with it, and the last
+`TRACE_BUFFER_SIZE` spans can be dumped at any time as Chrome/Perfetto
+JSON (open in chrome://tracing or ui.perfetto.dev). While tracing is off
+`span()` returns a shared no-op context, so it can stay on hot paths.
+"""
+import collections
+import itertools
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import TRACE_BUFFER_SIZE, TRACE_ENABLED
+
+_frame_ids = itertools.count(1)
+_local = threading.local()
+
+
+def next_frame_id() -> int:
+    return next(_frame_ids)
+
+
+def set_frame(frame_id: Optional[int]) -> None:
+    """Trace id that spans on this thread are tagged with until changed."""
+    _local.frame = frame_id
+
+
+def current_frame() -> Optional[int]:
+    return getattr(_local, "frame", None)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "frame", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, frame: Optional[int], args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.frame = frame
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns() - self.start, self.frame, self.args)
+        return False
+
+
+class Tracer:
+    def __init__(self, capacity: int = TRACE_BUFFER_SIZE, enabled: bool = TRACE_ENABLED):
+        self.enabled = enabled
+        self._events = collections.deque(maxlen=capacity)
+        self._threads: Dict[int, str] = {}
+        self._pid = os.getpid()
+
+    def enable(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+
+    def clear(self) -> None:
+        self._events.clear()
+
+    def span(self, name: str, frame: Optional[int] = None, **args):
+        """Time a block; `frame` defaults to the thread's current trace id."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, frame if frame is not None else current_frame(), args)
+
+    def record(self, name: str, start_ns: int, duration_ns: int,
+               frame: Optional[int] = None, args: Optional[Dict[str, Any]] = None) -> None:
+        thread = threading.current_thread()
+        self._threads.setdefault(thread.ident, thread.name)
+        # deque.append with maxlen is atomic, so stage threads need no lock
+        self._events.append((name, start_ns, duration_ns, thread.ident, frame, args))
+
+    def export(self) -> Dict[str, Any]:
+        """Chrome trace-event JSON of the buffered spans."""
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self._threads.items())
+        ]
+        for name, start_ns, duration_ns, tid, frame, args in list(self._events):
+            event_args = dict(args or {})
+            if frame is not None:
+                event_args["frame"] = frame
+            events.append({
+                "name": name, "cat": "gcid", "ph": "X", "pid": self._pid, "tid": tid,
+                "ts": start_ns / 1000, "dur": duration_ns / 1000, "args": event_args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "spans": len(self._events), "capacity": self._events.maxlen}
+
+
+TRACER = Tracer()
@@ -0,0 +1,244 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+Landmarks = Dict[str, Tuple[int, int]]
+# One tracked hand as sent to clients: {"id", "handedness", "landmarks", "gestures"}
+TrackedHand = Dict[str, Any]
+
+
+class LandmarkExtrapolator:
+    """Decides when the hand model can be skipped and fills in the gap.
+
+    The model runs on every `stride`-th frame. In between, fingertips are
+    extrapolated linearly from the last two detections and the last
+    gestures are held, for every tracked hand (keyed by hand id). Every
+    frame is inferred while a hand moves faster than `max_speed` px/s,
+    while thumb and index are within `pinch_guard` (normalized) of each
+    other so pinch transitions are never missed, and while a hand has no
+    motion history to extrapolate from.
+    """
+
+    def __init__(self, stride: int, max_speed: float, pinch_guard: float, size: Tuple[int, int]):
+        self.stride = max(1, int(stride))
+        self.max_speed = max_speed
+        self.pinch_guard = pinch_guard
+        self.width, self.height = size
+        self.skipped = 0
+        self._prev: Optional[Tuple[float, Dict[int, Landmarks]]] = None
+        self._last: Optional[Tuple[float, Dict[int, Landmarks]]] = None
+        self._gestures: Dict[int, List[str]] = {}
+        self._velocity: Dict[Tuple[int, str], Tuple[float, float]] = {}
+
+    def should_infer(self) -> bool:
+        if self.stride == 1 or self.skipped + 1 >= self.stride:
+            return True
+        if self._last is None or not self._last[1]:
+            return False  # no hand: keep the stride, nothing to extrapolate
+        if self._prev is None or not self._last[1].keys() <= self._prev[1].keys():
+            return True
+        return self._max_speed() > self.max_speed or self._near_pinch()
+
+    def update(self, timestamp: float, hands: Dict[int, Landmarks], gestures: Dict[int, List[str]]) -> None:
+        """Record a real detection: fingertips and gestures per hand id."""
+        self._prev, self._last = self._last, (timestamp, hands)
+        self._gestures = gestures
+        self.skipped = 0
+        self._velocity = {}
+        if self._prev is None:
+            return
+        dt = timestamp - self._prev[0]
+        if dt <= 0:
+            return
+        for hand, landmarks in hands.items():
+            previous = self._prev[1].get(hand, {})
+            for name, (x, y) in landmarks.items():
+                if name in previous:
+                    px, py = previous[name]
+                    self._velocity[hand, name] = ((x - px) / dt, (y - py) / dt)
+
+    def predict(self, timestamp: float) -> Tuple[Dict[int, Landmarks], Dict[int, List[str]]]:
+        """Extrapolated fingertips and held gestures per hand id for a skipped frame."""
+        self.skipped += 1
+        if self._last is None:
+            return {}, {}
+        t0, hands = self._last
+        dt = timestamp - t0
+        predicted = {}
+        for hand, landmarks in hands.items():
+            predicted[hand] = {}
+            for name, (x, y) in landmarks.items():
+                vx, vy = self._velocity.get((hand, name), (0.0, 0.0))
+                predicted[hand][name] = (
+                    min(max(int(x + vx * dt), 0), self.width - 1),
+                    min(max(int(y + vy * dt), 0), self.height - 1),
+                )
+        return predicted, {hand: list(gestures) for hand, gestures in self._gestures.items()}
+
+    def _max_speed(self) -> float:
+        return max((math.hypot(vx, vy) for vx, vy in self._velocity.values()), default=0.0)
+
+    def _near_pinch(self) -> bool:
+        for landmarks in self._last[1].values():
+            if "thumb_tip" not in landmarks or "index_finger_tip" not in landmarks:
+                continue
+            (tx, ty), (ix, iy) = landmarks["thumb_tip"], landmarks["index_finger_tip"]
+            dx, dy = (tx - ix) / self.width, (ty - iy) / self.height
+            if (dx * dx + dy * dy) ** 0.5 < self.pinch_guard:
+                return True
+        return False
+
+
+# Wrist and the four finger MCPs: the palm, which moves least while the fingers gesture
+_PALM = [0, 5, 9, 13, 17]
+
+
+class HandIdentities:
+    """Stable ids and handedness for the hands found by successive inferences.
+
+    Each detection is matched to a hand of the previous inference by palm
+    centre distance (normalized), nearest pairs first, never to a hand known
+    to be the other side and, when there is more than one hand to tell
+    apart, never farther than `max_distance`.
+    Unmatched detections get a fresh id and a free slot; hands not found
+    again are dropped. A hand keeps its slot while it is tracked, so slots
+    index per-hand state such as `GestureClassifier` rows; `started` marks
+    the slots taken by a new hand in the last `assign`. Handedness is a
+    running vote over the model's per-frame labels, so one mislabelled
+    frame does not flip it.
+    """
+
+    def __init__(self, slots: int, max_distance: float):
+        self.slots = max(1, int(slots))
+        self.max_distance = max_distance
+        self.ids = np.full(self.slots, -1, dtype=np.int64)  # -1 = free slot
+        self.started = np.zeros(self.slots, dtype=bool)
+        self._centers = np.zeros((self.slots, 2))
+        self._votes = np.zeros(self.slots)  # > 0 right, < 0 left
+        self._next_id = 1
+
+    def assign(self, hands: np.ndarray, handedness: Sequence[Tuple[str, float]] = ()) -> np.ndarray:
+        """(n, 21, 3) normalized hands and their (label, score) -> (n,) slot per hand, -1 once slots run out."""
+        n = len(hands)
+        centers = hands[:, _PALM, :2].mean(axis=1)
+        sides = np.zeros(n)
+        for i, (label, score) in enumerate(list(handedness)[:n]):
+            sides[i] = score if label == "Right" else -score
+
+        tracked = self.ids >= 0
+        distance = np.sqrt(((self._centers[:, None] - centers[None]) ** 2).sum(-1))  # (slots, n)
+        distance[~tracked] = np.inf
+        distance[np.sign(self._votes)[:, None] * np.sign(sides)[None] < 0] = np.inf
+        if tracked.sum() > 1 or n > 1:
+            # A lone hand that stays alone keeps its id however fast it moved
+            distance[distance > self.max_distance] = np.inf
+
+        slots = np.full(n, -1, dtype=np.int64)
+        matched = np.zeros(self.slots, dtype=bool)
+        for flat in np.argsort(distance, axis=None):
+            slot, hand = divmod(int(flat), n)
+            if not np.isfinite(distance[slot, hand]):
+                break
+            if not matched[slot] and slots[hand] < 0:
+                matched[slot] = True
+                slots[hand] = slot
+
+        lost = tracked & ~matched
+        self.ids[lost] = -1
+        self._votes[lost] = 0.0
+        self.started[:] = False
+        free = list(np.flatnonzero(self.ids < 0))
+        for hand in np.flatnonzero(slots < 0):
+            if not free:
+                break
+            slot = free.pop(0)
+            self.ids[slot] = self._next_id
+            self._next_id += 1
+            self.started[slot] = True
+            slots[hand] = slot
+
+        found = slots >= 0
+        self._centers[slots[found]] = centers[found]
+        # Bounded, so a hand the model keeps labelling differently can still flip
+        self._votes[slots[found]] = np.clip(self._votes[slots[found]] + sides[found], -5.0, 5.0)
+        return slots
+
+    def handedness(self, hand_id: int) -> Optional[str]:
+        """"Left", "Right" or None (unknown) for a tracked hand id."""
+        slot = np.flatnonzero(self.ids == hand_id)
+        if not len(slot) or self._votes[slot[0]] == 0:
+            return None
+        return "Right" if self._votes[slot[0]] > 0 else "Left"
+
+
+Region = Tuple[int, int, int, int]  # (x, y, w, h) in frame pixels
+
+
+class HandROI:
+    """Chooses the part of the frame the hand model looks at.
+
+    After a detection the next inference only sees a square crop around the
+    hand box, padded by `margin` of its size plus the distance the hand
+    covers in `lookahead` seconds at its current speed. The crop stays put
+    while the hand remains well inside it, so the model's own frame-to-frame
+    tracking sees a stable image. A lost hand, and every
+    `full_search_interval`-th inference, fall back to the full frame.
+
+    With several hands the crop covers all of them, so it is only used
+    while all `max_hands` hands are tracked (otherwise a new hand could
+    not be found in it) and while their padded box fits in the largest
+    crop; two hands far apart are searched for in the full frame.
+    """
+
+    def __init__(self, size: Tuple[int, int], margin: float, lookahead: float,
+                 min_size: int, full_search_interval: int, max_hands: int = 1):
+        self.width, self.height = size
+        self.max_hands = max(1, int(max_hands))
+        self.margin = margin
+        self.lookahead = lookahead
+        self.min_size = min_size
+        self.full_search_interval = full_search_interval
+        self._region: Optional[Region] = None
+        self._since_full = 0
+        self._center: Optional[Tuple[float, float, float]] = None  # (t, cx, cy)
+
+    def region(self) -> Optional[Region]:
+        """Crop for the next inference, or None for the full frame."""
+        if self._region is None or self._since_full >= self.full_search_interval:
+            self._since_full = 0
+            return None
+        self._since_full += 1
+        return self._region
+
+    def update(self, timestamp: float, box: Optional[Region], hands: int = 1) -> None:
+        """Record the box (frame pixels) around the `hands` hands found by the last inference."""
+        if box is None or hands < self.max_hands:
+            self._region, self._center = None, None
+            return
+
+        bx, by, bw, bh = box
+        cx, cy = bx + bw / 2, by + bh / 2
+        speed = 0.0
+        if self._center is not None and timestamp > self._center[0]:
+            t0, px, py = self._center
+            speed = math.hypot(cx - px, cy - py) / (timestamp - t0)
+        self._center = (timestamp, cx, cy)
+
+        if max(bw, bh) * (1 + 2 * self.margin) > min(self.width, self.height):
+            self._region = None  # a crop this size would cut a hand off
+            return
+        if self._region is not None and self._contains(self._region, box, self.margin / 2 * max(bw, bh)):
+            return
+        side = max(bw, bh) * (1 + 2 * self.margin) + 2 * speed * self.lookahead
+        side = int(min(max(side, self.min_size), self.width, self.height))
+        x = int(min(max(cx - side / 2, 0), self.width - side))
+        y = int(min(max(cy - side / 2, 0), self.height - side))
+        self._region = (x, y, side, side)
+
+    @staticmethod
+    def _contains(region: Region, box: Region, inset: float) -> bool:
+        rx, ry, rw, rh = region
+        bx, by, bw, bh = box
+        return (bx - inset >= rx and by - inset >= ry
+                and bx + bw + inset <= rx + rw and by + bh + inset <= ry + rh)
@@ -1,9 +1,22 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.ws import router as ws_router
 from app.api.health import router as health_router
+from app.api.metrics import router as metrics_router
+from app.api.trace import router as trace_router
+from app.core.inference_pool import close_inference_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Inference worker processes outlive the app unless stopped
+    close_inference_pool()
 
-app = FastAPI(title="Gesture Craft Backend")
+
+app = FastAPI(title="Gesture Craft Backend", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -16,4 +29,5 @@ app.add_middleware(
 
 app.include_router(ws_router)
 app.include_router(health_router)
-
+app.include_router(metrics_router)
+app.include_router(trace_router)
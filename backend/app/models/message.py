@@ -1,25 +1,72 @@
-from pydantic import BaseModel
-from typing import List, Any, Dict
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Any, Dict, Optional, Tuple
+
+from app.config import CAMERAS
+from app.utils.encoding import available_encoders
 
 
 class FrameMessage(BaseModel):
     type: str = "frame"
     image: str   # base64 encoded image
+    format: str = "jpeg"
     landmarks: Dict[str, Any] = {}
     gestures: List[str] = []
 
 
 class StateMessage(BaseModel):
+    """`State.serialize()` plus the type. In tiles and vector canvas modes only
+    keyframes carry the canvas; other state updates leave it out and the ink
+    follows as canvas_patch / ops messages."""
     type: str = "state"
     tool: str
     color: List[int]
     thickness: int
     page_index: int
     total_pages: int
-    canvas: str  # base64 encoded canvas
+    shape_mode: bool = False
+    selected_shape: Optional[str] = None
+    control_panel: bool = False
+    canvas: Optional[str] = None  # base64 encoded canvas, keyframes only
+    canvas_format: Optional[str] = None  # encoder of `canvas` (jpeg, webp, png), set with it
 
 
 class CommandMessage(BaseModel):
     type: str = "command"
     action: str
     params: Dict[str, Any] = {}
+
+
+class StreamOptions(BaseModel):
+    """Per-connection stream settings.
+
+    Negotiated from the `/ws` query string on connect and changed later
+    with a `set_stream` command carrying any subset of these fields, except
+    `camera`, which is fixed for the connection.
+    """
+    camera: int = 0  # one of config.CAMERAS
+    width: int = Field(850, ge=16, le=3840)
+    height: int = Field(550, ge=16, le=2160)
+    jpeg_quality: int = Field(95, ge=1, le=100)  # quality of the lossy codecs (jpeg, webp)
+    max_fps: float = Field(30.0, gt=0, le=120)
+    frames: bool = True  # False: landmarks and gestures only, no camera image
+    codec: str = "jpeg"  # camera frame encoder, see app.utils.encoding
+    canvas_codec: str = "jpeg"  # canvas encoder; "png" suits the flat-colored board
+
+    @field_validator("codec", "canvas_codec")
+    @classmethod
+    def _known_encoder(cls, name: str) -> str:
+        if name not in available_encoders():
+            raise ValueError(f"unknown encoder '{name}'")
+        return name
+
+    @field_validator("camera")
+    @classmethod
+    def _known_camera(cls, index: int) -> int:
+        if index not in CAMERAS:
+            raise ValueError(f"unknown camera {index}")
+        return index
+
+    @property
+    def variant(self) -> Tuple[int, int, int, str]:
+        """Key of the encoded camera frame this client needs."""
+        return (self.width, self.height, self.jpeg_quality, self.codec)
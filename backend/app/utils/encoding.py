@@ -1,6 +1,147 @@
 import base64
+import struct
+import zlib
+from typing import Callable, Dict, List, Optional
+
 import cv2
+import numpy as np
+
+# Optional faster JPEG backend (PyTurboJPEG); registered only when usable
+try:
+    from turbojpeg import TurboJPEG
+    _turbo = TurboJPEG()
+except Exception:
+    _turbo = None
+
+
+class Encoder:
+    """A named image codec: `encode(frame, quality)` -> bytes in `format`."""
+
+    def __init__(self, name: str, format: str, encode: Callable[[np.ndarray, Optional[int]], bytes]):
+        self.name = name
+        self.format = format  # "jpeg", "webp" or "png"
+        self.encode = encode
+
+    @property
+    def mime(self) -> str:
+        return f"image/{self.format}"
+
+
+_encoders: Dict[str, Encoder] = {}
+
+
+def register_encoder(name: str, format: str, encode: Callable[[np.ndarray, Optional[int]], bytes]) -> None:
+    _encoders[name] = Encoder(name, format, encode)
+
+
+def get_encoder(name: str) -> Encoder:
+    try:
+        return _encoders[name]
+    except KeyError:
+        raise ValueError(f"Unknown encoder '{name}', available: {available_encoders()}")
+
+
+def available_encoders() -> List[str]:
+    return sorted(_encoders)
+
+
+# --- Built-in encoders ---
+def frame_to_jpeg(frame, quality=None) -> bytes:
+    params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)] if quality else []
+    _, buffer = cv2.imencode(".jpg", frame, params)
+    return buffer.tobytes()
+
+
+def frame_to_webp(frame, quality=None) -> bytes:
+    # OpenCV treats quality > 100 as lossless
+    params = [cv2.IMWRITE_WEBP_QUALITY, int(quality)] if quality else []
+    _, buffer = cv2.imencode(".webp", frame, params)
+    return buffer.tobytes()
+
+
+def frame_to_png(frame, quality=None) -> bytes:
+    """8-bit palette PNG, several times smaller than RGB for the ink canvas.
+
+    Images with at most 256 colors are stored losslessly; otherwise the 255
+    most frequent colors besides the background are kept and the rest
+    (anti-aliased text edges) snap to the nearest of them. Images with
+    too many distinct colors (camera frames) fall back to an RGB PNG.
+    """
+    indexed = _palette_png(frame)
+    if indexed is not None:
+        return indexed
+    _, buffer = cv2.imencode(".png", frame, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    return buffer.tobytes()
+
+
+_MAX_PALETTE_SOURCE_COLORS = 4096
+
+
+def _palette_png(frame) -> Optional[bytes]:
+    h, w = frame.shape[:2]
+    packed = (frame[..., 0].astype(np.uint32)
+              | (frame[..., 1].astype(np.uint32) << 8)
+              | (frame[..., 2].astype(np.uint32) << 16)).ravel()
+
+    # Cheap bail-out for photographic frames before sorting every pixel
+    if len(np.unique(packed[::16])) > _MAX_PALETTE_SOURCE_COLORS:
+        return None
+
+    # Most of a canvas is background; only sort the remaining pixels
+    background = packed[0]
+    others = packed != background
+    colors, inverse, counts = np.unique(packed[others], return_inverse=True, return_counts=True)
+    if len(colors) > _MAX_PALETTE_SOURCE_COLORS:
+        return None
+    if len(colors) > 255:
+        keep = np.sort(np.argsort(counts)[::-1][:255])
+        rgb_all = _unpack_rgb(colors).astype(np.int32)
+        dist = ((rgb_all[:, None, :] - rgb_all[keep][None, :, :]) ** 2).sum(axis=2)
+        remap = np.argmin(dist, axis=1)
+        colors, inverse = colors[keep], remap[inverse]
+    palette = np.concatenate(([background], colors)).astype(np.uint32)
+    indices = np.zeros(packed.shape, dtype=np.uint8)
+    indices[others] = inverse + 1
+
+    rows = np.zeros((h, w + 1), dtype=np.uint8)  # leading 0 = no filter per row
+    rows[:, 1:] = indices.reshape(h, w)
+    rgb = _unpack_rgb(palette)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 3, 0, 0, 0)),
+        chunk(b"PLTE", rgb.tobytes()),
+        chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)),
+        chunk(b"IEND", b""),
+    ))
+
+
+def _unpack_rgb(packed: np.ndarray) -> np.ndarray:
+    """Packed 0xRRGGBB values -> (N, 3) uint8 RGB rows, as PNG palettes expect."""
+    return np.stack([(packed >> 16) & 255, (packed >> 8) & 255, packed & 255], axis=1).astype(np.uint8)
+
+
+def frame_to_turbojpeg(frame, quality=None) -> bytes:
+    return _turbo.encode(frame, quality=int(quality) if quality else 95)
+
+
+register_encoder("jpeg", "jpeg", frame_to_jpeg)
+register_encoder("webp", "webp", frame_to_webp)
+register_encoder("png", "png", frame_to_png)
+if _turbo is not None:
+    register_encoder("turbojpeg", "jpeg", frame_to_turbojpeg)
+
+
+def encode_frame(frame, codec: str = "jpeg", quality=None) -> bytes:
+    return get_encoder(codec).encode(frame, quality)
+
+
+def bytes_to_base64(data: bytes) -> str:
+    return base64.b64encode(data).decode("utf-8")
+
 
 def frame_to_base64(frame):
-    _, buffer = cv2.imencode(".jpg", frame)
-    return base64.b64encode(buffer).decode("utf-8")
+    return bytes_to_base64(frame_to_jpeg(frame))
@@ -0,0 +1,177 @@
+"""Binary WebSocket framing.
+
+Every binary message starts with a fixed little-endian header:
+
+    msg_type u8 | version u8 | flags u16 | seq u32 | timestamp f64 | meta_len u32 | payload_len u32
+
+followed by ``meta_len`` bytes of metadata and ``payload_len`` bytes of
+payload. For frames the metadata is the compact landmark block of the
+first hand, optionally followed by the hands block describing every
+tracked hand, and the payload the encoded image; for state updates the
+metadata is the UTF-8 JSON state (without the canvas) and the payload the
+encoded canvas, if any. Canvas patches carry a rect table (u16 count, then u16 x, y, w, h and
+u32 length per patch) and the concatenated tile images. Vector operation
+batches carry their compact JSON list as metadata and no payload.
+
+The image format of frame, state and patch payloads is stored in the top
+four bits of the flags (see ``IMAGE_FORMATS``); the low bits of frame
+flags hold the gesture bitmask.
+"""
+import json
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+VERSION = 1
+
+MSG_FRAME = 1
+MSG_STATE = 2
+MSG_PATCH = 3
+MSG_OPS = 4
+
+HEADER = struct.Struct("<BBHIdII")
+
+# Gestures are sent as a bitmask in the header flags
+GESTURE_BITS = {
+    "OPEN_PALM": 1 << 0,
+    "FIST": 1 << 1,
+    "THUMB_PINKY": 1 << 2,
+    "PINCH": 1 << 3,
+}
+
+# Landmark block: u8 count, then count x (u8 landmark id, i16 x, i16 y)
+LANDMARK_IDS = [
+    "thumb_tip", "index_finger_tip", "middle_finger_tip", "ring_finger_tip", "pinky_tip",
+    "cursor",  # predicted cursor, see app.core.prediction
+]
+_LANDMARK_INDEX = {name: i for i, name in enumerate(LANDMARK_IDS)}
+_LANDMARK = struct.Struct("<Bhh")
+
+# Hands block, after the landmark block: u8 count, then per hand u16 id,
+# u8 handedness (index into HANDEDNESS), u8 gesture bitmask and its own landmark block
+HANDEDNESS = [None, "Left", "Right"]
+_HAND = struct.Struct("<HBB")
+
+# Image payload format, stored in flags bits 12-15
+IMAGE_FORMATS = ["jpeg", "webp", "png"]
+_FORMAT_SHIFT = 12
+
+_PATCH_COUNT = struct.Struct("<H")
+_PATCH = struct.Struct("<HHHHI")
+
+
+def pack_gestures(gestures: List[str]) -> int:
+    flags = 0
+    for g in gestures:
+        flags |= GESTURE_BITS.get(g, 0)
+    return flags
+
+
+def unpack_gestures(flags: int) -> List[str]:
+    return [name for name, bit in GESTURE_BITS.items() if flags & bit]
+
+
+def pack_format(image_format: str) -> int:
+    return IMAGE_FORMATS.index(image_format) << _FORMAT_SHIFT
+
+
+def unpack_format(flags: int) -> str:
+    return IMAGE_FORMATS[flags >> _FORMAT_SHIFT]
+
+
+def pack_landmarks(landmarks: Dict[str, Tuple[int, int]]) -> bytes:
+    known = [(name, xy) for name, xy in landmarks.items() if name in _LANDMARK_INDEX]
+    out = bytearray([len(known)])
+    for name, (x, y) in known:
+        out += _LANDMARK.pack(_LANDMARK_INDEX[name], int(x), int(y))
+    return bytes(out)
+
+
+def unpack_landmarks(block: bytes) -> Dict[str, Tuple[int, int]]:
+    if not block:
+        return {}
+    landmarks = {}
+    for i in range(block[0]):
+        idx, x, y = _LANDMARK.unpack_from(block, 1 + i * _LANDMARK.size)
+        landmarks[LANDMARK_IDS[idx]] = (x, y)
+    return landmarks
+
+
+def pack_hands(hands: List[Dict[str, Any]]) -> bytes:
+    out = bytearray([len(hands)])
+    for hand in hands:
+        out += _HAND.pack(hand["id"] & 0xFFFF, HANDEDNESS.index(hand.get("handedness")),
+                          pack_gestures(hand["gestures"]))
+        out += pack_landmarks(hand["landmarks"])
+    return bytes(out)
+
+
+def unpack_hands(meta: bytes) -> List[Dict[str, Any]]:
+    """Tracked hands of a frame's metadata; [] when it only has the landmark block."""
+    offset = 1 + meta[0] * _LANDMARK.size if meta else 0
+    if offset >= len(meta):
+        return []
+    hands = []
+    count, offset = meta[offset], offset + 1
+    for _ in range(count):
+        hand_id, side, flags = _HAND.unpack_from(meta, offset)
+        offset += _HAND.size
+        length = 1 + meta[offset] * _LANDMARK.size
+        hands.append({"id": hand_id, "handedness": HANDEDNESS[side], "gestures": unpack_gestures(flags),
+                      "landmarks": unpack_landmarks(meta[offset:offset + length])})
+        offset += length
+    return hands
+
+
+def _pack(msg_type: int, flags: int, seq: int, timestamp: float, meta: bytes, payload: bytes) -> bytes:
+    header = HEADER.pack(msg_type, VERSION, flags, seq & 0xFFFFFFFF, timestamp, len(meta), len(payload))
+    return b"".join((header, meta, payload))
+
+
+def encode_frame(seq: int, timestamp: float, image: bytes,
+                 landmarks: Dict[str, Tuple[int, int]], gestures: List[str],
+                 image_format: str = "jpeg", hands: Optional[List[Dict[str, Any]]] = None) -> bytes:
+    flags = pack_gestures(gestures) | pack_format(image_format)
+    meta = pack_landmarks(landmarks)
+    if hands:
+        meta += pack_hands(hands)
+    return _pack(MSG_FRAME, flags, seq, timestamp, meta, image)
+
+
+def encode_state(seq: int, timestamp: float, state: Dict[str, Any], canvas: bytes,
+                 image_format: str = "jpeg") -> bytes:
+    meta = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return _pack(MSG_STATE, pack_format(image_format), seq, timestamp, meta, canvas)
+
+
+def encode_patches(seq: int, timestamp: float, patches: List[Tuple[int, int, int, int, bytes]],
+                   image_format: str = "jpeg") -> bytes:
+    meta = bytearray(_PATCH_COUNT.pack(len(patches)))
+    for x, y, w, h, image in patches:
+        meta += _PATCH.pack(x, y, w, h, len(image))
+    return _pack(MSG_PATCH, pack_format(image_format), seq, timestamp, bytes(meta),
+                 b"".join(p[4] for p in patches))
+
+
+def decode_patches(meta: bytes, payload: bytes) -> List[Tuple[int, int, int, int, bytes]]:
+    patches = []
+    offset = 0
+    (count,) = _PATCH_COUNT.unpack_from(meta)
+    for i in range(count):
+        x, y, w, h, length = _PATCH.unpack_from(meta, _PATCH_COUNT.size + i * _PATCH.size)
+        patches.append((x, y, w, h, payload[offset:offset + length]))
+        offset += length
+    return patches
+
+
+def encode_ops(seq: int, timestamp: float, ops: List[Dict[str, Any]]) -> bytes:
+    meta = json.dumps(ops, separators=(",", ":")).encode("utf-8")
+    return _pack(MSG_OPS, 0, seq, timestamp, meta, b"")
+
+
+def decode(data: bytes) -> Tuple[Tuple[int, int, int, int, float], bytes, bytes]:
+    """Split a binary message into ((type, version, flags, seq, timestamp), meta, payload)."""
+    msg_type, version, flags, seq, timestamp, meta_len, payload_len = HEADER.unpack_from(data)
+    start = HEADER.size
+    meta = data[start:start + meta_len]
+    payload = data[start + meta_len:start + meta_len + payload_len]
+    return (msg_type, version, flags, seq, timestamp), meta, payload
@@ -0,0 +1,84 @@
+"""Frame encoder benchmark.
+
+Encodes a camera-like frame and a drawn canvas with every registered
+encoder and reports latency and size:
+
+    cd backend && python -m benchmarks.encoders [--runs 50] [--quality 95] [--json out.json]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.core.state import State
+from app.utils.encoding import available_encoders, get_encoder
+
+
+def camera_frame(width: int = 850, height: int = 550, seed: int = 0) -> np.ndarray:
+    """Smooth gradients plus sensor noise, roughly as hard to compress as a webcam frame."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([
+        128 + 90 * np.sin(x / 97.0),
+        128 + 90 * np.cos(y / 61.0),
+        128 + 60 * np.sin((x + y) / 143.0),
+    ], axis=2)
+    noise = rng.normal(0, 6, base.shape)
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def canvas_frame(strokes: int = 60, seed: int = 0) -> np.ndarray:
+    """The composited board (ink plus UI) after a few dozen strokes."""
+    rng = np.random.default_rng(seed)
+    state = State()
+    height, width = state.CANVAS_SIZE[:2]
+    for i in range(strokes):
+        start = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        end = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        state.draw_segment(start, end, state.palette[i % len(state.palette)], state.thickness)
+    return state.get_display_canvas()
+
+
+def measure(name: str, frame: np.ndarray, runs: int, quality) -> dict:
+    encoder = get_encoder(name)
+    encoder.encode(frame, quality)  # warm up
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        data = encoder.encode(frame, quality)
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "encoder": name,
+        "format": encoder.format,
+        "bytes": len(data),
+        "mean_ms": float(np.mean(times)),
+        "p95_ms": float(np.percentile(times, 95)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--quality", type=int, default=None, help="quality for lossy codecs (encoder default if unset)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    inputs = {"camera": camera_frame(), "canvas": canvas_frame()}
+    results = [
+        {"input": label, **measure(name, frame, args.runs, args.quality)}
+        for label, frame in inputs.items()
+        for name in available_encoders()
+    ]
+
+    print(f"{'input':<8} {'encoder':<10} {'bytes':>9} {'mean ms':>9} {'p95 ms':>9}")
+    for r in results:
+        print(f"{r['input']:<8} {r['encoder']:<10} {r['bytes']:>9} {r['mean_ms']:>9.2f} {r['p95_ms']:>9.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""Per-stage pipeline benchmark.
+
+Times every stage of the server pipeline in isolation and end to end on
+synthetic frames (or a recorded video / landmark recording) and reports
+p50/p95/p99 latency, ops/sec and the memory each call allocates (peak
+traced by tracemalloc, so it counts numpy/OpenCV frame buffers):
+
+    cd backend && python -m benchmarks.pipeline [--frames 300] [--json out.json]
+    cd backend && python -m benchmarks.pipeline --video clip.mp4 --recording session.npz
+    cd backend && python -m benchmarks.pipeline --baseline main.json --tolerance 0.25
+
+With `--baseline` the p50 of each stage is compared against an earlier
+JSON report and the exit code is 1 if any stage got slower than the
+tolerance allows, so runs on the same machine can gate a deploy. A stage
+that raises is reported with its error and also fails the run.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.config import HAND_MATCH_DISTANCE, LANDMARK_BETA, LANDMARK_MIN_CUTOFF, MAX_HANDS
+from app.core.frame_processor import FrameProcessor
+from app.core.gesture_engine import GestureEngine
+from app.core.gesture_rules import GestureClassifier, classify_batch, evaluate_sequence
+from app.core.landmarks import FINGERTIPS, feature_vector
+from app.core.prediction import CursorPredictor
+from app.core.recording import LandmarkRecording
+from app.core.smoothing import LandmarkFilter
+from app.core.sources import SyntheticSource, VideoFileSource
+from app.core.state import State
+from app.core.tracking import HandIdentities
+from app.core.ui_drawer import draw_all_ui
+from app.utils import framing
+from app.utils.encoding import frame_to_base64
+
+WIDTH, HEIGHT = 850, 550
+
+
+def synthetic_hands(frames: int, seed: int = 0) -> np.ndarray:
+    """(frames, 21, 3) normalized landmarks of a hand drifting across the view
+    and pinching now and then."""
+    rng = np.random.default_rng(seed)
+    # Rough open-hand template around the wrist (landmark 0)
+    template = np.array([
+        [0, 0], [-.04, -.03], [-.07, -.07], [-.09, -.11], [-.10, -.15],
+        [-.03, -.12], [-.035, -.18], [-.037, -.22], [-.038, -.25],
+        [0, -.13], [0, -.20], [0, -.24], [0, -.27],
+        [.03, -.12], [.035, -.18], [.037, -.22], [.038, -.24],
+        [.06, -.10], [.07, -.14], [.075, -.17], [.078, -.19],
+    ], dtype=np.float32)
+    t = np.arange(frames, dtype=np.float32) / 30.0
+    wrist = np.stack([0.5 + 0.25 * np.cos(t), 0.75 + 0.1 * np.sin(1.7 * t)], axis=1)
+    hands = np.zeros((frames, 21, 3), dtype=np.float32)
+    hands[:, :, :2] = wrist[:, None, :] + template[None]
+    # Close thumb onto the index finger every other second
+    pinch = (np.sin(np.pi * t) > 0.5)[:, None]
+    hands[:, 4, :2] = np.where(pinch, hands[:, 8, :2], hands[:, 4, :2])
+    hands[:, :, :2] += rng.normal(0, 0.002, (frames, 21, 2)).astype(np.float32)
+    return hands
+
+
+def fingertips(hand: np.ndarray) -> Dict[str, tuple]:
+    return {name: (int(hand[i, 0] * WIDTH), int(hand[i, 1] * HEIGHT)) for name, i in FINGERTIPS.items()}
+
+
+def summarize(times_ms: List[float]) -> Dict[str, float]:
+    times = np.asarray(times_ms)
+    mean = float(times.mean())
+    return {
+        "runs": len(times),
+        "mean_ms": mean,
+        "p50_ms": float(np.percentile(times, 50)),
+        "p95_ms": float(np.percentile(times, 95)),
+        "p99_ms": float(np.percentile(times, 99)),
+        "ops_per_sec": 1000.0 / mean if mean > 0 else float("inf"),
+    }
+
+
+def allocated_kb(step: Callable[[int], None], runs: int = 5) -> float:
+    """Mean peak of memory allocated during one `step` call, in KiB.
+
+    Measured separately from the timed runs because tracing slows allocations down.
+    """
+    tracemalloc.start()
+    try:
+        peaks = []
+        for i in range(runs):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            step(i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        return float(np.mean(peaks)) / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_stage(step: Callable[[int], None], runs: int, warmup: int = 5) -> Dict[str, object]:
+    """Time `step(i)` for i in range(runs) after a few untimed calls."""
+    try:
+        for i in range(min(warmup, runs)):
+            step(i)
+        times = []
+        for i in range(runs):
+            start = time.perf_counter()
+            step(i)
+            times.append((time.perf_counter() - start) * 1000)
+        return {**summarize(times), "alloc_kb": allocated_kb(step)}
+    except Exception as e:
+        # A broken stage is reported, not fatal, so the other numbers survive
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def environment() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip()
+    except Exception:
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def build_stages(frames: int, video: Optional[str], recording: Optional[str]) -> Dict[str, Callable[[int], None]]:
+    source = VideoFileSource(video, loop=True) if video else SyntheticSource(frames=None)
+    raw = []
+    for _ in range(frames):
+        ok, frame, _ = source.read()
+        raw.append(frame)
+    processor = FrameProcessor(source=VideoFileSource(video, loop=True) if video else SyntheticSource())
+    processor.tracker.stride = 1  # time the model on every frame
+
+    if recording:
+        rec = LandmarkRecording.load(recording)
+        inferred = rec.landmarks[rec.inferred][:, 0]
+        hands = inferred[~np.isnan(inferred[:, 0, 0])]
+        if not len(hands):
+            raise SystemExit(f"{recording} holds no detected hands")
+        gestures = [framing.unpack_gestures(int(g)) for g in rec.gestures[:, 0]]
+        tips = [rec.fingertips(i) for i in range(len(rec))]
+    else:
+        hands = synthetic_hands(frames)
+        gestures = [["PINCH"] if np.hypot(*(h[4, :2] - h[8, :2])) < 0.06 else [] for h in hands]
+        tips = [fingertips(h) for h in hands]
+    preprocessed = [cv2.cvtColor(cv2.resize(cv2.flip(f, 1), (WIDTH, HEIGHT)), cv2.COLOR_BGR2RGB) for f in raw]
+    bgr = [cv2.resize(cv2.flip(f, 1), (WIDTH, HEIGHT)) for f in raw]
+
+    engine_state = State()
+    engine = GestureEngine(engine_state)
+    ui_state = State()
+    for i in range(40):
+        ui_state.draw_segment((20 * i, 100 + 5 * i), (20 * i + 60, 300), ui_state.palette[i % len(ui_state.palette)], 5)
+    canvas = ui_state.canvas
+    frame_messages = [
+        {"type": "frame", "seq": i, "image": frame_to_base64(bgr[i]), "landmarks": tips[i % len(tips)],
+         "gestures": gestures[i % len(gestures)]}
+        for i in range(min(frames, 30))
+    ]
+
+    preprocessor = processor.preprocess
+
+    def preprocess(i: int) -> None:
+        frame = preprocessor.mirror_resize(raw[i % len(raw)])
+        preprocessor.to_rgb(frame)
+        preprocessor.buffers.release(frame)
+
+    classifier = GestureClassifier()
+    hand_features = feature_vector(hands)
+    # MAX_HANDS hands per frame, as the live processor sees them
+    hand_pairs = np.stack([np.roll(hands, -k, axis=0) for k in range(MAX_HANDS)], axis=1)
+    pair_classifier = GestureClassifier(shape=(MAX_HANDS,))
+    identities = HandIdentities(MAX_HANDS, HAND_MATCH_DISTANCE)
+    landmark_filter = LandmarkFilter((MAX_HANDS, 21, 3), LANDMARK_MIN_CUTOFF, LANDMARK_BETA)
+    cursor_predictor = CursorPredictor((WIDTH, HEIGHT))
+
+    def cursor_prediction(i: int) -> None:
+        cursor_predictor.update(i / 30.0, [{"id": 1, "landmarks": tips[i % len(tips)]}])
+        cursor_predictor.predict(0.08)
+
+    # A stroke segment per frame, then the canvas update a client gets: the whole encoded canvas or its dirty tiles
+    full_state, tiled_state = State(), State()
+
+    def stroke(state: State, i: int) -> None:
+        x = 40 + 10 * (i % 75)
+        state.draw_segment((x, 200 + i % 100), (x + 10, 210 + i % 100), state.color, 5)
+
+    def state_serialize(i: int) -> None:
+        stroke(full_state, i)
+        full_state.serialize(include_canvas=True)
+
+    def canvas_patches(i: int) -> None:
+        stroke(tiled_state, i)
+        tiled_state.get_canvas_patches()
+
+    e2e_state = State()
+    e2e_engine = GestureEngine(e2e_state)
+
+    def end_to_end(i: int) -> None:
+        ok, frame, timestamp = processor.capture()
+        frame, landmarks, found, tracked = processor.analyze(frame, timestamp)
+        if tracked or e2e_engine.tracking:
+            e2e_engine.process(found, landmarks, tracked)
+        json.dumps({"type": "frame", "seq": i, "image": frame_to_base64(frame),
+                    "landmarks": landmarks, "gestures": found})
+        json.dumps({"type": "state", **e2e_state.serialize()})
+        processor.recycle(frame)
+
+    stages = {
+        "capture_decode": lambda i: source.read(),
+        "preprocess": preprocess,
+        # The allocating flip/resize/cvtColor chain `preprocess` replaced, for reference
+        "preprocess_naive": lambda i: cv2.cvtColor(cv2.resize(cv2.flip(raw[i % len(raw)], 1), (WIDTH, HEIGHT)),
+                                                   cv2.COLOR_BGR2RGB),
+        "gesture_classify": lambda i: processor.classify(hands[i % len(hands)]),
+        # Every hand of the run in one vectorized call
+        "gesture_classify_batch": lambda i: classify_batch(hands),
+        # Rule table with hysteresis/debounce: per live frame, and over the whole run at once
+        "gesture_rules_frame": lambda i: classifier.update(feature_vector(hands[i % len(hands)])),
+        "gesture_rules_sequence": lambda i: evaluate_sequence(hand_features),
+        # All MAX_HANDS hands of a frame in one feature pass and one update
+        "gesture_rules_hands": lambda i: pair_classifier.update(feature_vector(hand_pairs[i % len(hand_pairs)])),
+        "hand_identities": lambda i: identities.assign(hand_pairs[i % len(hand_pairs)]),
+        # Every landmark of MAX_HANDS hands in one filter step, 30 fps capture times
+        "landmark_filter": lambda i: landmark_filter.update(hand_pairs[i % len(hand_pairs)], i / 30.0),
+        # Per session and frame: Kalman step and latency-compensated cursor of one hand
+        "cursor_prediction": cursor_prediction,
+        "gesture_engine": lambda i: engine.process(gestures[i % len(gestures)], tips[i % len(tips)]),
+        "draw_ui": lambda i: draw_all_ui(canvas.copy(), ui_state),
+        "state_serialize": state_serialize,
+        "canvas_patches": canvas_patches,
+        "jpeg_base64": lambda i: frame_to_base64(bgr[i % len(bgr)]),
+        "json_send": lambda i: json.dumps(frame_messages[i % len(frame_messages)]),
+        "binary_frame": lambda i: framing.encode_frame(i, 0.0, b"\0" * 60000, tips[i % len(tips)],
+                                                       gestures[i % len(gestures)]),
+        "end_to_end": end_to_end,
+    }
+    if processor.hands is not None:
+        stages["hand_inference"] = lambda i: processor.hands.process(preprocessed[i % len(preprocessed)])
+    return stages
+
+
+def compare(results: Dict[str, dict], baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path) as f:
+        baseline = json.load(f)["stages"]
+    ok = True
+    print(f"\n{'stage':<24} {'base p50':>9} {'p50':>9} {'change':>8}")
+    for name, stats in results.items():
+        before = baseline.get(name, {})
+        if "p50_ms" not in stats or "p50_ms" not in before:
+            continue
+        change = stats["p50_ms"] / before["p50_ms"] - 1 if before["p50_ms"] else 0.0
+        flag = "  REGRESSION" if change > tolerance else ""
+        ok = ok and not flag
+        print(f"{name:<24} {before['p50_ms']:>9.3f} {stats['p50_ms']:>9.3f} {change:>+8.1%}{flag}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300, help="timed runs per stage")
+    parser.add_argument("--video", help="decode frames from this file instead of the synthetic source")
+    parser.add_argument("--recording", help="landmark recording (.npz) for the gesture stages")
+    parser.add_argument("--stages", help="comma-separated subset of stages to run")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="earlier JSON report to compare p50 against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown vs baseline")
+    args = parser.parse_args()
+
+    stages = build_stages(args.frames, args.video, args.recording)
+    if args.stages:
+        wanted = args.stages.split(",")
+        stages = {name: step for name, step in stages.items() if name in wanted}
+
+    results = {name: run_stage(step, args.frames) for name, step in stages.items()}
+
+    print(f"{'stage':<24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10} {'alloc KiB':>10}")
+    for name, stats in results.items():
+        if "error" in stats:
+            print(f"{name:<24} {stats['error']}")
+        else:
+            print(f"{name:<24} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+                  f"{stats['p99_ms']:>9.3f} {stats['ops_per_sec']:>10.0f} {stats['alloc_kb']:>10.1f}")
+
+    report = {"environment": environment(), "frames": args.frames,
+              "input": {"video": args.video, "recording": args.recording}, "stages": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    failed = [name for name, stats in results.items() if "error" in stats]
+    if failed:
+        print(f"\nFailed stages: {', '.join(failed)}")
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import numpy as np
+
+from app.core.gesture_engine import GestureEngine
+from app.core.recording import LandmarkRecorder, LandmarkRecording, replay_engine
+from app.core.state import State
+
+
+def _hand(x, y):
+    """(21, 3) normalized landmarks with every point at (x, y)."""
+    return np.tile(np.array([x, y, 0.0], dtype=np.float32), (21, 1))
+
+
+def _record(path, frames):
+    recorder = LandmarkRecorder(max_hands=2)
+    for timestamp, hands in frames:
+        recorder.add(timestamp, [_hand(x, y) for _, x, y, _ in hands], [g for *_, g in hands],
+                     [hand_id for hand_id, *_ in hands])
+    recorder.save(path)
+    return LandmarkRecording.load(path)
+
+
+def test_recording_keeps_ids_and_gestures_per_hand(tmp_path):
+    recording = _record(tmp_path / "hands.npz", [
+        (0.0, [(1, 0.3, 0.4, []), (2, 0.6, 0.4, ["PINCH"])]),
+        (0.1, [(2, 0.6, 0.5, ["FIST"])]),
+    ])
+    assert recording.ids.tolist() == [[1, 2], [2, -1]]
+    assert [(h["id"], h["gestures"]) for h in recording.hands(0)] == [(1, []), (2, ["PINCH"])]
+    assert [(h["id"], h["gestures"]) for h in recording.hands(1)] == [(2, ["FIST"])]
+
+
+def test_replay_keeps_each_hand_on_its_own_stroke(tmp_path):
+    # Hand 1 leaves after the second frame, so hand 2 becomes the first hand
+    recording = _record(tmp_path / "hands.npz", [
+        (0.0, [(1, 0.3, 0.4, []), (2, 0.6, 0.4, [])]),
+        (0.1, [(1, 0.3, 0.5, []), (2, 0.6, 0.5, [])]),
+        (0.2, [(2, 0.6, 0.6, [])]),
+    ])
+    state = State()
+    state.record_ops = True
+    replay_engine(recording, GestureEngine(state))
+    ops = state.take_ops()
+    assert [op["op"] for op in ops].count("stroke_begin") == 2
+    assert [op["op"] for op in ops].count("stroke_end") == 1
+    assert list(state.strokes) == [2]
+    assert state.strokes[2][1] == (510, 330)
+
+
+def test_replay_clicks_at_recorded_times(tmp_path):
+    # Two pinches on the "new page" button 0.6 s apart: two clicks, however fast the replay runs
+    x, y = 40 / 850, 270 / 550
+    recording = _record(tmp_path / "clicks.npz", [
+        (100.0, [(1, x, y, ["PINCH"])]),
+        (100.1, [(1, x, y, [])]),
+        (100.6, [(1, x, y, ["PINCH"])]),
+        (100.7, [(1, x, y, [])]),
+    ])
+    state = State()
+    replay_engine(recording, GestureEngine(state))
+    assert len(state.pages) == 3
@@ -0,0 +1,27 @@
+from app.core.tracking import HandROI
+
+
+def _roi(max_hands=2):
+    return HandROI((850, 550), margin=0.6, lookahead=0.1, min_size=192, full_search_interval=30, max_hands=max_hands)
+
+
+def test_roi_crops_around_one_hand():
+    roi = _roi(max_hands=1)
+    roi.update(0.0, (400, 200, 100, 100), hands=1)
+    x, y, w, h = roi.region()
+    assert x <= 400 and y <= 200 and x + w >= 500 and y + h >= 300
+
+
+def test_roi_uses_full_frame_for_two_hands_far_apart():
+    roi = _roi()
+    # Hands at x=50-150 and x=700-800: no 550 px crop holds both
+    roi.update(0.0, (50, 200, 750, 100), hands=2)
+    assert roi.region() is None
+
+
+def test_roi_uses_full_frame_while_a_hand_is_missing():
+    roi = _roi()
+    roi.update(0.0, (400, 200, 100, 100), hands=1)
+    assert roi.region() is None
+    roi.update(0.1, (300, 200, 250, 100), hands=2)
+    assert roi.region() is not None
@@ -13,6 +13,15 @@ let reconnectInterval = 1500;
 let lastFrameTime = performance.now();
 let fps = 0;
 
+// Server canvas (850x550) kept offscreen so full keyframes and tile patches
+// can be composed in order, then presented on the overlay.
+const board = document.createElement('canvas');
+board.width = 850;
+board.height = 550;
+const boardCtx = board.getContext('2d');
+let boardQueue = Promise.resolve();
+let boardReady = false;
+
 function resizeCanvas() {
   overlay.width = frameImg.clientWidth;
   overlay.height = frameImg.clientHeight;
@@ -20,6 +29,15 @@ function resizeCanvas() {
 window.addEventListener('resize', resizeCanvas);
 frameImg.addEventListener('load', resizeCanvas);
 
+// Acknowledge frames once the browser has decoded them so the server only
+// keeps a couple of frames in flight and drops stale ones instead of queuing.
+let pendingAck = null;
+frameImg.addEventListener('load', ()=>{
+  if(pendingAck === null || !ws || ws.readyState !== WebSocket.OPEN) return;
+  ws.send(JSON.stringify({type: 'ack', seq: pendingAck}));
+  pendingAck = null;
+});
+
 function setStatus(s, color = '#0a0'){
   statusEl.textContent = s;
   statusEl.style.background = color === '#0a0' ? '#e6fff1' : '#ffefef';
@@ -29,12 +47,17 @@ function setStatus(s, color = '#0a0'){
 function connect(){
   const url = wsUrlInput.value;
   ws = new WebSocket(url);
+  ws.binaryType = 'arraybuffer';
 
   ws.addEventListener('open', ()=>{ setStatus('Connected', '#0a0'); });
   ws.addEventListener('close', ()=>{ setStatus('Disconnected', '#900'); setTimeout(connect,reconnectInterval); });
   ws.addEventListener('error', (e)=>{ setStatus('Error', '#900'); console.error('ws error', e); ws.close(); });
 
   ws.addEventListener('message', (ev)=>{
+    if(ev.data instanceof ArrayBuffer){
+      handleMessage(decodeBinary(ev.data));
+      return;
+    }
     try{
       const msg = JSON.parse(ev.data);
       handleMessage(msg);
@@ -42,12 +65,103 @@ function connect(){
   });
 }
 
+/* Binary transport (ws://host/ws?transport=binary).
+   24-byte little-endian header: type u8 | version u8 | flags u16 | seq u32 | timestamp f64 | meta_len u32 | payload_len u32 */
+const MSG_FRAME = 1, MSG_STATE = 2, MSG_PATCH = 3, MSG_OPS = 4;
+const GESTURE_BITS = ['OPEN_PALM', 'FIST', 'THUMB_PINKY', 'PINCH'];
+const LANDMARK_IDS = ['thumb_tip', 'index_finger_tip', 'middle_finger_tip', 'ring_finger_tip', 'pinky_tip', 'cursor'];
+const HANDEDNESS = [null, 'Left', 'Right'];
+// Image payload format lives in the top four flag bits
+const IMAGE_FORMATS = ['jpeg', 'webp', 'png'];
+const imageFormat = flags => IMAGE_FORMATS[flags >> 12] || 'jpeg';
+const imageUrls = {};
+
+function decodeBinary(buf){
+  const view = new DataView(buf);
+  const type = view.getUint8(0);
+  const flags = view.getUint16(2, true);
+  const seq = view.getUint32(4, true);
+  const timestamp = view.getFloat64(8, true);
+  const metaLen = view.getUint32(16, true);
+  const payloadLen = view.getUint32(20, true);
+  const meta = new Uint8Array(buf, 24, metaLen);
+  const payload = new Uint8Array(buf, 24 + metaLen, payloadLen);
+  const mime = 'image/' + imageFormat(flags);
+
+  if(type === MSG_FRAME){
+    const lm = new DataView(buf, 24, metaLen);
+    // landmark block: u8 count, then u8 id | i16 x | i16 y per fingertip
+    const readLandmarks = off => {
+      const landmarks = {};
+      const count = off < metaLen ? meta[off] : 0;
+      for(let i = 0; i < count; i++){
+        const at = off + 1 + i * 5;
+        landmarks[LANDMARK_IDS[lm.getUint8(at)]] = [lm.getInt16(at + 1, true), lm.getInt16(at + 3, true)];
+      }
+      return [landmarks, off + 1 + count * 5];
+    };
+    const [landmarks, end] = readLandmarks(0);
+    const gestures = GESTURE_BITS.filter((_, i) => flags & (1 << i));
+    // optional hands block: u8 count, then u16 id | u8 handedness | u8 gestures | landmark block per hand
+    const hands = [];
+    if(end < metaLen){
+      let off = end + 1;
+      for(let h = 0; h < meta[end]; h++){
+        const id = lm.getUint16(off, true), side = meta[off + 2], bits = meta[off + 3];
+        const [handLandmarks, next] = readLandmarks(off + 4);
+        hands.push({id, handedness: HANDEDNESS[side], landmarks: handLandmarks,
+                    gestures: GESTURE_BITS.filter((_, i) => bits & (1 << i))});
+        off = next;
+      }
+    }
+    return {type: 'frame', seq, timestamp, imageUrl: payloadLen ? blobUrl('frame', payload, mime) : null, landmarks, gestures, hands};
+  }
+  if(type === MSG_STATE){
+    const state = JSON.parse(new TextDecoder().decode(meta));
+    return {type: 'state', seq, timestamp, ...state, canvasUrl: payloadLen ? blobUrl('canvas', payload, mime) : null};
+  }
+  if(type === MSG_PATCH){
+    // rect table: u16 count, then u16 x, y, w, h + u32 length per tile
+    const table = new DataView(buf, 24, metaLen);
+    const tiles = [];
+    let offset = 0;
+    for(let i = 0, n = table.getUint16(0, true); i < n; i++){
+      const off = 2 + i * 12;
+      const len = table.getUint32(off + 8, true);
+      const bytes = payload.subarray(offset, offset + len);
+      offset += len;
+      tiles.push({x: table.getUint16(off, true), y: table.getUint16(off + 2, true),
+                  src: URL.createObjectURL(new Blob([bytes], {type: mime})), revoke: true});
+    }
+    return {type: 'canvas_patch', seq, timestamp, tiles};
+  }
+  if(type === MSG_OPS){
+    return {type: 'ops', seq, timestamp, ops: JSON.parse(new TextDecoder().decode(meta))};
+  }
+  return {type: 'unknown'};
+}
+
+function blobUrl(key, bytes, mime){
+  // Reuse one object URL slot per stream so old images are released
+  if(imageUrls[key]) URL.revokeObjectURL(imageUrls[key]);
+  imageUrls[key] = URL.createObjectURL(new Blob([bytes], {type: mime}));
+  return imageUrls[key];
+}
+
+function dataUrl(format, b64){
+  return `data:image/${format || 'jpeg'};base64,${b64}`;
+}
+
 function handleMessage(msg){
   if(msg.type === 'frame'){
-    // image is base64 jpeg
-    frameImg.src = 'data:image/jpeg;base64,' + msg.image;
-    // landmarks could be used to draw cursor markers
-    drawLandmarks(msg.landmarks || {});
+    // image is base64 (JSON transport, `format` names the codec) or a blob URL (binary transport)
+    // (no image when the client opted out with frames=false)
+    if(msg.imageUrl || msg.image){
+      frameImg.src = msg.imageUrl || dataUrl(msg.format, msg.image);
+      if(msg.seq !== undefined) pendingAck = msg.seq;
+    }
+    // every tracked hand gets cursor markers (older servers only send `landmarks`)
+    drawLandmarks(msg.hands && msg.hands.length ? msg.hands : [{id: 0, landmarks: msg.landmarks || {}}]);
     const now = performance.now();
     fps = 1000 / (now - lastFrameTime);
     lastFrameTime = now;
@@ -57,9 +171,13 @@ function handleMessage(msg){
     pageEl.textContent = `${(msg.page_index || 0) + 1}/${msg.total_pages || '?'}`;
 
     // If server sends canvas we can optionally overlay it
-    if(msg.canvas){
-      drawCanvas(msg.canvas);
+    if(msg.canvas || msg.canvasUrl){
+      drawCanvas(msg.canvasUrl || dataUrl(msg.canvas_format, msg.canvas));
     }
+  } else if(msg.type === 'canvas_patch'){
+    drawPatches(msg.tiles.map(t => t.src ? t : {x: t.x, y: t.y, src: dataUrl(msg.format, t.image)}));
+  } else if(msg.type === 'ops'){
+    applyOps(msg.ops);
   }
 
   if(msg.gestures){
@@ -67,30 +185,72 @@ function handleMessage(msg){
   }
 }
 
-function drawLandmarks(landmarks){
+const HAND_COLORS = ['rgba(0,255,0,0.9)', 'rgba(255,140,0,0.9)', 'rgba(0,170,255,0.9)', 'rgba(255,0,200,0.9)'];
+
+function drawLandmarks(hands){
   ctx.clearRect(0,0,overlay.width,overlay.height);
-  ctx.fillStyle = 'rgba(0,255,0,0.9)';
-  for(const k in landmarks){
-    const [x,y] = landmarks[k];
-    // transform coord from image to displayed size
-    const rect = frameImg.getBoundingClientRect();
-    const scaleX = overlay.width / rect.width;
-    const scaleY = overlay.height / rect.height;
-    ctx.beginPath();
-    ctx.arc(x*scaleX, y*scaleY, 6, 0, Math.PI*2);
-    ctx.fill();
+  presentBoard();
+  // transform coord from image to displayed size
+  const rect = frameImg.getBoundingClientRect();
+  const scaleX = overlay.width / rect.width;
+  const scaleY = overlay.height / rect.height;
+  for(const hand of hands){
+    // colored by id, so a hand keeps its color while the others come and go
+    ctx.fillStyle = ctx.strokeStyle = HAND_COLORS[hand.id % HAND_COLORS.length];
+    for(const k in hand.landmarks){
+      const [x,y] = hand.landmarks[k];
+      ctx.beginPath();
+      if(k === 'cursor'){
+        // predicted by the server to where the finger is by the time this frame is shown
+        ctx.lineWidth = 2;
+        ctx.arc(x*scaleX, y*scaleY, 10, 0, Math.PI*2);
+        ctx.stroke();
+      } else {
+        ctx.arc(x*scaleX, y*scaleY, 6, 0, Math.PI*2);
+        ctx.fill();
+      }
+    }
   }
 }
 
-function drawCanvas(b64){
-  const img = new Image();
-  img.onload = ()=>{
-    // draw canvas into overlay with light transparency
-    ctx.globalAlpha = 0.95;
-    ctx.drawImage(img,0,0,overlay.width,overlay.height);
-    ctx.globalAlpha = 1.0;
-  };
-  img.src = 'data:image/jpeg;base64,' + b64;
+function loadImage(src){
+  return new Promise((resolve, reject)=>{
+    const img = new Image();
+    img.onload = ()=>resolve(img);
+    img.onerror = reject;
+    img.src = src;
+  });
+}
+
+function paintBoard(paint){
+  // Chain updates so a patch never lands before the keyframe it applies to
+  boardQueue = boardQueue.then(paint).then(()=>{ boardReady = true; presentBoard(); })
+    .catch(err=>console.warn('canvas update failed', err));
+}
+
+function presentBoard(){
+  if(!boardReady) return;
+  // draw canvas into overlay with light transparency
+  ctx.globalAlpha = 0.95;
+  ctx.drawImage(board,0,0,overlay.width,overlay.height);
+  ctx.globalAlpha = 1.0;
+}
+
+function drawCanvas(src){
+  paintBoard(async ()=>{
+    const img = await loadImage(src);
+    boardCtx.drawImage(img, 0, 0);
+  });
+}
+
+function drawPatches(tiles){
+  paintBoard(async ()=>{
+    const imgs = await Promise.all(tiles.map(t=>loadImage(t.src)));
+    imgs.forEach((img, i)=>{
+      boardCtx.drawImage(img, tiles[i].x, tiles[i].y);
+      if(tiles[i].revoke) URL.revokeObjectURL(tiles[i].src);
+    });
+  });
 }
 
 // send a command to server
@@ -130,6 +290,37 @@ document.getElementById('btnDownloadCanvas').addEventListener('click', ()=>{
   link.click();
 });
 
+/* Vector mode (?canvas=vector): render ink from stroke operations.
+   Undo/redo/page switches are followed by a keyframe from the server. */
+const strokes = {};
+
+function applyOps(ops){
+  paintBoard(()=>{
+    for(const op of ops){
+      if(op.op === 'stroke_begin'){
+        const [b, g, r] = op.color;  // server colors are BGR
+        strokes[op.id] = {color: `rgb(${r},${g},${b})`, width: op.thickness, last: op.point};
+      } else if(op.op === 'stroke_point'){
+        const stroke = strokes[op.id];
+        if(!stroke) continue;
+        boardCtx.strokeStyle = stroke.color;
+        boardCtx.lineWidth = stroke.width;
+        boardCtx.lineCap = 'round';
+        boardCtx.beginPath();
+        boardCtx.moveTo(stroke.last[0], stroke.last[1]);
+        boardCtx.lineTo(op.point[0], op.point[1]);
+        boardCtx.stroke();
+        stroke.last = op.point;
+      } else if(op.op === 'stroke_end'){
+        delete strokes[op.id];
+      } else if(op.op === 'erase_all'){
+        boardCtx.fillStyle = '#fff';
+        boardCtx.fillRect(0, 0, board.width, board.height);
+      }
+    }
+  });
+}
+
 function hexToRgb(hex){
   const bigint = parseInt(hex.slice(1), 16);
   return {r:(bigint>>16)&255, g:(bigint>>8)&255, b:bigint&255};